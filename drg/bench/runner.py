@@ -3,10 +3,9 @@ import uuid
 import time
 import random
 import pandas as pd
-import matplotlib.pyplot as plt
 from drg.ingest.generator import generate_and_save
 from drg.contracts.loader import load_contract
-from drg.validation.core import run_validations
+from drg.validation.runner import validate_file
 from drg.utils import logger
 
 # Ensure dirs exist
@@ -15,8 +14,8 @@ os.makedirs("benchmarks/results", exist_ok=True)
 SCENARIOS = ['clean'] * 80 + ['schema_drift', 'late_data', 'volume_spike', 'null_explosion', 'missing_partition'] * 4
 random.shuffle(SCENARIOS)
 
-def run_benchmarks(num_runs=100):
-    logger.info(f"Starting benchmark of {num_runs} runs...")
+def run_benchmarks(num_runs=100, mode="memory"):
+    logger.info(f"Starting benchmark of {num_runs} runs (mode={mode})...")
     
     results = []
     contract = load_contract("config/contract.yaml")
@@ -34,8 +33,7 @@ def run_benchmarks(num_runs=100):
         # Validate
         t1 = time.time()
         try:
-            df = pd.read_parquet(fpath)
-            val_results = run_validations(df, contract)
+            val_results = validate_file(fpath, contract, mode=mode)
             passed = all(r.passed for r in val_results)
         except Exception:
             passed = False # Crash counts as fail
@@ -97,6 +95,7 @@ def run_benchmarks(num_runs=100):
     
     # Plot
     try:
+        import matplotlib.pyplot as plt # heavy; only needed here
         plt.figure(figsize=(10, 6))
         df_res['validate_time'].hist(bins=20)
         plt.title("Validation Latency Distribution")
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import platform
+import resource
+import tempfile
+import multiprocessing
+from dataclasses import replace
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from drg.contracts.loader import load_contract, SchemaField
+from drg.ingest.generator import DataGenerator
+from drg.validation.core import validate_schema, validate_volume, validate_freshness, validate_distribution
+from drg.validation.columns import validate_columns
+from drg.validation.reference import build_reference_profile, write_reference_profile, profile_columns
+from drg.utils import logger
+
+DEFAULT_ROWS = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_COLUMNS = [0, 8]
+DEFAULT_REPEATS = 15
+DEFAULT_TOLERANCE = 0.25
+# Stages faster than this are too noisy to gate on
+MIN_GATED_MS = 5.0
+BASELINE_PATH = "benchmarks/baseline.json"
+RESULTS_PATH = "benchmarks/results/suite.json"
+
+def _with_extra_columns(df: pd.DataFrame, extra: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    for i in range(extra):
+        df[f"extra_{i}"] = rng.lognormal(1.0, 0.5, size=len(df))
+    return df
+
+def _percentiles(samples) -> dict:
+    ms = np.asarray(samples) * 1000.0
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p95_ms": round(float(np.percentile(ms, 95)), 3),
+            "p99_ms": round(float(np.percentile(ms, 99)), 3), "mean_ms": round(float(ms.mean()), 3)}
+
+def _persist_stage(contract, results):
+    """Times commit_run against a throwaway run; returns None if no database is reachable."""
+    try:
+        from drg.policy.engine import register_run, commit_run
+        run_id = str(uuid.uuid4())
+        register_run(run_id, "bench")
+    except Exception:
+        return None
+    def persist():
+        commit_run(run_id, results)
+    return persist
+
+def run_config(rows: int, extra_columns: int, repeats: int, with_db: bool) -> dict:
+    """One sweep point. Runs in its own process so peak RSS belongs to this configuration alone."""
+    contract = load_contract("config/contract.yaml")
+    schema = contract.schema + [SchemaField(f"extra_{i}", "float", min=0.0) for i in range(extra_columns)]
+    contract = replace(contract, schema=schema)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ref_path = os.path.join(tmp, "reference.parquet")
+        _with_extra_columns(DataGenerator(seed=123).generate_batch(10_000), extra_columns, 123).to_parquet(ref_path, index=False)
+        contract.checks = dict(contract.checks)
+        contract.checks['distribution'] = dict(contract.checks.get('distribution', {}), reference_path=ref_path)
+        write_reference_profile(build_reference_profile(ref_path, profile_columns(contract)))
+
+        data_path = os.path.join(tmp, "batch.parquet")
+        _with_extra_columns(DataGenerator(seed=7).generate_batch(rows), extra_columns, 7).to_parquet(data_path, index=False)
+        bytes_on_disk = os.path.getsize(data_path)
+
+        stages = {
+            "schema_presence": lambda df: [validate_schema(df, contract.schema)],
+            "column_checks": lambda df: validate_columns(df, contract.schema, contract.checks),
+            "volume": lambda df: [validate_volume(df, contract.checks)],
+            "freshness": lambda df: [validate_freshness(df, contract.checks)],
+            "distribution": lambda df: [validate_distribution(df, contract.checks, contract.schema)],
+        }
+        timings = {name: [] for name in ["read", *stages, "persist", "total"]}
+        persist = None
+        # One untimed pass first so lazy imports and the profile cache don't land in p99
+        for i in range(repeats + 1):
+            t_start = time.perf_counter()
+            df = pd.read_parquet(data_path)
+            timings["read"].append(time.perf_counter() - t_start)
+
+            results = []
+            for name, stage in stages.items():
+                t0 = time.perf_counter()
+                results.extend(stage(df))
+                timings[name].append(time.perf_counter() - t0)
+
+            if with_db:
+                persist = persist or _persist_stage(contract, results)
+                if persist:
+                    t0 = time.perf_counter()
+                    persist()
+                    timings["persist"].append(time.perf_counter() - t0)
+            timings["total"].append(time.perf_counter() - t_start)
+            del df
+            if i == 0:
+                timings = {name: [] for name in timings}
+
+    total = _percentiles(timings["total"])
+    return {
+        "rows": rows,
+        "columns": len(schema),
+        "extra_columns": extra_columns,
+        "bytes_on_disk": bytes_on_disk,
+        "repeats": repeats,
+        "stages": {name: _percentiles(t) for name, t in timings.items() if t and name != "total"},
+        "total": total,
+        "throughput_rows_per_s": round(rows / (total["p50_ms"] / 1000.0), 1),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+    }
+
+def _run_isolated(args):
+    return run_config(*args)
+
+def run_suite(rows_list, columns_list, repeats: int = DEFAULT_REPEATS, with_db: bool = False) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for rows in rows_list:
+        for extra in columns_list:
+            logger.info(f"Benchmarking rows={rows} extra_columns={extra} repeats={repeats}")
+            with ctx.Pool(1) as pool:
+                results.append(pool.apply(_run_isolated, ((rows, extra, repeats, with_db),)))
+    return {
+        "meta": {"created_at": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "machine": platform.machine(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+
+def compare_to_baseline(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """Stage p50s slower than baseline * (1 + tolerance). Sweep points missing from either side are ignored."""
+    base = {(r["rows"], r["extra_columns"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["rows"], r["extra_columns"]))
+        if not b:
+            continue
+        for stage, stats in list(r["stages"].items()) + [("total", r["total"])]:
+            ref = (b["total"] if stage == "total" else b["stages"].get(stage, {})).get("p50_ms")
+            if ref is None or max(ref, stats["p50_ms"]) < MIN_GATED_MS:
+                continue
+            if stats["p50_ms"] > ref * (1 + tolerance):
+                regressions.append({"rows": r["rows"], "extra_columns": r["extra_columns"], "stage": stage,
+                                    "baseline_p50_ms": ref, "p50_ms": stats["p50_ms"],
+                                    "change": round(stats["p50_ms"] / ref - 1, 3)})
+    return regressions
+
+def print_report(report: dict):
+    print(f"{'rows':>10} {'cols':>5} {'stage':>16} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for r in report["results"]:
+        for stage, s in list(r["stages"].items()) + [("total", r["total"])]:
+            print(f"{r['rows']:>10} {r['columns']:>5} {stage:>16} {s['p50_ms']:>10.3f} {s['p95_ms']:>10.3f} {s['p99_ms']:>10.3f}")
+        print(f"{'':>10} {'':>5} {'throughput':>16} {r['throughput_rows_per_s']:>10.0f} rows/s   peak RSS {r['peak_rss_mb']} MB")
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DRG scaling benchmark suite")
+    parser.add_argument("--rows", type=_int_list, default=DEFAULT_ROWS, help="Comma-separated row counts (e.g. 1000,10000000)")
+    parser.add_argument("--columns", type=_int_list, default=DEFAULT_COLUMNS, help="Comma-separated counts of extra numeric columns")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--db", action="store_true", help="Also time persistence (needs Postgres)")
+    parser.add_argument("--out", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed p50 slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write results as the new baseline")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.rows, args.columns, args.repeats, args.db)
+    print_report(report)
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {args.out}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        logger.warning(f"No baseline at {args.baseline}; skipping regression check")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+    for reg in regressions:
+        logger.error(f"REGRESSION rows={reg['rows']} extra_columns={reg['extra_columns']} {reg['stage']}: "
+                     f"{reg['baseline_p50_ms']}ms -> {reg['p50_ms']}ms (+{reg['change']:.0%})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,90 +1,173 @@
 import argparse
+import importlib
 import sys
 import os
-import uuid
-import pandas as pd # For reading to pass to validation
-from drg.ingest.generator import generate_and_save
-from drg.contracts.loader import load_contract
-from drg.validation.core import run_validations
-from drg.policy.engine import enforce_policy, register_run, save_check_result, is_gate_open
-from drg.replay.manager import replay_run
-from drg.downstream.job import run_downstream_job
+import json
+import time
 from drg.utils import logger
+from drg import metrics, trace
+
+# Subcommands import what they use inside main(); `status` and `downstream run` only
+# need the DB layer, so pandas/numpy/pyarrow never load for them.
+# Mirrors of validation constants (tests/test_cli.py keeps them in sync)
+MODES = ("memory", "arrow", "stream", "metadata")
+DEFAULT_BATCH_SIZE = 65536
+
+# Names this module used to re-export eagerly; resolved on first access
+_LAZY_EXPORTS = {
+    "generate_and_save": "drg.ingest.generator",
+    "load_contract": "drg.contracts.loader",
+    "run_validations": "drg.validation.core",
+    "validate_file": "drg.validation.runner",
+    "enforce_policy": "drg.policy.engine",
+    "register_run": "drg.policy.engine",
+    "save_check_result": "drg.policy.engine",
+    "commit_run": "drg.policy.engine",
+    "is_gate_open": "drg.policy.engine",
+    "replay_run": "drg.replay.manager",
+    "run_downstream_job": "drg.downstream.job",
+    "health_check": "drg.db",
+}
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
+
+def _timestamp(value: str):
+    from datetime import datetime
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO timestamp: {value!r}")
 
 def setup_parser():
     parser = argparse.ArgumentParser(description="Data Reliability Guardrails (DRG) CLI")
     subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Tracing, for the commands that validate
+    profiling = argparse.ArgumentParser(add_help=False)
+    profiling.add_argument("--profile", type=str, nargs="?", const="", metavar="TRACE_JSON",
+                           help=f"Write a Chrome trace of contract load, reads, checks and DB calls (default: {trace.TRACE_DIR}/<command>-<time>.json)")
+    profiling.add_argument("--profile-capture", type=str, nargs="+", choices=trace.CAPTURES, default=[],
+                           help="With --profile: also cProfile (cpu) and/or tracemalloc (memory) each stage")
     
     # Ingest
     cmd_ingest = subparsers.add_parser("ingest", help="Generate/Ingest data")
     cmd_ingest.add_argument("--run-id", type=str, required=True, help="Unique run identifier")
     cmd_ingest.add_argument("--output", type=str, default="data/raw", help="Output directory")
     cmd_ingest.add_argument("--inject", type=str, help="Failure scenario to inject")
-    cmd_ingest.add_argument("--seed", type=int, default=42, help="Random seed")
+    cmd_ingest.add_argument("--seed", type=int, default=None, help="Random seed (default: derived from --run-id)")
+    cmd_ingest.add_argument("--rows", type=int, default=1000, help="Rows to generate (large counts are written as parallel row-group chunks)")
+    cmd_ingest.add_argument("--workers", type=int, default=None, help="Generator processes for large --rows (default: CPU count)")
     
     # Validate
-    cmd_validate = subparsers.add_parser("validate", help="Validate dataset against contract")
-    cmd_validate.add_argument("--run-id", type=str, required=True, help="Unique run identifier")
+    cmd_validate = subparsers.add_parser("validate", parents=[profiling], help="Validate dataset against contract")
+    target = cmd_validate.add_mutually_exclusive_group(required=True)
+    target.add_argument("--run-id", type=str, help="Unique run identifier")
+    target.add_argument("--batch", type=str, nargs="+", help="Directories, globs, .parquet paths or run IDs to validate in parallel")
+    cmd_validate.add_argument("--workers", type=int, default=None, help="Worker processes for --batch (default: CPU count)")
     cmd_validate.add_argument("--contract", type=str, default="config/contract.yaml", help="Path to contract")
+    cmd_validate.add_argument("--mode", type=str, choices=MODES, default="memory", help="memory: load the checked columns; arrow: same, as one memory-mapped Arrow table; stream: bounded-memory record batches; metadata: footer stats first")
+    cmd_validate.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per record batch in stream mode")
+    cmd_validate.add_argument("--no-cache", action="store_true", help="Re-check even if file, contract and reference are unchanged")
+    cmd_validate.add_argument("--incremental", action="store_true", help="With --batch: validate only new/changed partitions, then check freshness, volume and gaps across all of them")
     
     # Status (simple gate check)
     cmd_status = subparsers.add_parser("status", help="Check gate status")
+    cmd_status.add_argument("--health", action="store_true", help="Also print DB health and pool counters")
     
     # Downstream
     cmd_downstream = subparsers.add_parser("downstream", help="Run downstream job")
     sub_down = cmd_downstream.add_subparsers(dest="action", required=True)
     down_run = sub_down.add_parser("run", help="Execute job")
     down_run.add_argument("--run-id", type=str, required=True)
+    down_run.add_argument("--wait", action="store_true", help="Block until the gate opens (LISTEN/NOTIFY, polling fallback)")
+    down_run.add_argument("--timeout", type=float, default=3600.0, help="Seconds to wait with --wait before giving up")
     
     # Replay
-    cmd_replay = subparsers.add_parser("replay", help="Replay/Fix a run")
-    cmd_replay.add_argument("--run-id", type=str, required=True)
+    cmd_replay = subparsers.add_parser("replay", parents=[profiling], help="Replay/Fix a run")
+    replay_target = cmd_replay.add_mutually_exclusive_group(required=True)
+    replay_target.add_argument("--run-id", type=str, help="Run to replay")
+    replay_target.add_argument("--failed", action="store_true", help="Replay every FAILED run (narrow with --check/--since/--until)")
     cmd_replay.add_argument("--fix", type=str, help="Scenario to apply (use 'clean' to fix failures)")
+    cmd_replay.add_argument("--check", type=str, help="With --failed: only runs whose latest results failed this check")
+    cmd_replay.add_argument("--since", type=_timestamp, help="With --failed: runs created at or after this ISO timestamp")
+    cmd_replay.add_argument("--until", type=_timestamp, help="With --failed: runs created before this ISO timestamp")
+    cmd_replay.add_argument("--workers", type=int, default=None, help="Worker processes for --failed (default: CPU count)")
+    cmd_replay.add_argument("--contract", type=str, default="config/contract.yaml", help="Path to contract")
+    cmd_replay.add_argument("--mode", type=str, choices=MODES, default="memory", help="Validation mode (see validate)")
+    cmd_replay.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per record batch in stream mode")
+
+    # Serve
+    cmd_serve = subparsers.add_parser("serve", parents=[profiling], help="Run the validation service (warm contracts, reference and DB pool); a --profile trace is written at shutdown")
+    cmd_serve.add_argument("--contract", type=str, default="config/contract.yaml", help="Default contract (requests may name another)")
+    cmd_serve.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+    cmd_serve.add_argument("--port", type=int, default=8765, help="TCP port")
+    cmd_serve.add_argument("--socket", type=str, help="Listen on this Unix socket instead of TCP")
+    cmd_serve.add_argument("--workers", type=int, default=None, help="Validation threads (default: CPU count)")
+    cmd_serve.add_argument("--max-pending", type=int, default=None, help="Requests allowed to wait for a worker before 503 (default: 4 x workers)")
+    cmd_serve.add_argument("--mode", type=str, choices=MODES, default="memory", help="Default validation mode (see validate)")
+    cmd_serve.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per record batch in stream mode")
+    cmd_serve.add_argument("--no-cache", action="store_true", help="Never serve validations from the result cache")
+    cmd_serve.add_argument("--data-root", type=str, action="append", help="Directory a request's `path` may point into (repeatable; default: data/raw)")
+    cmd_serve.add_argument("--contract-root", type=str, action="append", help="Directory a request's `contract` may point into (repeatable; default: the --contract directory)")
 
     # Init/Reference
     cmd_init = subparsers.add_parser("init", help="Initialize reference data")
+    cmd_init.add_argument("--contract", type=str, default="config/contract.yaml", help="Contract whose columns get profiled")
 
     return parser
 
 def main():
     parser = setup_parser()
     args = parser.parse_args()
+    if getattr(args, "incremental", False) and not args.batch:
+        parser.error("--incremental requires --batch")
+    if os.environ.get(metrics.HTTP_PORT_ENV):
+        metrics.start_http_exporter()
+    profile = getattr(args, "profile", None)
+    if profile is not None or trace.enabled():
+        trace.enable_from_env(args.command, profile or None, getattr(args, "profile_capture", None))
+    started = time.perf_counter()
     
     try:
         if args.command == "ingest":
-            fpath = generate_and_save(args.output, args.run_id, args.inject, args.seed)
+            from drg.ingest.generator import generate_and_save, run_seed
+            from drg.policy.engine import register_run
+            seed = args.seed if args.seed is not None else run_seed(args.run_id)
+            fpath = generate_and_save(args.output, args.run_id, args.inject, seed, rows=args.rows, workers=args.workers)
             # Register run in DB
-            register_run(args.run_id, fpath)
+            register_run(args.run_id, fpath, files=[fpath])
             print(f"Ingested: {fpath}")
             
         elif args.command == "validate":
-            # 1. Load Contract
-            contract = load_contract(args.contract)
+            from drg.contracts.compiler import load_plan
+            from drg.validation.batch import resolve_batch
+            from drg.validation.cache import ResultCache
+            from drg.pipeline import validate_run, validate_runs, validate_dataset
+            # 1. Load Contract (compiled plan, cached on disk by contract hash)
+            contract = load_plan(args.contract)
+            cache = None if args.no_cache else ResultCache()
             
-            # 2. Determine File Path (naive assumption: predictable name)
-            # In real system, look up run_id in DB to get path? 
-            # Or pass path as arg? Design doc said 'dataset_id / dataset_path'.
-            # I'll rely on convention used in ingest: data/raw/rides_{run_id}.parquet
-            fpath = f"data/raw/rides_{args.run_id}.parquet"
-            if not os.path.exists(fpath):
-                logger.error(f"Data file not found: {fpath}")
-                sys.exit(1)
-                
-            # 3. Read Data
-            logger.info(f"Reading {fpath}...")
-            df = pd.read_parquet(fpath)
+            if args.batch and args.incremental:
+                # Only new/changed partitions are scanned; dataset checks come from the watermark index
+                outcome, dataset = validate_dataset(resolve_batch(args.batch), contract, args.mode, args.batch_size, args.workers, cache)
+                sys.exit(0 if all(outcome.values()) and all(r.passed for r in dataset) else 1)
             
-            # 4. Run Validations
-            logger.info("Running validations...")
-            results = run_validations(df, contract)
+            if args.batch:
+                # Fan out across processes; results come back (and are committed) in input order
+                outcome = validate_runs(resolve_batch(args.batch), contract, args.mode, args.batch_size, args.workers, cache)
+                sys.exit(0 if all(outcome.values()) else 1)
             
-            # 5. Save Results & Enforce Policy
-            for r in results:
-                save_check_result(args.run_id, r.check_name, r.passed, r.metric, r.details)
-                status = "PASS" if r.passed else "FAIL"
-                logger.info(f"Check {r.check_name}: {status} (Val: {r.metric})")
-                
-            passed = enforce_policy(args.run_id, results)
+            # 2. Validate the file the run recorded at ingest (or, if the contract has a
+            #    `source`, its current window), then save results & enforce policy in one transaction
+            try:
+                passed = validate_run(args.run_id, contract, args.mode, args.batch_size, cache)
+            except FileNotFoundError as e:
+                logger.error(str(e))
+                sys.exit(1)
             
             if passed:
                 logger.info("Validation PASSED. Gate OPEN.")
@@ -94,35 +177,66 @@ def main():
                 sys.exit(1)
 
         elif args.command == "status":
+            from drg.policy.engine import is_gate_open
             open = is_gate_open()
             print("GATE IS " + ("OPEN" if open else "BLOCKED"))
+            if args.health:
+                from drg.db import health_check
+                print(json.dumps(health_check(), indent=2))
             
         elif args.command == "downstream":
             if args.action == "run":
-                run_downstream_job(args.run_id)
+                from drg.downstream.job import run_downstream_job
+                run_downstream_job(args.run_id, wait=args.wait, timeout=args.timeout)
 
         elif args.command == "replay":
-            success = replay_run(args.run_id, args.fix)
-            if success:
-                # Auto-trigger validation? User story says "rerun validation... and then unblocking".
-                # It's better UX to just run it. But CLI args parsing for 'validate' is separate.
-                # I'll instantiate arguments and call main logic or use subprocess?
-                # Calling subprocess is safer for clean state.
-                cmd = f"{sys.executable} -m drg.cli validate --run-id {args.run_id}"
-                logger.info(f"Triggering validation: {cmd}")
-                os.system(cmd)
+            from drg.contracts.compiler import load_plan
+            from drg.replay.manager import find_failed_runs, replay_and_validate, replay_runs
+            # Re-validation runs in this process through the validate code path, and never
+            # serves cached results: a replay must re-check.
+            contract = load_plan(args.contract)
+            if args.failed:
+                run_ids = find_failed_runs(args.check, args.since, args.until)
+                logger.info(f"Replaying {len(run_ids)} failed run(s).")
+                outcome = replay_runs(run_ids, contract, args.fix, args.mode, args.batch_size, args.workers)
+                passed = all(outcome.values())
+            else:
+                passed = replay_and_validate(args.run_id, contract, args.fix, args.mode, args.batch_size)
+            sys.exit(0 if passed else 1)
+
+        elif args.command == "serve":
+            import asyncio
+            from drg.service import ValidationService, serve
+            service = ValidationService(args.contract, args.workers, args.max_pending, args.mode, args.batch_size,
+                                        cache=not args.no_cache, data_roots=args.data_root,
+                                        contract_roots=args.contract_root)
+            asyncio.run(serve(service, args.host, args.port, args.socket))
 
         elif args.command == "init":
+            from drg.ingest.generator import generate_and_save
+            from drg.contracts.loader import load_contract
+            from drg.validation.reference import build_reference_profile, write_reference_profile, profile_columns, profile_path_for, DEFAULT_BUCKETS
             # Generate reference data
             logger.info("Generating reference dataset...")
             # generate_and_save produces "data/reference/rides_reference.parquet"
-            generate_and_save("data/reference", "reference", seed=123)
-            logger.info("Reference data ready.")
+            ref_path = generate_and_save("data/reference", "reference", seed=123)
+            
+            # Precompute the profile distribution checks read instead of the raw reference
+            contract = load_contract(args.contract)
+            buckets = contract.checks.get('distribution', {}).get('buckets', DEFAULT_BUCKETS)
+            profile = build_reference_profile(ref_path, profile_columns(contract), buckets)
+            write_reference_profile(profile)
+            logger.info(f"Reference data ready. Profile: {profile_path_for(ref_path)}")
 
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         # traceback.print_exc()
         sys.exit(1)
+    finally:
+        metrics.export_metrics(command=args.command)
+        if trace.enabled():
+            trace.complete(f"drg {args.command}", "cli", started, time.perf_counter() - started)
+            trace.write()
 
 if __name__ == "__main__":
     main()
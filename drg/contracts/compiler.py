@@ -0,0 +1,171 @@
+import os
+import json
+import pickle
+import hashlib
+import dataclasses
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+from drg.contracts.loader import Contract, load_contract
+from drg.validation.columns import ColumnRule, compile_rules
+from drg.validation.drift import resolve_drift_columns, NUMERIC_TYPES
+from drg.validation.reference import load_reference_profile, DEFAULT_BUCKETS
+from drg.validation.sampling import SampleSpec, sample_spec
+from drg.utils import logger
+from drg import metrics
+
+# Bump whenever ValidationPlan's shape or the compile rules change; old pickles then miss
+PLAN_VERSION = 5
+PLAN_CACHE_DIR = os.environ.get("DRG_PLAN_CACHE_DIR", "data/cache/plans")
+MEMO_SIZE = 64
+
+# Defaults the check functions fall back to; compiled into every plan
+CHECK_DEFAULTS = {
+    'volume': {'min_rows': 0, 'max_rows': float('inf')},
+    'freshness': {'max_delay_hours': 24},
+    'distribution': {'threshold': 0.2, 'buckets': DEFAULT_BUCKETS},
+    'uniqueness': {'column': 'ride_id', 'false_positive_rate': 0.001, 'capacity': 10_000_000, 'max_duplicates': 0},
+    'baseline': {'runs': 20, 'min_runs': 3, 'ks': 0.2, 'relative_accuracy': 0.01, 'hll_precision': 12},
+}
+
+@dataclass(frozen=True)
+class CheckSpec:
+    name: str
+    thresholds: Dict[str, Any]  # read-only by convention (plans are shared and pickled)
+
+@dataclass(frozen=True)
+class DriftSpec:
+    primary: str
+    limits: Dict[str, Dict[str, float]]
+    scored: Tuple[str, ...]
+    sample: Optional[SampleSpec] = None  # None: histogram every row
+
+@dataclass(frozen=True)
+class ReferenceHandle:
+    path: str
+    columns: Tuple[str, ...]
+    buckets: int
+
+    def profile(self) -> dict:
+        """The precomputed reference profile (in-process cached, rebuilt if the reference changed)."""
+        return load_reference_profile(self.path, list(self.columns), self.buckets)
+
+@dataclass(frozen=True)
+class ValidationPlan:
+    """
+    A contract compiled once: thresholds resolved with their defaults, checks in run
+    order, the columns any check reads, column rules, drift limits and the reference.
+    `checks_config` has the same shape as Contract.checks, so check functions take either.
+    """
+    contract_hash: str
+    contract: Contract
+    checks: Tuple[CheckSpec, ...]
+    checks_config: Dict[str, Dict[str, Any]]
+    columns: Tuple[str, ...]
+    column_rules: Tuple[ColumnRule, ...]
+    drift: Optional[DriftSpec]
+    reference: Optional[ReferenceHandle]
+
+    def check(self, name: str) -> Optional[CheckSpec]:
+        return next((c for c in self.checks if c.name == name), None)
+
+ContractLike = Union[Contract, ValidationPlan]
+
+def contract_hash(contract: Contract) -> str:
+    return hashlib.sha256(json.dumps(dataclasses.asdict(contract), sort_keys=True, default=str).encode()).hexdigest()
+
+def compile_contract(contract: Contract, digest: str = None) -> ValidationPlan:
+    checks = {name: dict(CHECK_DEFAULTS.get(name, {}), **(section or {})) for name, section in contract.checks.items()}
+    for name in ('volume', 'freshness'):
+        checks.setdefault(name, dict(CHECK_DEFAULTS[name]))
+
+    specs = [CheckSpec("schema_presence", {}),
+             CheckSpec("columns", dict(checks.get('nulls', {}))),
+             CheckSpec("volume", checks['volume']),
+             CheckSpec("freshness", checks['freshness'])]
+    columns = [f.name for f in contract.schema]
+    if 'uniqueness' in checks:
+        specs.append(CheckSpec("uniqueness", checks['uniqueness']))
+        if checks['uniqueness']['column'] not in columns:
+            columns.append(checks['uniqueness']['column'])
+    if 'baseline' in checks:
+        # Sketched columns default to every numeric schema column
+        checks['baseline']['columns'] = list(checks['baseline'].get('columns') or
+                                             [f.name for f in contract.schema if f.type in NUMERIC_TYPES])
+        columns += [c for c in checks['baseline']['columns'] if c not in columns]
+    drift = reference = None
+    if 'distribution' in checks:
+        config = checks['distribution']
+        specs.append(CheckSpec("distribution", config))
+        primary, limits, scored = resolve_drift_columns(config, contract.schema)
+        drift = DriftSpec(primary, limits, tuple(scored), sample_spec(config))
+        columns += [c for c in scored if c not in columns]
+        if config.get('reference_path'):
+            reference = ReferenceHandle(config['reference_path'], tuple(scored), config['buckets'])
+    if 'baseline' in checks:
+        specs.append(CheckSpec("sketches", checks['baseline']))
+
+    return ValidationPlan(
+        contract_hash=digest or contract_hash(contract),
+        contract=contract,
+        checks=tuple(specs),
+        checks_config=checks,
+        columns=tuple(columns),
+        column_rules=tuple(compile_rules(contract.schema, checks)),
+        drift=drift,
+        reference=reference,
+    )
+
+_memo: Dict[Any, ValidationPlan] = {}
+_memo_lock = threading.Lock()
+
+def _remember(key, plan: ValidationPlan) -> ValidationPlan:
+    with _memo_lock:
+        if len(_memo) >= MEMO_SIZE:
+            _memo.pop(next(iter(_memo)))
+        _memo[key] = plan
+    return plan
+
+def plan_for(contract: ContractLike) -> ValidationPlan:
+    """Plan for an in-memory contract, memoized by content (contracts are mutable, so not by identity)."""
+    if isinstance(contract, ValidationPlan):
+        return contract
+    digest = contract_hash(contract)
+    plan = _memo.get(("contract", digest))
+    return plan if plan is not None else _remember(("contract", digest), compile_contract(contract, digest))
+
+def load_plan(path: str, cache_dir: str = PLAN_CACHE_DIR) -> ValidationPlan:
+    """
+    Compiled plan for a contract file. Memoized per (path, mtime, size) in-process and
+    pickled under cache_dir keyed by the YAML's hash, so a new process skips YAML parsing.
+    The pickles are local build artefacts: don't point cache_dir at untrusted storage.
+    """
+    with metrics.stage("contract"):
+        st = os.stat(path)
+        memo_key = ("file", os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        plan = _memo.get(memo_key)
+        if plan is not None:
+            return plan
+
+        with open(path, "rb") as f:
+            source_hash = hashlib.sha256(f.read()).hexdigest()
+        pickle_path = os.path.join(cache_dir, f"{source_hash}.v{PLAN_VERSION}.pickle")
+        try:
+            with open(pickle_path, "rb") as f:
+                plan = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            plan = compile_contract(load_contract(path))
+            _write_plan(plan, pickle_path)
+
+        _remember(("contract", plan.contract_hash), plan)
+        return _remember(memo_key, plan)
+
+def _write_plan(plan: ValidationPlan, pickle_path: str):
+    tmp = f"{pickle_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(pickle_path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            pickle.dump(plan, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, pickle_path)
+    except OSError as e:
+        logger.warning(f"Could not cache compiled plan: {e}")
@@ -10,6 +10,18 @@ class SchemaField:
     required: bool = False
     min: Optional[float] = None
     max: Optional[float] = None
+    max_null_fraction: Optional[float] = None
+
+@dataclass
+class SourceSpec:
+    """A directory dataset (e.g. hive-partitioned <path>/dt=2026-10-17/part-0.parquet) instead of one file per run."""
+    path: str
+    partitioning: Optional[str] = "hive"
+    partition_column: Optional[str] = None  # string date key used to prune by window
+    partition_format: str = "%Y-%m-%d"      # must sort like the dates it encodes
+    timestamp_column: str = "pickup_datetime"
+    window_hours: Optional[float] = None    # a run covers [now - window_hours, now]; None = everything
+    filters: Optional[List[Any]] = None     # [[column, op, value], ...] pushed down into the scan
 
 @dataclass
 class Contract:
@@ -17,6 +29,7 @@ class Contract:
     owner: str
     schema: List[SchemaField]
     checks: Dict[str, Any]
+    source: Optional[SourceSpec] = None
 
 def load_contract(path: str) -> Contract:
     if not os.path.exists(path):
@@ -32,12 +45,14 @@ def load_contract(path: str) -> Contract:
             type=field['type'],
             required=field.get('required', False),
             min=field.get('min'),
-            max=field.get('max')
+            max=field.get('max'),
+            max_null_fraction=field.get('max_null_fraction')
         ))
         
     return Contract(
         dataset_id=data['dataset_id'],
         owner=data.get('owner', 'unknown'),
         schema=schema_fields,
-        checks=data.get('checks', {})
+        checks=data.get('checks', {}),
+        source=SourceSpec(**data['source']) if data.get('source') else None
     )
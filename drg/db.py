@@ -1,8 +1,14 @@
 import os
 import time
+import random
+import atexit
+import threading
 import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2.extensions import connection as pg_connection
 from psycopg2.extras import RealDictCursor
 from contextlib import contextmanager
+from drg import metrics, trace
 
 # Default config for local docker-compose
 DB_CONFIG = {
@@ -13,32 +19,238 @@ DB_CONFIG = {
     "port": "5432"
 }
 
-def get_connection(retries=5, delay=2):
-    """Establish a database connection with retries."""
+# Pool sizing. Keep DRG_DB_POOL_MAX x (processes) below Postgres max_connections.
+POOL_CONFIG = {
+    "minconn": int(os.environ.get("DRG_DB_POOL_MIN", "1")),
+    "maxconn": int(os.environ.get("DRG_DB_POOL_MAX", "8")),
+}
+
+# Retry backoff: exponential with full jitter, capped
+RETRY_BASE_DELAY = 0.1
+RETRY_MAX_DELAY = 2.0
+
+# Statement text kept on each trace span
+TRACE_QUERY_CHARS = 500
+
+# Pooled connections idle longer than this are pinged before being handed out
+HEALTHCHECK_IDLE_SECONDS = float(os.environ.get("DRG_DB_HEALTHCHECK_IDLE", "30"))
+
+class PooledConnection(pg_connection):
+    """Connection that remembers which statements are PREPAREd in its server session."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.last_used = time.monotonic()
+
+    def is_healthy(self) -> bool:
+        if self.closed:
+            return False
+        if time.monotonic() - self.last_used < HEALTHCHECK_IDLE_SECONDS:
+            return True
+        try:
+            with self.cursor() as cur:
+                cur.execute("SELECT 1")
+            self.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+class InstrumentedCursor(RealDictCursor):
+    """Dict rows; every statement counts as one round-trip in drg.metrics and is a trace span."""
+    def execute(self, query, vars=None):
+        if not metrics.enabled() and not trace.enabled():
+            return super().execute(query, vars)
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            seconds = time.perf_counter() - t0
+            if metrics.enabled():
+                metrics.record_db_roundtrip(seconds)
+            if trace.enabled():
+                text = _query_text(query, self)
+                trace.complete(_statement_name(text), "db", t0, seconds, {"query": text[:TRACE_QUERY_CHARS]})
+
+def _query_text(query, cursor=None) -> str:
+    if isinstance(query, bytes):
+        return query.decode()
+    if cursor is not None and hasattr(query, "as_string"):  # psycopg2.sql.Composable
+        return query.as_string(cursor)
+    return str(query)
+
+def _statement_name(text: str) -> str:
+    """'EXECUTE <prepared name>' or the leading keyword(s), e.g. 'SELECT FROM pipeline_runs'."""
+    words = text.split()
+    if not words:
+        return "db"
+    head = words[0].upper()
+    if head in ("EXECUTE", "PREPARE") and len(words) > 1:
+        return f"{head} {words[1].split('(')[0]}"
+    if head in ("INSERT", "DELETE") and len(words) > 2:
+        return f"{head} {words[1].upper()} {words[2].split('(')[0]}"
+    if head == "UPDATE" and len(words) > 1:
+        return f"UPDATE {words[1]}"
+    if head == "SELECT":
+        upper = [w.upper() for w in words]
+        source = words[upper.index("FROM") + 1] if "FROM" in upper[:-1] else "("
+        if not source.startswith("("):
+            return f"SELECT FROM {source.rstrip(';')}"
+    return head
+
+# name -> SQL with $1..$n placeholders. Registered by the modules that own the queries.
+PREPARED_STATEMENTS = {}
+
+_pool = None
+_pool_pid = None
+_slots = None
+_lock = threading.Lock()
+_stats = {"checkouts": 0, "in_use": 0, "created": 0, "discarded": 0, "errors": 0, "retries": 0, "waits": 0}
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def _count(key: str, n: int = 1):
+    with _lock:
+        _stats[key] += n
+
+def get_connection(retries=5, delay=None):
+    """Establish a dedicated (unpooled) database connection with jittered retries."""
     for i in range(retries):
         try:
-            conn = psycopg2.connect(**DB_CONFIG)
+            conn = psycopg2.connect(connection_factory=PooledConnection, **DB_CONFIG)
+            _count("created")
             return conn
         except psycopg2.OperationalError as e:
+            _count("errors")
             if i == retries - 1:
                 raise e
-            time.sleep(delay)
+            _count("retries")
+            time.sleep(delay if delay is not None else backoff_delay(i))
+
+class CountingPool(pg_pool.ThreadedConnectionPool):
+    def __init__(self, maxconn, **kwargs):
+        super().__init__(0, maxconn, **kwargs)
+        # psycopg2 only keeps `minconn` idle connections: open lazily, but keep up to maxconn
+        self.minconn = maxconn
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        _count("created")
+        return conn
+
+    def idle(self) -> int:
+        return len(self._pool)
+
+def get_pool() -> CountingPool:
+    """Process-wide pool, rebuilt after fork so sockets are never shared between processes."""
+    global _pool, _pool_pid, _slots
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # Connections are opened on demand (with retries); warm_pool() pre-opens minconn
+            _pool = CountingPool(POOL_CONFIG["maxconn"], connection_factory=PooledConnection, **DB_CONFIG)
+            _slots = threading.BoundedSemaphore(POOL_CONFIG["maxconn"])
+            _pool_pid = os.getpid()
+    return _pool
+
+def warm_pool():
+    """Open minconn connections up front (long-running processes)."""
+    conns = [_checkout() for _ in range(POOL_CONFIG["minconn"])]
+    for conn in conns:
+        _checkin(conn)
+
+def close_pool():
+    global _pool
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+
+atexit.register(close_pool)
+
+def _checkout(retries=5):
+    pool = get_pool()
+    if not _slots.acquire(blocking=False):
+        # Pool exhausted: wait for a slot instead of failing like ThreadedConnectionPool would
+        _count("waits")
+        _slots.acquire()
+    for i in range(retries):
+        try:
+            conn = pool.getconn()
+            if not conn.is_healthy():
+                pool.putconn(conn, close=True)
+                _count("discarded")
+                continue
+            _count("checkouts")
+            _count("in_use")
+            return conn
+        except psycopg2.OperationalError:
+            _count("errors")
+            if i == retries - 1:
+                _slots.release()
+                raise
+            _count("retries")
+            time.sleep(backoff_delay(i))
+    _slots.release()
+    raise psycopg2.OperationalError("Could not obtain a healthy pooled connection")
+
+def _checkin(conn, close=False):
+    close = close or bool(conn.closed)
+    conn.last_used = time.monotonic()
+    try:
+        get_pool().putconn(conn, close=close)
+    finally:
+        if close:
+            _count("discarded")
+        _count("in_use", -1)
+        _slots.release()
 
 @contextmanager
-def get_db_cursor(commit=False):
-    """Context manager for database cursor."""
-    conn = get_connection()
+def pooled_connection():
+    """Borrow a connection; broken connections are discarded rather than returned."""
+    conn = _checkout()
+    broken = False
     try:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        yield cur
-        if commit:
-            conn.commit()
-    except Exception:
-        conn.rollback()
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
         raise
     finally:
-        cur.close()
-        conn.close()
+        _checkin(conn, close=broken)
+
+@contextmanager
+def get_db_cursor(commit=False):
+    """Context manager for database cursor."""
+    with pooled_connection() as conn:
+        cur = conn.cursor(cursor_factory=InstrumentedCursor)
+        try:
+            yield cur
+            if commit:
+                conn.commit()
+        except Exception:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass # connection is gone; pooled_connection discards it
+            raise
+        finally:
+            cur.close()
+
+def register_statement(name: str, sql: str):
+    """Declare a hot query to be PREPAREd lazily on each pooled connection."""
+    PREPARED_STATEMENTS[name] = sql
+
+def execute_prepared(cur, name: str, params=None):
+    conn = cur.connection
+    if name not in conn.prepared:
+        cur.execute(f"PREPARE {name} AS {PREPARED_STATEMENTS[name]}")
+        conn.prepared.add(name)
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
 
 def fetch_one(query, params=None):
     with get_db_cursor() as cur:
@@ -53,3 +265,26 @@ def fetch_all(query, params=None):
 def execute_query(query, params=None):
     with get_db_cursor(commit=True) as cur:
         cur.execute(query, params)
+
+def fetch_one_prepared(name: str, params=None):
+    with get_db_cursor() as cur:
+        execute_prepared(cur, name, params)
+        return cur.fetchone()
+
+def health_check() -> dict:
+    """Round-trips SELECT 1 through the pool. Never raises."""
+    t0 = time.perf_counter()
+    try:
+        with get_db_cursor() as cur:
+            cur.execute("SELECT 1 AS ok")
+            ok = cur.fetchone()["ok"] == 1
+    except psycopg2.Error as e:
+        return {"ok": False, "error": str(e), **pool_stats()}
+    return {"ok": ok, "latency_ms": round((time.perf_counter() - t0) * 1000, 3), **pool_stats()}
+
+def pool_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+    stats.update({"size_min": POOL_CONFIG["minconn"], "size_max": POOL_CONFIG["maxconn"],
+                  "idle": _pool.idle() if _pool is not None and _pool_pid == os.getpid() else 0})
+    return stats
@@ -1,12 +1,17 @@
 import sys
 import time
-from drg.policy.engine import is_gate_open
+from drg.policy.engine import is_gate_open, wait_for_gate_open
 from drg.utils import logger
 
-def run_downstream_job(run_id: str):
+def run_downstream_job(run_id: str, wait: bool = False, timeout: float = None):
     logger.info(f"Attempting to start downstream job for run {run_id}...")
     
-    if not is_gate_open():
+    if wait:
+        logger.info(f"Waiting up to {timeout}s for the gate to open...")
+        gate_open = wait_for_gate_open(timeout)
+    else:
+        gate_open = is_gate_open()
+    if not gate_open:
         logger.error("GATE IS BLOCKED. Downstream execution aborted.")
         sys.exit(1)
         
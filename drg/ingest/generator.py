@@ -1,40 +1,76 @@
 import sys
 import os
-import uuid
 import random
+import hashlib
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from drg.utils import logger
 
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# byte -> its two lowercase hex digits packed in a uint16, so one take() renders a whole UUID
+_HEX_LUT = np.frombuffer(b"".join(b"%02x" % i for i in range(256)), dtype=np.uint16)
+# (text slice, hex slice) for the 8-4-4-4-12 layout; the gaps are dashes
+_UUID_GROUPS = [((0, 8), (0, 8)), ((9, 13), (8, 12)), ((14, 18), (12, 16)), ((19, 23), (16, 20)), ((24, 36), (20, 32))]
+
+def run_seed(run_id: str) -> int:
+    """Deterministic per-run seed, so synthetic runs don't share ride IDs."""
+    return int(hashlib.sha256(run_id.encode()).hexdigest()[:8], 16)
+
+def random_uuid_text(rng: np.random.Generator, n: int) -> np.ndarray:
+    """n random (version 4) UUIDs from rng bytes, as an (n, 36) array of ASCII codes."""
+    raw = np.frombuffer(rng.bytes(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    hex_digits = _HEX_LUT.take(raw).view(np.uint8)
+    text = np.full((n, 36), ord("-"), dtype=np.uint8)
+    for (t0, t1), (h0, h1) in _UUID_GROUPS:
+        text[:, t0:t1] = hex_digits[:, h0:h1]
+    return text
+
 class DataGenerator:
-    def __init__(self, seed: int = 42):
+    def __init__(self, seed=42):
+        """seed: int, or a numpy SeedSequence (one per chunk when generating in parallel)."""
         self.seed = seed
         self.rng = np.random.default_rng(seed)
-        random.seed(seed)
-        
-    def generate_batch(self, num_rows: int = 1000, reference_date: datetime = None) -> pd.DataFrame:
-        """Generates a clean batch of ride data."""
-        
+        if isinstance(seed, int):
+            random.seed(seed)
+
+    def _columns(self, num_rows: int, reference_date: datetime = None) -> dict:
         # Determine reference time
-        now = reference_date if reference_date else datetime.now()
-        timestamps = [now - timedelta(minutes=int(x)) for x in self.rng.integers(0, 120, size=num_rows)]
+        now = np.datetime64(reference_date if reference_date else datetime.now(), 'ns')
+        pickup = now - self.rng.integers(0, 120, size=num_rows).astype('timedelta64[m]')
         
-        data = {
-            # Use smaller range for numpy capability or use python random for full 128 bit if needed.
-            # Using 2**63-1 is sufficient for uniqueness in this toy dataset.
-            'ride_id': [str(uuid.UUID(int=self.rng.integers(0, 2**63 - 1))) for _ in range(num_rows)],
+        return {
+            'ride_id': random_uuid_text(self.rng, num_rows),
             'vendor_id': self.rng.choice([1, 2], size=num_rows),
-            'pickup_datetime': timestamps,
-            'dropoff_datetime': [t + timedelta(minutes=int(self.rng.integers(5, 60))) for t in timestamps],
+            'pickup_datetime': pickup,
+            'dropoff_datetime': pickup + self.rng.integers(5, 60, size=num_rows).astype('timedelta64[m]'),
             'passenger_count': self.rng.choice([1, 2, 3, 4, 5, 6], size=num_rows, p=[0.7, 0.15, 0.05, 0.05, 0.02, 0.03]),
             'trip_distance': self.rng.exponential(2.5, size=num_rows).clip(0.1, 50.0),
             'fare_amount': self.rng.lognormal(2.5, 0.5, size=num_rows).clip(2.5, 500.0)
         }
         
+    def generate_batch(self, num_rows: int = 1000, reference_date: datetime = None) -> pd.DataFrame:
+        """Generates a clean batch of ride data."""
+        data = self._columns(num_rows, reference_date)
+        data['ride_id'] = data['ride_id'].view("S36").ravel().astype("U36").astype(object)
+        
         df = pd.DataFrame(data)
         return df
 
+    def generate_table(self, num_rows: int = 1000, reference_date: datetime = None) -> pa.Table:
+        """Same rows as generate_batch, built straight into Arrow (no per-row Python strings)."""
+        data = self._columns(num_rows, reference_date)
+        offsets = np.arange(0, 36 * (num_rows + 1), 36, dtype=np.int32)
+        data['ride_id'] = pa.StringArray.from_buffers(num_rows, pa.py_buffer(offsets), pa.py_buffer(data['ride_id']))
+        return pa.table(data)
+
     def inject_failure(self, df: pd.DataFrame, scenario: str) -> pd.DataFrame:
         """Injects specific data quality failures."""
         logger.info(f"Injecting failure scenario: {scenario}")
@@ -68,8 +104,67 @@ class DataGenerator:
             
         return df
 
-def generate_and_save(output_path: str, run_id: str, scenario: str = None, seed: int = 42, rows: int = 1000):
+def _generate_chunk(spec) -> pa.Table:
+    seed, rows, reference_date, scenario = spec
+    gen = DataGenerator(seed=seed)
+    if not scenario:
+        return gen.generate_table(num_rows=rows, reference_date=reference_date)
+    df = gen.inject_failure(gen.generate_batch(num_rows=rows, reference_date=reference_date), scenario)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def generate_to_parquet(filename: str, rows: int, scenario: str = None, seed: int = 42,
+                        chunk_rows: int = DEFAULT_CHUNK_ROWS, workers: int = None, reference_date: datetime = None) -> int:
+    """
+    Writes a large synthetic file as independent chunks, one Parquet row group each.
+    Chunk i is seeded from SeedSequence(seed).spawn(...)[i], so output depends only on
+    (seed, rows, chunk_rows), not on the worker count. At most 2 x workers chunks are in memory.
+    """
+    reference_date = reference_date or datetime.now()
+    sizes = [min(chunk_rows, rows - start) for start in range(0, rows, chunk_rows)]
+    specs = [(child, n, reference_date, scenario) for child, n in zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes)]
+    workers = min(workers or os.cpu_count() or 1, max(len(specs), 1))
+
+    writer = None
+    written = 0
+
+    def write(table: pa.Table):
+        nonlocal writer, written
+        if writer is None:
+            writer = pq.ParquetWriter(filename, table.schema)
+        else:
+            # Injected failures can change a column's dtype per chunk (e.g. nulls turn ints into floats)
+            table = table.cast(writer.schema)
+        writer.write_table(table, row_group_size=table.num_rows)
+        written += table.num_rows
+
+    try:
+        if workers <= 1:
+            for spec in specs:
+                write(_generate_chunk(spec))
+            return written
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for spec in specs:
+                pending.append(pool.submit(_generate_chunk, spec))
+                if len(pending) >= 2 * workers:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+def generate_and_save(output_path: str, run_id: str, scenario: str = None, seed: int = 42, rows: int = 1000,
+                      workers: int = None, chunk_rows: int = DEFAULT_CHUNK_ROWS):
     os.makedirs(output_path, exist_ok=True)
+    filename = f"{output_path}/rides_{run_id}.parquet"
+    
+    if rows > chunk_rows and scenario != 'missing_partition':
+        # Load-test sizes: parallel chunks streamed to row groups
+        written = generate_to_parquet(filename, rows, scenario, seed, chunk_rows, workers)
+        logger.info(f"Generated {written} rows to {filename}")
+        return filename
     
     gen = DataGenerator(seed=seed)
     df = gen.generate_batch(num_rows=rows)
@@ -77,7 +172,6 @@ def generate_and_save(output_path: str, run_id: str, scenario: str = None, seed:
     if scenario:
         df = gen.inject_failure(df, scenario)
     
-    filename = f"{output_path}/rides_{run_id}.parquet"
     df.to_parquet(filename, index=False)
     logger.info(f"Generated {len(df)} rows to {filename}")
     return filename
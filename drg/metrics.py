@@ -0,0 +1,168 @@
+import os
+import time
+import socket
+import threading
+from contextlib import contextmanager
+from drg.utils import logger
+from drg import trace
+
+# Exporters. The CLI is short-lived, so it pushes (Pushgateway) or writes a
+# node-exporter textfile on exit; long-running processes can serve HTTP instead.
+PUSHGATEWAY_ENV = "DRG_PUSHGATEWAY"        # e.g. localhost:9091
+TEXTFILE_ENV = "DRG_METRICS_TEXTFILE"      # e.g. /var/lib/node_exporter/drg.prom
+HTTP_PORT_ENV = "DRG_METRICS_PORT"         # e.g. 8000
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# prometheus_client is only imported once metrics are enabled, so instrumented
+# code paths cost a None check when no exporter is configured.
+_metrics = None
+_enabled = any(os.environ.get(k) for k in (PUSHGATEWAY_ENV, TEXTFILE_ENV, HTTP_PORT_ENV))
+_lock = threading.Lock()
+
+def enable():
+    """Turn instrumentation on regardless of environment (tests, long-running processes)."""
+    global _enabled
+    _enabled = True
+    return _get()
+
+def enabled() -> bool:
+    return _enabled
+
+def _get():
+    global _metrics
+    if _metrics is not None or not _enabled:
+        return _metrics
+    with _lock:
+        if _metrics is None:
+            from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+            registry = CollectorRegistry()
+            _metrics = {
+                "registry": registry,
+                "check_seconds": Histogram("drg_check_duration_seconds", "Time spent in each validation check",
+                                           ["check"], buckets=LATENCY_BUCKETS, registry=registry),
+                "stage_seconds": Histogram("drg_stage_duration_seconds", "Time spent in each pipeline stage",
+                                           ["stage"], buckets=LATENCY_BUCKETS, registry=registry),
+                "check_outcomes": Counter("drg_check_outcomes_total", "Validation check results",
+                                          ["check", "result"], registry=registry),
+                "rows_scanned": Counter("drg_rows_scanned_total", "Rows decoded by validation", ["mode"], registry=registry),
+                "bytes_scanned": Counter("drg_bytes_scanned_total", "Compressed Parquet bytes read by validation",
+                                         ["mode"], registry=registry),
+                "db_roundtrips": Counter("drg_db_roundtrips_total", "Statements sent to Postgres", registry=registry),
+                "db_seconds": Histogram("drg_db_roundtrip_seconds", "Postgres statement latency",
+                                        buckets=DB_BUCKETS, registry=registry),
+                "cache_lookups": Counter("drg_result_cache_lookups_total", "Validation result cache lookups",
+                                         ["result"], registry=registry),
+                "gate_transitions": Counter("drg_gate_transitions_total", "Downstream gate state changes",
+                                            ["to"], registry=registry),
+                "peak_rss": Gauge("drg_validation_peak_rss_bytes", "Peak resident memory of the latest validation",
+                                  ["mode"], registry=registry),
+            }
+    return _metrics
+
+@contextmanager
+def stage(name: str):
+    """Times a pipeline stage (contract, read, validate, persist, policy); also a trace span."""
+    m = _get()
+    if m is None and not trace.enabled():
+        yield
+        return
+    with trace.span(name, "stage"):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            if m is not None:
+                m["stage_seconds"].labels(name).observe(time.perf_counter() - t0)
+
+@contextmanager
+def check(name: str):
+    """Times one check; also a trace span."""
+    m = _get()
+    if m is None and not trace.enabled():
+        yield
+        return
+    with trace.span(name, "check"):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            if m is not None:
+                m["check_seconds"].labels(name).observe(time.perf_counter() - t0)
+
+def observe_check(name: str, seconds: float):
+    m = _get()
+    if m is not None:
+        m["check_seconds"].labels(name).observe(seconds)
+
+def record_results(results):
+    m = _get()
+    if m is not None:
+        for r in results:
+            m["check_outcomes"].labels(r.check_name, "pass" if r.passed else "fail").inc()
+
+def record_scan(mode: str, rows: int, nbytes: int):
+    m = _get()
+    if m is not None:
+        m["rows_scanned"].labels(mode).inc(rows)
+        m["bytes_scanned"].labels(mode).inc(nbytes)
+
+def record_peak_rss(mode: str, nbytes: int):
+    m = _get()
+    if m is not None:
+        m["peak_rss"].labels(mode).set(nbytes)
+
+def record_db_roundtrip(seconds: float):
+    m = _get()
+    if m is not None:
+        m["db_roundtrips"].inc()
+        m["db_seconds"].observe(seconds)
+
+def record_cache(result: str):
+    m = _get()
+    if m is not None:
+        m["cache_lookups"].labels(result).inc()
+
+def record_gate_transition(state: str):
+    m = _get()
+    if m is not None:
+        m["gate_transitions"].labels(state).inc()
+
+def parquet_bytes(metadata, columns=None) -> int:
+    """Compressed size of the column chunks a reader has to fetch (all columns if None)."""
+    total = 0
+    for i in range(metadata.num_row_groups):
+        rg = metadata.row_group(i)
+        for j in range(rg.num_columns):
+            chunk = rg.column(j)
+            if columns is None or chunk.path_in_schema in columns:
+                total += chunk.total_compressed_size
+    return total
+
+def start_http_exporter(port: int = None):
+    """Serve /metrics for scraping (long-running processes)."""
+    from prometheus_client import start_http_server
+    port = int(port or os.environ.get(HTTP_PORT_ENV, "8000"))
+    start_http_server(port, registry=enable()["registry"])
+    logger.info(f"Metrics exporter listening on :{port}")
+
+def export_metrics(job: str = "drg", command: str = None):
+    """Flush metrics for short-lived processes: textfile and/or Pushgateway. Never raises."""
+    m = _metrics
+    if m is None:
+        return
+    path = os.environ.get(TEXTFILE_ENV)
+    gateway = os.environ.get(PUSHGATEWAY_ENV)
+    try:
+        if path:
+            from prometheus_client import write_to_textfile
+            write_to_textfile(path, m["registry"])
+        if gateway:
+            from prometheus_client import push_to_gateway
+            grouping = {"instance": socket.gethostname()}
+            if command:
+                grouping["command"] = command
+            push_to_gateway(gateway, job=job, registry=m["registry"], grouping_key=grouping, timeout=5)
+    except Exception as e:
+        logger.warning(f"Could not export metrics: {e}")
@@ -0,0 +1,189 @@
+import os
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from drg.contracts.compiler import ContractLike, plan_for
+from drg.validation.base import ValidationResult
+from drg.validation.runner import validate_file
+from drg.validation.batch import RAW_DIR, validate_batch
+from drg.validation.cache import ResultCache
+from drg.validation.partitions import PartitionIndex, dataset_results
+from drg.validation.source import SourceScan, resolve_source, validate_source, scan_id_hashes
+from drg.validation.uniqueness import IdFilter, open_id_filter, read_id_hashes, history_result
+from drg.validation.sketches import SKETCHES_CHECK, baseline_result
+from drg.validation.streaming import DEFAULT_BATCH_SIZE
+from drg.policy.engine import commit_run, fetch_baseline_sketches, fetch_run_source, register_run
+from drg.utils import logger
+
+# Validate-and-record, shared by `validate`, `validate --batch` and `replay`
+
+def run_path(run_id: str, raw_dir: str = RAW_DIR) -> str:
+    """Ingest naming convention: <raw_dir>/rides_<run_id>.parquet"""
+    return f"{raw_dir}/rides_{run_id}.parquet"
+
+def recorded_target(run_id: str, row: Optional[dict] = None) -> Union[str, SourceScan]:
+    """
+    What a run read, as recorded in pipeline_runs: the SourceScan of a directory-dataset
+    run, else its one file. Runs recorded before paths were stored fall back to run_path.
+    `row` is the run's fetch_run_source row, if the caller already has it.
+    """
+    row = row or fetch_run_source(run_id)
+    if row and row["source_root"] is not None:
+        # Stored as timestamptz; the scan compares against naive event times again
+        start, end = (ts.replace(tzinfo=None) if ts is not None else None for ts in (row["window_start"], row["window_end"]))
+        return SourceScan(row["source_root"], tuple(row["source_files"] or ()), start, end)
+    if row and row["source_files"]:
+        return row["source_files"][0]
+    return run_path(run_id)
+
+def _source(target: Union[str, SourceScan]) -> dict:
+    if isinstance(target, SourceScan):
+        return {"files": list(target.files), "root": target.root, "window_start": target.start, "window_end": target.end}
+    return {"files": [target]}
+
+def commit_results(run_id: str, target: Union[str, SourceScan], results: List[ValidationResult], plan,
+            id_filter: Optional[IdFilter]) -> Tuple[bool, List[ValidationResult]]:
+    """
+    commit_run plus the checks that depend on history rather than just the data, so they
+    run here and never behind the result cache: cross-run uniqueness, and drift against
+    the merged sketches of recent passed runs. Records what was read (`target`) with the
+    results. A passed run's IDs are then added to the filter (the caller saves it).
+    Returns (passed, every result committed).
+    """
+    profile = next((r for r in results if r.check_name == SKETCHES_CHECK), None)
+    if profile is not None:
+        config = plan.check(SKETCHES_CHECK).thresholds
+        baseline = baseline_result(profile.details["columns"], fetch_baseline_sketches(run_id, config['runs']), plan.checks_config)
+        logger.info(f"Check {baseline.check_name}: {'PASS' if baseline.passed else 'FAIL'} (Val: {baseline.metric})")
+        results = results + [baseline]
+    hashes = None
+    if id_filter is not None:
+        column = plan.check('uniqueness').thresholds['column']
+        checked = next((r for r in results if r.check_name == "uniqueness" and hasattr(r, "id_hashes")), None)
+        if checked is not None:
+            hashes = checked.id_hashes  # hashed by the in-run check; a cache hit has none, so re-read
+        elif run_id in id_filter.runs:
+            pass  # history_result skips an indexed run: no need to read its IDs
+        elif isinstance(target, SourceScan):
+            hashes = scan_id_hashes(target, plan.contract.source, column)
+        else:
+            hashes = read_id_hashes(target, column)
+        history = history_result(hashes, run_id, id_filter, plan.checks_config)
+        logger.info(f"Check {history.check_name}: {'PASS' if history.passed else 'FAIL'} (Val: {history.metric})")
+        results = results + [history]
+    passed = commit_run(run_id, results, _source(target))
+    if passed and hashes is not None:
+        id_filter.add(hashes, run_id)
+    return passed, results
+
+def check_run(run_id: str, contract: ContractLike, mode: str = "memory", batch_size: int = DEFAULT_BATCH_SIZE,
+              cache: Optional[ResultCache] = None, path: str = None,
+              scan: Optional[SourceScan] = None) -> Tuple[Union[str, SourceScan], List[ValidationResult]]:
+    """
+    The data half of validate_run: resolves what to read and runs the checks, writing
+    nothing but the run row of a directory-dataset run. Returns (what was read, results).
+    """
+    plan = plan_for(contract)
+    target = scan or path
+    if target is None:
+        target = resolve_source(plan.contract.source) if plan.contract.source is not None else recorded_target(run_id)
+    if isinstance(target, SourceScan):
+        if plan.contract.source is None:
+            raise ValueError(f"Run {run_id} read a directory dataset; validate it with a contract that has a source")
+        logger.info(f"Validating {len(target.files)} files under {target.root} (mode={mode})...")
+        register_run(run_id, plan.contract.dataset_id)
+        results = validate_source(target, plan, mode=mode, batch_size=batch_size)
+    else:
+        if not os.path.exists(target):
+            raise FileNotFoundError(f"Data file not found: {target}")
+        logger.info(f"Validating {target} (mode={mode})...")
+        results = validate_file(target, plan, mode=mode, batch_size=batch_size, cache=cache)
+
+    for r in results:
+        status = "PASS" if r.passed else "FAIL"
+        logger.info(f"Check {r.check_name}: {status} (Val: {r.metric})")
+    return target, results
+
+def validate_run(run_id: str, contract: ContractLike, mode: str = "memory", batch_size: int = DEFAULT_BATCH_SIZE,
+                 cache: Optional[ResultCache] = None, path: str = None, scan: Optional[SourceScan] = None) -> bool:
+    """
+    Validates one run and records results, what it read, run status, incident and gate in
+    one transaction. Reads `scan` or `path` if given. Otherwise a contract with a `source`
+    scans its current window, and any other contract re-reads what the run recorded.
+    Returns True if the run passed. Raises FileNotFoundError if the data file is missing.
+    """
+    plan = plan_for(contract)
+    target, results = check_run(run_id, plan, mode, batch_size, cache, path, scan)
+    id_filter = open_id_filter(plan)
+    passed, _ = commit_results(run_id, target, results, plan, id_filter)
+    if id_filter is not None:
+        id_filter.save()
+    return passed
+
+def validate_runs(pairs: List[Tuple[str, str]], contract: ContractLike, mode: str = "memory",
+                  batch_size: int = DEFAULT_BATCH_SIZE, workers: int = None,
+                  cache: Optional[ResultCache] = None,
+                  extra: Dict[str, List[ValidationResult]] = None,
+                  prepare: Optional[Callable[[str, str], None]] = None) -> Dict[str, Optional[bool]]:
+    """
+    Validates (run_id, path) pairs across a process pool and commits each run as it
+    completes, in input order. Missing or unreadable files and runs that can't be recorded
+    map to None.
+    `extra` results are committed (and go through policy) with the given run's own.
+    `prepare(run_id, path)` runs in the worker before the file is read (replay's regeneration).
+    """
+    extra = extra or {}
+    plan = plan_for(contract)
+    id_filter = open_id_filter(plan)
+    outcome = {}
+    try:
+        for run_id, fpath, results in validate_batch(pairs, plan, mode, batch_size, workers, cache, prepare):
+            if results is None:
+                outcome[run_id] = None  # missing or unreadable; validate_batch logged why
+                continue
+            try:
+                outcome[run_id], _ = commit_results(run_id, fpath, results + extra.get(run_id, []), plan, id_filter)
+            except Exception as e:
+                logger.error(f"Run {run_id}: could not record results: {e}")
+                outcome[run_id] = None
+                continue
+            logger.info(f"Run {run_id}: {'PASSED' if outcome[run_id] else 'FAILED'}")
+    finally:
+        if id_filter is not None:
+            id_filter.save()
+    logger.info(f"Batch complete: {sum(bool(v) for v in outcome.values())}/{len(pairs)} runs passed.")
+    return outcome
+
+def validate_dataset(pairs: List[Tuple[str, str]], contract: ContractLike, mode: str = "memory",
+                     batch_size: int = DEFAULT_BATCH_SIZE, workers: int = None,
+                     cache: Optional[ResultCache] = None,
+                     index: Optional[PartitionIndex] = None) -> Tuple[Dict[str, bool], List[ValidationResult]]:
+    """
+    Incremental batch. Only partitions the watermark index reports as new or changed are
+    validated; freshness, volume and gaps across all of `pairs` come from the index.
+    Dataset results are committed with the run of the newest changed partition.
+    Returns (outcome per validated run, dataset results).
+    """
+    index = index or PartitionIndex()
+    changed = set(index.changed([path for _, path in pairs]))
+    todo = [(run_id, path) for run_id, path in pairs if path in changed]
+    logger.info(f"{len(todo)}/{len(pairs)} partitions new or changed; skipping the rest.")
+
+    # Footer reads only; the data itself is scanned by the validation below
+    for _, path in todo:
+        index.update(path)
+    entries = [index.get(path) for _, path in pairs if index.get(path) is not None]
+    dataset = dataset_results(entries, plan_for(contract).checks_config)
+    for r in dataset:
+        logger.info(f"Dataset check {r.check_name}: {'PASS' if r.passed else 'FAIL'} (Val: {r.metric})")
+
+    extra = {}
+    indexed = [(run_id, index.get(path)) for run_id, path in todo if index.get(path) is not None]
+    if indexed:
+        newest = max(indexed, key=lambda item: item[1].max_ts or "")[0]
+        extra[newest] = dataset
+    outcome = validate_runs(todo, contract, mode, batch_size, workers, cache, extra)
+    for run_id, path in todo:
+        if outcome.get(run_id) is None:
+            index.entries.pop(os.path.abspath(path), None)  # not recorded: retry next time
+    index.prune()
+    index.save()
+    return outcome, dataset
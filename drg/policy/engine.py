@@ -1,78 +1,267 @@
 import json
-from datetime import datetime
+import math
+import time
+import base64
+import select
+import psycopg2
+from datetime import datetime, timezone
 from typing import Any
-from drg.db import execute_query, fetch_one
+from contextlib import contextmanager
+from psycopg2.extras import execute_values
+from drg.db import execute_query, fetch_one, get_db_cursor, get_connection, register_statement, execute_prepared, fetch_one_prepared
 from drg.utils import logger
+from drg import metrics
 
-def register_run(run_id: str, dataset_id: str):
+# Hot policy queries, PREPAREd once per pooled connection
+register_statement("drg_set_run_status", "UPDATE pipeline_runs SET status = $1, completed_at = NOW() WHERE run_id = $2")
+register_statement("drg_create_incident", """
+    INSERT INTO incidents (run_id, severity, status, summary)
+    SELECT $1::uuid, 'BLOCK', 'OPEN', $2::text
+    WHERE NOT EXISTS (SELECT 1 FROM incidents WHERE run_id = $1::uuid)
+    RETURNING incident_id
+""")
+register_statement("drg_resolve_incident", "UPDATE incidents SET status = 'RESOLVED', resolved_at = NOW() WHERE run_id = $1 AND status = 'OPEN'")
+# Returns the previous state so callers can tell a transition from a re-assertion
+register_statement("drg_set_gate", """
+    UPDATE downstream_gate g SET blocked = $1, reason = $2, updated_at = NOW()
+    FROM (SELECT blocked FROM downstream_gate WHERE gate_id = 1 FOR UPDATE) prev
+    WHERE g.gate_id = 1
+    RETURNING prev.blocked AS was_blocked
+""")
+register_statement("drg_gate_status", "SELECT blocked FROM downstream_gate WHERE gate_id = 1")
+# Delivered on commit, so listeners never see a gate change that rolls back
+register_statement("drg_notify_gate", "SELECT pg_notify($1, $2)")
+
+# LISTEN/NOTIFY channel for gate transitions; payload is {"blocked": bool, "reason": str}
+GATE_CHANNEL = "drg_gate"
+# Polling fallback when LISTEN is unavailable (e.g. behind a transaction-pooling proxy);
+# also how often a listener re-reads the gate in case a notification was lost
+GATE_POLL_INTERVAL = 5.0
+NOTIFY_REASON_LIMIT = 1000  # NOTIFY payloads must stay under 8000 bytes
+# Pseudo-result carrying a run's column sketches (drg.validation.sketches.SKETCHES_CHECK);
+# stored in run_sketches instead of check_results
+SKETCHES_CHECK = "sketches"
+
+_partition_month = None  # UTC (year, month) whose check_results partition this process has ensured
+
+@contextmanager
+def _cursor(cur=None):
+    """Reuse the caller's transaction if given one, else run in a transaction of our own."""
+    if cur is not None:
+        yield cur
+    else:
+        with get_db_cursor(commit=True) as own:
+            yield own
+
+def register_run(run_id: str, dataset_id: str, files: list = None):
+    """Creates the run row; `files` (if given) records where the run's data was written."""
+    sql = """
+    INSERT INTO pipeline_runs (run_id, dataset_id, status, source_files)
+    VALUES (%s, %s, NULL, %s::text[])
+    ON CONFLICT (run_id) DO UPDATE SET source_files = COALESCE(EXCLUDED.source_files, pipeline_runs.source_files)
+    """
+    execute_query(sql, (run_id, dataset_id, files))
+
+def record_run_source(run_id: str, files: list, root: str = None, window_start: datetime = None,
+                      window_end: datetime = None, cur=None):
+    """Remembers exactly what a run read (replay re-reads these rather than guessing paths)."""
     sql = """
-    INSERT INTO pipeline_runs (run_id, dataset_id, status)
-    VALUES (%s, %s, NULL)
-    ON CONFLICT (run_id) DO NOTHING
+    UPDATE pipeline_runs SET source_root = %s, source_files = %s::text[], window_start = %s, window_end = %s
+    WHERE run_id = %s
     """
-    execute_query(sql, (run_id, dataset_id))
+    with _cursor(cur) as c:
+        c.execute(sql, (root, list(files), window_start, window_end, run_id))
+
+def fetch_run_source(run_id: str):
+    """(source_root, source_files, window_start, window_end) of a run, or None if unknown."""
+    return fetch_one("SELECT source_root, source_files, window_start, window_end FROM pipeline_runs WHERE run_id = %s",
+                     (run_id,))
+
+def _metric_numeric(metric: Any):
+    """Typed copy of a metric for check_results.metric_numeric (None unless a finite number)."""
+    try:
+        value = float(metric)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+def _ensure_partition():
+    """Creates this month's check_results partition on first write of the month (once per process)."""
+    global _partition_month
+    month = datetime.now(timezone.utc).timetuple()[:2]
+    if _partition_month != month:
+        execute_query("SELECT drg_ensure_check_results_partition(NOW())")
+        _partition_month = month
 
 def save_check_result(run_id: str, check_name: str, passed: bool, metric: Any, details: dict):
+    _ensure_partition()
+    sql = """
+    INSERT INTO check_results (run_id, check_name, passed, metric_value, metric_numeric, details)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    """
+    execute_query(sql, (run_id, check_name, bool(passed), str(metric), _metric_numeric(metric), json.dumps(details)))
+
+def save_check_results(run_id: str, results: list, cur=None):
+    """Bulk insert of every check result for a run (one statement per 100 rows)."""
+    if not results:
+        return
+    if cur is None:
+        _ensure_partition()
+    rows = [(run_id, r.check_name, bool(r.passed), str(r.metric), _metric_numeric(r.metric), json.dumps(r.details))
+            for r in results]
+    sql = "INSERT INTO check_results (run_id, check_name, passed, metric_value, metric_numeric, details) VALUES %s"
+    with _cursor(cur) as c:
+        execute_values(c, sql, rows)
+
+def save_run_sketches(run_id: str, sketches: dict, cur=None):
+    """Upserts one row per sketched column (re-validation replaces the run's sketches)."""
+    if not sketches:
+        return
+    rows = [(run_id, column, e["n"], json.dumps(e["quantiles"]), e["precision"], psycopg2.Binary(base64.b64decode(e["registers"])))
+            for column, e in sketches.items()]
     sql = """
-    INSERT INTO check_results (run_id, check_name, passed, metric_value, details)
-    VALUES (%s, %s, %s, %s, %s)
+    INSERT INTO run_sketches (run_id, column_name, row_count, quantiles, hll_precision, hll_registers) VALUES %s
+    ON CONFLICT (run_id, column_name) DO UPDATE SET row_count = EXCLUDED.row_count, quantiles = EXCLUDED.quantiles,
+        hll_precision = EXCLUDED.hll_precision, hll_registers = EXCLUDED.hll_registers, created_at = NOW()
     """
-    execute_query(sql, (run_id, check_name, bool(passed), str(metric), json.dumps(details)))
+    with _cursor(cur) as c:
+        execute_values(c, sql, rows)
 
-def enforce_policy(run_id: str, results: list) -> bool:
+def fetch_baseline_sketches(run_id: str, runs: int) -> list:
+    """Sketch rows of the last `runs` passed runs other than run_id (the rolling baseline)."""
+    sql = """
+    SELECT s.run_id::text AS run_id, s.column_name, s.quantiles, s.hll_precision AS precision, s.hll_registers AS registers
+    FROM (SELECT run_id FROM pipeline_runs
+          WHERE status = 'PASSED' AND run_id <> %s
+          ORDER BY completed_at DESC LIMIT %s) recent
+    JOIN run_sketches s USING (run_id)
+    """
+    with get_db_cursor() as cur:
+        cur.execute(sql, (run_id, runs))
+        return cur.fetchall()
+
+def commit_run(run_id: str, results: list, source: dict = None) -> bool:
+    """
+    Persists a whole validation run - check results, column sketches, what it read
+    (`source`: record_run_source kwargs), run status, incident and gate change - in one
+    transaction over one connection. Returns True if overall PASS, False if BLOCK.
+    """
+    sketches = next((r.details.get("columns") for r in results if r.check_name == SKETCHES_CHECK), None)
+    results = [r for r in results if r.check_name != SKETCHES_CHECK]
+    _ensure_partition()  # DDL on the first commit of a month, outside the run's transaction
+    with metrics.stage("persist"), get_db_cursor(commit=True) as cur:
+        save_check_results(run_id, results, cur)
+        save_run_sketches(run_id, sketches, cur)
+        if source is not None:
+            record_run_source(run_id, cur=cur, **source)
+        return enforce_policy(run_id, results, cur)
+
+def enforce_policy(run_id: str, results: list, cur=None) -> bool:
     """
     Applies Fail-Stop policy.
     Returns True if overall PASS, False if BLOCK.
     """
+    with metrics.stage("policy"), _cursor(cur) as c:
+        return _apply_policy(c, run_id, results)
+
+def _apply_policy(cur, run_id: str, results: list) -> bool:
     failed_checks = [r for r in results if not r.passed]
     is_success = len(failed_checks) == 0
     
     # Update Run Status
     status = 'PASSED' if is_success else 'FAILED'
-    sql_run = "UPDATE pipeline_runs SET status = %s, completed_at = NOW() WHERE run_id = %s"
-    execute_query(sql_run, (status, run_id))
+    execute_prepared(cur, "drg_set_run_status", (status, run_id))
     
     # Manage Incident
     if not is_success:
         summary = f"Run {run_id} failed {len(failed_checks)} checks: {', '.join([r.check_name for r in failed_checks])}"
-        create_incident(run_id, summary)
-        block_gate(reason=summary)
+        create_incident(run_id, summary, cur)
+        block_gate(reason=summary, cur=cur)
     else:
         # If success, we should resolve any open incidents for this pipeline? 
         # Or just ensure gate is open if this is the "latest" run? 
         # For simplicity: If this run passed, we open the gate.
-        open_gate(f"Run {run_id} passed validation")
-        resolve_incident_if_exists(run_id)
+        open_gate(f"Run {run_id} passed validation", cur=cur)
+        resolve_incident_if_exists(run_id, cur)
 
     return is_success
 
-def create_incident(run_id: str, summary: str):
-    # Idempotency: Check if incident exists for this run
-    row = fetch_one("SELECT incident_id FROM incidents WHERE run_id = %s", (run_id,))
-    if row:
-        return # Already exists
-        
-    sql = """
-    INSERT INTO incidents (run_id, severity, status, summary)
-    VALUES (%s, 'BLOCK', 'OPEN', %s)
-    """
-    execute_query(sql, (run_id, summary))
-    logger.error(f"Incident created for run {run_id}")
+def create_incident(run_id: str, summary: str, cur=None):
+    # Idempotency: only insert if no incident exists for this run (single statement)
+    with _cursor(cur) as c:
+        execute_prepared(c, "drg_create_incident", (run_id, summary))
+        created = c.fetchone()
+    if created:
+        logger.error(f"Incident created for run {run_id}")
 
-def resolve_incident_if_exists(run_id: str):
-    sql = "UPDATE incidents SET status = 'RESOLVED', resolved_at = NOW() WHERE run_id = %s AND status = 'OPEN'"
-    execute_query(sql, (run_id,))
+def resolve_incident_if_exists(run_id: str, cur=None):
+    with _cursor(cur) as c:
+        execute_prepared(c, "drg_resolve_incident", (run_id,))
 
-def block_gate(reason: str):
-    sql = "UPDATE downstream_gate SET blocked = TRUE, reason = %s, updated_at = NOW() WHERE gate_id = 1"
-    execute_query(sql, (reason,))
+def block_gate(reason: str, cur=None):
+    _set_gate(True, reason, cur)
     logger.warning("Downstream gate BLOCKED.")
 
-def open_gate(reason: str):
-    sql = "UPDATE downstream_gate SET blocked = FALSE, reason = %s, updated_at = NOW() WHERE gate_id = 1"
-    execute_query(sql, (reason,))
+def open_gate(reason: str, cur=None):
+    _set_gate(False, reason, cur)
     logger.info("Downstream gate OPEN.")
 
+def _set_gate(blocked: bool, reason: str, cur=None):
+    with _cursor(cur) as c:
+        execute_prepared(c, "drg_set_gate", (blocked, reason))
+        prev = c.fetchone()
+        if prev and prev['was_blocked'] != blocked:
+            payload = json.dumps({"blocked": blocked, "reason": (reason or "")[:NOTIFY_REASON_LIMIT]})
+            execute_prepared(c, "drg_notify_gate", (GATE_CHANNEL, payload))
+    if prev and prev['was_blocked'] != blocked:
+        metrics.record_gate_transition("BLOCKED" if blocked else "OPEN")
+
 def is_gate_open() -> bool:
-    row = fetch_one("SELECT blocked FROM downstream_gate WHERE gate_id = 1")
+    row = fetch_one_prepared("drg_gate_status")
     return not row['blocked'] if row else True
+
+def wait_for_gate_open(timeout: float, poll_interval: float = GATE_POLL_INTERVAL) -> bool:
+    """
+    Blocks until the downstream gate is open or `timeout` seconds pass. Returns the final state.
+    LISTENs on a dedicated connection so it wakes as soon as open_gate() commits;
+    falls back to polling is_gate_open() if notifications can't be set up or the connection drops.
+    """
+    deadline = time.monotonic() + timeout
+    try:
+        conn = get_connection(retries=1)
+    except psycopg2.Error as e:
+        logger.warning(f"LISTEN unavailable ({e}); polling gate every {poll_interval}s")
+        return _poll_gate(deadline, poll_interval)
+
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {GATE_CHANNEL}")
+            # Read the state only after LISTEN, so an opening in between can't be missed
+            while True:
+                cur.execute("SELECT blocked FROM downstream_gate WHERE gate_id = 1")
+                row = cur.fetchone()
+                if not row or not row[0]:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                if select.select([conn], [], [], min(remaining, poll_interval))[0]:
+                    conn.poll()
+                    for note in conn.notifies:
+                        logger.info(f"Gate notification: {note.payload}")
+                    conn.notifies.clear()
+    except psycopg2.Error as e:
+        logger.warning(f"Gate listener failed ({e}); polling until timeout")
+        return _poll_gate(deadline, poll_interval)
+    finally:
+        conn.close()
+
+def _poll_gate(deadline: float, poll_interval: float) -> bool:
+    while True:
+        if is_gate_open():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(remaining, poll_interval))
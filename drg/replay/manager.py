@@ -1,41 +1,120 @@
 import os
-from drg.ingest.generator import generate_and_save
-from drg.policy.engine import fetch_one
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Optional, Union
+from drg.ingest.generator import generate_and_save, run_seed
+from drg.policy.engine import fetch_run_source
+from drg.db import fetch_all
+from drg.contracts.compiler import ContractLike
+from drg.pipeline import recorded_target, validate_run, validate_runs
+from drg.validation.source import SourceScan
+from drg.validation.streaming import DEFAULT_BATCH_SIZE
 from drg.utils import logger
 
-def replay_run(run_id: str, fix_scenario: str = None):
+# Failed runs, optionally narrowed to those whose latest results include a failed `check`
+FAILED_RUNS_SQL = """
+    SELECT r.run_id::text AS run_id
+    FROM pipeline_runs r
+    WHERE r.status = 'FAILED'
+      AND (%(since)s::timestamptz IS NULL OR r.created_at >= %(since)s)
+      AND (%(until)s::timestamptz IS NULL OR r.created_at < %(until)s)
+      AND (%(check)s::text IS NULL OR EXISTS (
+            SELECT 1 FROM check_results c
+            WHERE c.run_id = r.run_id AND c.check_name = %(check)s AND NOT c.passed
+              AND c.created_at = (SELECT MAX(created_at) FROM check_results WHERE run_id = r.run_id)))
+    ORDER BY r.created_at
+"""
+
+def regenerate(run_id: str, path: str, scenario: Optional[str] = None):
+    """
+    Rewrites a single-file run's data in place: the `fix` half of a replay. A fix of
+    'clean' is scenario None. Generated with the current time, so a run that failed
+    freshness (e.g. 'late_data') passes once regenerated.
+    """
+    # Per-run seed: reproducible, and replayed runs don't collide on ride_id
+    written = generate_and_save(os.path.dirname(path) or ".", run_id, scenario=scenario, seed=run_seed(run_id))
+    if os.path.abspath(written) != os.path.abspath(path):
+        os.replace(written, path)
+
+def _scenario(fix_scenario: str) -> Optional[str]:
+    return None if fix_scenario == 'clean' else fix_scenario
+
+def _find_target(run_id: str, fix_scenario: str = None) -> Optional[Union[str, SourceScan]]:
+    """What the run recorded (one query), or None if there is no such run."""
+    row = fetch_run_source(run_id)
+    if not row:
+        logger.error(f"Run {run_id} not found.")
+        return None
+    # The path(s) the run recorded when it was ingested or validated
+    target = recorded_target(run_id, row)
+    if fix_scenario and isinstance(target, SourceScan):
+        # A window over a shared dataset isn't ours to rewrite; re-validate what it read
+        logger.warning(f"Run {run_id} read {len(target.files)} files under {target.root}; "
+                       f"fix scenarios regenerate single-file runs only")
+    return target
+
+def replay_run(run_id: str, fix_scenario: str = None) -> Optional[Union[str, SourceScan]]:
     """
     Replays a pipeline run.
     Optionally regenerates data with a 'fix' (which might be just Clean data or a specific scenario).
+    Returns what to re-validate (recorded_target), or None if the run doesn't exist.
     """
     logger.info(f"Replaying Run ID: {run_id}")
-    
-    # Check if run exists
-    run = fetch_one("SELECT dataset_id FROM pipeline_runs WHERE run_id = %s", (run_id,))
-    if not run:
-        logger.error(f"Run {run_id} not found.")
-        return False
-        
-    dataset_id = run['dataset_id']
-    # If path isn't stored in DB, we reconstruct it or stored it in 'dataset_id' as path?
-    # Design says 'dataset_id / dataset_path'. Let's assume dataset_id IS the path's identifier or we constructed path conventionally.
-    # In CLI ingest, we output to `data/raw/...`.
-    # Let's assume we can re-generate to the same path.
-    
-    output_path = "data/raw" # Hardcoded for V1
-    
-    if fix_scenario:
+    target = _find_target(run_id, fix_scenario)
+    if target is None:
+        return None
+    if fix_scenario and isinstance(target, str):
         logger.info(f"Applying fix scenario: {fix_scenario} (simulating data correction)")
-        # In reality, 'fix' might just mean generating CLEAN data to replace bad data.
-        # If fix_scenario is 'clean', we generate clean data.
-        scenario = None if fix_scenario == 'clean' else fix_scenario
-        
-        # We need to overwrite the file. 
-        # CAUTION: 'generate_and_save' uses current time unless overridden.
-        # For replay to be valid "fix", it should validly pass checks.
-        # If the original run failed due to 'late_data', new generation with 'now' will pass freshness.
-        
-        generate_and_save(output_path, run_id, scenario=scenario, seed=42) # Using fixed seed for repro-fix?
-        
-    logger.info(f"Data ready for re-validation. Use 'drg validate --run-id {run_id}' to complete replay.")
-    return True
+        regenerate(run_id, target, _scenario(fix_scenario))
+    logger.info(f"Data ready for re-validation: {target if isinstance(target, str) else target.root}")
+    return target
+
+def find_failed_runs(check_name: str = None, since: datetime = None, until: datetime = None) -> List[str]:
+    """Run IDs of FAILED runs created in [since, until), oldest first."""
+    rows = fetch_all(FAILED_RUNS_SQL, {"check": check_name, "since": since, "until": until})
+    return [r["run_id"] for r in rows]
+
+def _validate_target(run_id: str, target: Union[str, SourceScan], contract: ContractLike, mode: str,
+                     batch_size: int) -> bool:
+    if isinstance(target, SourceScan):
+        return validate_run(run_id, contract, mode, batch_size, cache=None, scan=target)
+    return validate_run(run_id, contract, mode, batch_size, cache=None, path=target)
+
+def replay_and_validate(run_id: str, contract: ContractLike, fix_scenario: str = None, mode: str = "memory",
+                        batch_size: int = DEFAULT_BATCH_SIZE) -> bool:
+    """Replays one run and re-validates what it recorded, in this process. Never reads the result cache."""
+    target = replay_run(run_id, fix_scenario)
+    if target is None:
+        return False
+    try:
+        return _validate_target(run_id, target, contract, mode, batch_size)
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        return False
+
+def replay_runs(run_ids: List[str], contract: ContractLike, fix_scenario: str = None, mode: str = "memory",
+                batch_size: int = DEFAULT_BATCH_SIZE, workers: Optional[int] = None) -> Dict[str, bool]:
+    """
+    Bulk replay. Single-file runs are regenerated (if fixing) and re-validated in the same
+    process pool, each worker rewriting a run's file just before reading it, and committed
+    in input order. Directory-dataset runs are re-validated one scan at a time. Unknown
+    runs, and runs whose replay raised, count as failed.
+    """
+    targets = {}
+    for run_id in run_ids:
+        target = _find_target(run_id, fix_scenario)
+        if target is not None:
+            targets[run_id] = target
+    outcome = {run_id: False for run_id in run_ids}
+    files = [(run_id, target) for run_id, target in targets.items() if isinstance(target, str)]
+    if files:
+        prepare = partial(regenerate, scenario=_scenario(fix_scenario)) if fix_scenario else None
+        validated = validate_runs(files, contract, mode, batch_size, workers, cache=None, prepare=prepare)
+        outcome.update({run_id: bool(passed) for run_id, passed in validated.items()})
+    for run_id, target in targets.items():
+        if isinstance(target, SourceScan):
+            try:
+                outcome[run_id] = validate_run(run_id, contract, mode, batch_size, cache=None, scan=target)
+            except Exception as e:
+                logger.error(f"Run {run_id}: could not re-validate {target.root}: {e}")
+    return outcome
@@ -0,0 +1,330 @@
+import os
+import json
+import time
+import signal
+import asyncio
+import inspect
+import threading
+import psycopg2
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from drg.contracts.compiler import ValidationPlan, load_plan
+from drg.validation.base import ValidationResult
+from drg.validation.batch import RAW_DIR, warm_reference
+from drg.validation.cache import ResultCache
+from drg.validation.runner import MODES
+from drg.validation.source import SourceScan
+from drg.validation.sketches import SKETCHES_CHECK
+from drg.validation.streaming import DEFAULT_BATCH_SIZE
+from drg.validation.uniqueness import IdFilter, open_id_filter
+from drg.pipeline import check_run, commit_results
+from drg.replay.manager import replay_run
+from drg.policy.engine import is_gate_open
+from drg.db import warm_pool, health_check
+from drg.utils import logger
+
+# `drg serve`: one long-lived process that keeps compiled plans, reference profiles, ID
+# filters and the DB pool warm, and answers validate/replay/status over HTTP/1.1 (TCP or
+# a Unix socket). Requests and responses are JSON.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 1 << 20
+REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+class Overloaded(Exception):
+    """Every worker is busy and max_pending requests are already waiting."""
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def _result_dict(r: ValidationResult) -> dict:
+    return {"check_name": r.check_name, "passed": bool(r.passed), "metric": r.metric, "details": r.details}
+
+class ValidationService:
+    """
+    Checks run on `workers` threads: their time goes to pandas/pyarrow/numpy, which release
+    the GIL, and threads share the warm plans, reference profiles and DB pool that worker
+    processes would each rebuild. At most `workers` requests run at once and `max_pending`
+    more wait; beyond that a request is refused with 503 rather than queued without bound.
+    Commits are serialized, so each in-memory ID filter sees one run at a time, and a run's
+    IDs are saved before its response: a crash can't leave a committed run out of the filter.
+    Saves merge with what other processes (e.g. a concurrent `drg validate`) saved meanwhile.
+    A request's `path` must be under one of `data_roots` (default: data/raw) and its
+    `contract` under one of `contract_roots` (default: the default contract's directory).
+    """
+    def __init__(self, contract_path: str, workers: int = None, max_pending: int = None, mode: str = "memory",
+                 batch_size: int = DEFAULT_BATCH_SIZE, cache: bool = True, data_roots: List[str] = None,
+                 contract_roots: List[str] = None):
+        self.contract_path = contract_path
+        self.data_roots = [os.path.realpath(r) for r in data_roots or [RAW_DIR]]
+        self.contract_roots = [os.path.realpath(r) for r in contract_roots or [os.path.dirname(contract_path) or "."]]
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending if max_pending is not None else 4 * self.workers
+        self.mode = mode
+        self.batch_size = batch_size
+        self.cache = ResultCache() if cache else None
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="drg-check")
+        self.commit_lock = threading.Lock()
+        self.filters: Dict[Tuple[str, str], Optional[IdFilter]] = {}
+        # Event-loop state (only touched from the loop thread)
+        self.slots = asyncio.Semaphore(self.workers)
+        self.pending = 0
+        self.served = 0
+        self.rejected = 0
+        self._loop = None
+        self._stop = None
+
+    def warm(self):
+        """Compile the default contract, load its reference profile and ID filter, open the DB pool."""
+        plan = load_plan(self.contract_path)
+        warm_reference(plan)
+        with self.commit_lock:
+            self._id_filter(plan)
+        try:
+            warm_pool()
+            is_gate_open()  # PREPAREs the gate query on a pooled connection
+        except psycopg2.Error as e:
+            logger.warning(f"Database not reachable yet ({e}); connections will be opened on demand")
+
+    def _id_filter(self, plan: ValidationPlan) -> Optional[IdFilter]:
+        # One instance per filter file; caller holds commit_lock
+        spec = plan.check('uniqueness')
+        if spec is None:
+            return None
+        key = (plan.contract.dataset_id, spec.thresholds['column'])
+        if key not in self.filters:
+            self.filters[key] = open_id_filter(plan)
+        return self.filters[key]
+
+    def flush_filters(self):
+        with self.commit_lock:
+            for f in self.filters.values():
+                if f is not None:
+                    f.save()
+
+    # --- Request handlers (run on the worker threads) ---
+
+    def _validate(self, run_id: str, plan: ValidationPlan, mode: str, batch_size: int,
+                  cache: Optional[ResultCache], **target) -> dict:
+        t0 = time.perf_counter()
+        checked, results = check_run(run_id, plan, mode, batch_size, cache, **target)
+        with self.commit_lock:
+            id_filter = self._id_filter(plan)
+            passed, results = commit_results(run_id, checked, results, plan, id_filter)
+            if id_filter is not None:
+                id_filter.save()  # writes only the bytes this run touched; no-op unless it added IDs
+        # Sketches are stored, not reported (kilobytes of registers per column)
+        return {"run_id": run_id, "passed": passed,
+                "results": [_result_dict(r) for r in results if r.check_name != SKETCHES_CHECK],
+                "elapsed_ms": round((time.perf_counter() - t0) * 1000, 3)}
+
+    def validate(self, run_id: str, contract: str = None, path: str = None, mode: str = None,
+                 batch_size: int = None, no_cache: bool = False) -> dict:
+        plan = self._plan(contract)
+        if path is not None:
+            path = _confine(path, self.data_roots, "path")
+        return self._validate(run_id, plan, mode or self.mode, batch_size or self.batch_size,
+                              None if no_cache else self.cache, path=path)
+
+    def replay(self, run_id: str, fix: str = None, contract: str = None, mode: str = None,
+               batch_size: int = None) -> dict:
+        """Like `drg replay --run-id`: regenerate (with fix), then re-validate what the run recorded, uncached."""
+        plan = self._plan(contract)
+        target = replay_run(run_id, fix)
+        if target is None:
+            raise HttpError(404, f"Run {run_id} not found")
+        where = {"scan": target} if isinstance(target, SourceScan) else {"path": target}
+        return self._validate(run_id, plan, mode or self.mode, batch_size or self.batch_size, None, **where)
+
+    def _plan(self, contract: Optional[str]) -> ValidationPlan:
+        if contract is None:
+            return load_plan(self.contract_path)
+        return load_plan(_confine(contract, self.contract_roots, "contract"))
+
+    def status(self) -> dict:
+        return {"gate": "OPEN" if is_gate_open() else "BLOCKED", "workers": self.workers, "pending": self.pending,
+                "max_pending": self.max_pending, "served": self.served, "rejected": self.rejected}
+
+    def health(self) -> dict:
+        return dict(health_check(), service=self.status())
+
+    # --- Event loop side ---
+
+    async def submit(self, fn, *args, **kwargs):
+        """Runs fn on a worker thread, or raises Overloaded if the wait queue is full."""
+        if self.pending >= self.workers + self.max_pending:
+            self.rejected += 1
+            raise Overloaded()
+        self.pending += 1
+        try:
+            async with self.slots:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.served += 1
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> dict:
+        route = path.split("?", 1)[0]
+        loop = asyncio.get_running_loop()
+        if route in ("/status", "/health"):
+            if method != "GET":
+                raise HttpError(405, f"{route} takes GET")
+            # Not admitted through submit(): stays answerable while validations back up
+            return await loop.run_in_executor(None, self.status if route == "/status" else self.health)
+        if route not in ("/validate", "/replay"):
+            raise HttpError(404, f"No route {route}")
+        if method != "POST":
+            raise HttpError(405, f"{route} takes POST")
+        try:
+            params = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "body is not JSON")
+        if not isinstance(params, dict) or not params.get("run_id"):
+            raise HttpError(400, "run_id is required")
+        handler = self.validate if route == "/validate" else self.replay
+        _check_params(handler, params)
+        return await self.submit(handler, **params)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """One connection; HTTP/1.1 keep-alive, so a client can reuse it across requests."""
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HttpError as e:
+                    writer.write(_response(e.status, {"error": str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                extra = ()
+                try:
+                    status, payload = 200, await self.dispatch(method, path, body)
+                except Overloaded:
+                    status, payload, extra = 503, {"error": "overloaded, retry later"}, ("Retry-After: 1",)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except FileNotFoundError as e:
+                    status, payload = 404, {"error": str(e)}
+                except Exception as e:
+                    # Requests are checked in dispatch(); anything raised past that is ours
+                    logger.exception(f"{method} {path} failed")
+                    status, payload = 500, {"error": str(e)}
+                writer.write(_response(status, payload, keep_alive, extra))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass  # idle keep-alive connection cancelled at shutdown
+        finally:
+            writer.close()
+
+    def stop(self):
+        """Asks serve() to finish; callable from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+def _check_params(handler, params: dict):
+    """400 unless `params` fit the handler's signature and types; past this, errors are 500s."""
+    try:
+        inspect.signature(handler).bind(**params)
+    except TypeError as e:
+        raise HttpError(400, str(e))
+    for name in ("run_id", "contract", "path", "fix"):
+        if params.get(name) is not None and not isinstance(params[name], str):
+            raise HttpError(400, f"{name} must be a string")
+    if params.get("mode") is not None and params["mode"] not in MODES:
+        raise HttpError(400, f"mode must be one of {', '.join(MODES)}")
+    batch_size = params.get("batch_size")
+    if batch_size is not None and (type(batch_size) is not int or batch_size < 1):
+        raise HttpError(400, "batch_size must be a positive integer")
+
+def _confine(path: str, roots: List[str], what: str) -> str:
+    """`path` resolved (symlinks included), if it lies under one of `roots`; else 403."""
+    real = os.path.realpath(path)
+    if not any(os.path.commonpath([real, root]) == root for root in roots):
+        raise HttpError(403, f"{what} {path} is outside {', '.join(roots)}")
+    return real
+
+async def _readline(reader: asyncio.StreamReader) -> bytes:
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError):
+        # No newline within the stream's buffer limit (64 KiB)
+        raise HttpError(431, "request line or header too long")
+
+async def _read_request(reader: asyncio.StreamReader):
+    """(method, path, headers, body), or None when the client closed the connection."""
+    line = await _readline(reader)
+    if not line.strip():
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await _readline(reader)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "bad Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, f"body over {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+def _response(status: int, payload: dict, keep_alive: bool, extra=()) -> bytes:
+    body = json.dumps(payload, default=str).encode()
+    head = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Type: application/json",
+            f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}", *extra]
+    return ("\r\n".join(head) + "\r\n\r\n").encode() + body
+
+async def serve(service: ValidationService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                socket_path: str = None, ready=None):
+    """
+    Warms the service, then serves until SIGINT/SIGTERM or service.stop().
+    `ready(server)` is called once the socket is listening (tests use it to learn the port).
+    """
+    loop = asyncio.get_running_loop()
+    service._loop, service._stop = loop, asyncio.Event()
+    await loop.run_in_executor(service.executor, service.warm)
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # left over from an unclean exit
+        server = await asyncio.start_unix_server(service.handle, path=socket_path)
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, service._stop.set)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass  # not the main thread / platform without signal support
+    where = socket_path or ", ".join(str(s.getsockname()) for s in server.sockets)
+    logger.info(f"Serving on {where} ({service.workers} workers, max_pending={service.max_pending})")
+    if ready is not None:
+        ready(server)
+
+    try:
+        async with server:
+            await service._stop.wait()
+    finally:
+        # Retries any save that failed at commit time
+        await loop.run_in_executor(service.executor, service.flush_filters)
+        service.executor.shutdown(wait=True)
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        logger.info("Service stopped.")
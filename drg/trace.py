@@ -0,0 +1,214 @@
+import os
+import glob
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+from drg.utils import logger
+
+# Span tracing (`--profile` / DRG_TRACE): contract load, reads, each check and each DB
+# statement as Chrome trace-event JSON (chrome://tracing, ui.perfetto.dev). Optionally a
+# cProfile and/or tracemalloc capture per stage. Off, every hook is one boolean check.
+TRACE_ENV = "DRG_TRACE"                   # output path, or "1" for data/traces/<command>-<time>.json
+CAPTURE_ENV = "DRG_TRACE_CAPTURE"         # "cpu", "memory" or "cpu,memory"
+TRACE_DIR = "data/traces"
+CAPTURES = ("cpu", "memory")
+TOP_ALLOCATIONS = 5
+
+_enabled = bool(os.environ.get(TRACE_ENV))
+_path: Optional[str] = None
+_capture = frozenset()
+_command = None
+_events: List[dict] = []
+_lock = threading.Lock()
+_local = threading.local()  # per-thread stack of active stage captures
+_profiles: Dict[str, object] = {}  # stage -> cProfile.Profile, accumulated over the process
+_malloc_stages = 0  # stages inside a memory capture, any thread
+
+def enable(path: str = None, capture=(), command: str = None):
+    """
+    Turn tracing on, writing to `path` (default: data/traces/<command>-<time>.json).
+    Exported through the environment so worker processes (fork or spawn) trace too;
+    they leave part files next to the trace that write() merges.
+    """
+    global _enabled, _path, _capture, _command
+    unknown = set(capture) - set(CAPTURES)
+    if unknown:
+        raise ValueError(f"Unknown trace capture {sorted(unknown)}; choose from {CAPTURES}")
+    _command = command or _command
+    _enabled, _capture = True, frozenset(capture)
+    _path = path or os.path.join(TRACE_DIR, f"{_command or 'drg'}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.environ[TRACE_ENV] = _path
+    os.environ[CAPTURE_ENV] = ",".join(sorted(_capture))
+
+def enabled() -> bool:
+    return _enabled
+
+def enable_from_env(command: str = None, path: str = None, capture=()):
+    """enable() with DRG_TRACE / DRG_TRACE_CAPTURE filling in what the caller didn't set."""
+    value = os.environ.get(TRACE_ENV, "")
+    path = path or (value if value not in ("", "1") else None)
+    if not capture:
+        capture = [c.strip() for c in os.environ.get(CAPTURE_ENV, "").split(",") if c.strip()]
+        for c in set(capture) - set(CAPTURES):
+            logger.warning(f"Ignoring unknown {CAPTURE_ENV} value {c!r}; choose from {CAPTURES}")
+        capture = [c for c in capture if c in CAPTURES]
+    enable(path, capture, command)
+
+def complete(name: str, cat: str, start: float, seconds: float, args: dict = None):
+    """Records a finished span; `start` is a time.perf_counter() reading."""
+    if not _enabled:
+        return
+    event = {"name": name, "cat": cat, "ph": "X", "ts": round(start * 1e6, 3), "dur": round(seconds * 1e6, 3),
+             "pid": os.getpid(), "tid": threading.get_ident()}
+    if args:
+        event["args"] = args
+    with _lock:
+        _events.append(event)
+
+def span(name: str, cat: str = "stage", **args):
+    """Context manager timing one span. Stage spans also carry the configured captures."""
+    if not _enabled:
+        return nullcontext()
+    return _span(name, cat, args)
+
+@contextmanager
+def _span(name: str, cat: str, args: dict):
+    captured = cat == "stage" and bool(_capture)
+    if captured:
+        _enter_capture(name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        if captured:
+            args.update(_exit_capture())
+        complete(name, cat, t0, seconds, args)
+
+# Captures. Stages nest (validate > read), so each thread keeps a stack: entering a stage
+# pauses the enclosing stage's profiler, and memory peaks propagate outwards on exit.
+# tracemalloc only runs while some stage is open: its snapshots then hold that stage's
+# allocations, not the ~250k left over from importing pandas and pyarrow, which would
+# take seconds to diff. Process-wide, so concurrent stages (drg serve) see each other's.
+
+def _enter_capture(name: str):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    frame = {"name": name}
+    if "cpu" in _capture:
+        import cProfile
+        if stack:
+            stack[-1]["profile"].disable()
+        with _lock:
+            frame["profile"] = _profiles.setdefault(name, cProfile.Profile())
+        frame["profile"].enable()
+    if "memory" in _capture:
+        import tracemalloc
+        global _malloc_stages
+        with _lock:
+            _malloc_stages += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], tracemalloc.get_traced_memory()[1])
+        # The baseline snapshot stays allocated for the whole stage, so measure from after it
+        frame["snapshot"] = _snapshot()
+        tracemalloc.reset_peak()
+        frame["start"] = frame["peak"] = tracemalloc.get_traced_memory()[0]
+    stack.append(frame)
+
+def _exit_capture() -> dict:
+    stack = _local.stack
+    frame = stack.pop()
+    args = {}
+    if "cpu" in _capture:
+        frame["profile"].disable()
+        if stack:
+            stack[-1]["profile"].enable()
+    if "memory" in _capture:
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(frame["peak"], peak)
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        top = _snapshot().compare_to(frame["snapshot"], "lineno")[:TOP_ALLOCATIONS]
+        args.update(alloc_net_kb=round((current - frame["start"]) / 1024, 1),
+                    alloc_peak_kb=round((peak - frame["start"]) / 1024, 1),
+                    top_allocations=[f"{s.traceback[0].filename}:{s.traceback[0].lineno} {s.size_diff / 1024:+.1f} KiB"
+                                     for s in top])
+        global _malloc_stages
+        with _lock:
+            _malloc_stages -= 1
+            if _malloc_stages == 0:
+                tracemalloc.stop()
+    return args
+
+def _snapshot():
+    import tracemalloc
+    # Not the snapshots themselves, nor import machinery
+    return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                                      tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")))
+
+def attach_worker():
+    """Pool initializer hook: a traced worker writes its spans to a part file when it exits."""
+    import tracemalloc
+    import multiprocessing
+    from multiprocessing import util
+    global _malloc_stages
+    if not _enabled or multiprocessing.parent_process() is None:
+        return  # off, or the initializer ran in-process (one worker)
+    if _path is None:
+        enable_from_env()  # spawned: only the environment came along
+    with _lock:
+        # Inherited from the parent by fork (open stages included); the parent writes those
+        _events.clear()
+        _profiles.clear()
+        _local.stack = []
+        _malloc_stages = 0
+    tracemalloc.stop()
+    util.Finalize(None, _write_part, exitpriority=10)
+
+def _write_part():
+    _write_json(f"{_path}.{os.getpid()}.part", {"traceEvents": _events})
+    _dump_profiles(_path, f".{os.getpid()}")
+
+def _write_json(path: str, payload: dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(tmp, "w") as f:
+        json.dump(payload, f, default=str)
+    os.replace(tmp, path)
+
+def _dump_profiles(path: str, suffix: str = ""):
+    # <trace>.<stage>.prof: load with pstats or snakeviz
+    for stage, profile in _profiles.items():
+        profile.dump_stats(f"{os.path.splitext(path)[0]}.{stage}{suffix}.prof")
+
+def write() -> Optional[str]:
+    """Writes the trace (plus any worker parts) and per-stage .prof files. Never raises."""
+    if not _enabled:
+        return None
+    if _path is None:
+        enable_from_env()
+    try:
+        with _lock:
+            events = list(_events)
+        for part in glob.glob(f"{glob.escape(_path)}.*.part"):
+            with open(part) as f:
+                events.extend(json.load(f)["traceEvents"])
+            os.unlink(part)
+        names = {e["pid"]: "drg worker" for e in events}
+        names[os.getpid()] = f"drg {_command}" if _command else "drg"
+        meta = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": name}}
+                for pid, name in names.items()]
+        _write_json(_path, {"traceEvents": meta + events, "displayTimeUnit": "ms"})
+        _dump_profiles(_path)
+        logger.info(f"Trace written to {_path} ({len(events)} spans; open in ui.perfetto.dev or chrome://tracing)")
+        return _path
+    except Exception as e:
+        logger.warning(f"Could not write trace: {e}")
+        return None
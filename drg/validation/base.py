@@ -0,0 +1,37 @@
+import pyarrow as pa
+from typing import Any, Dict, List, Tuple
+
+class ValidationResult:
+    def __init__(self, check_name: str, passed: bool, metric: Any, details: Dict = None):
+        self.check_name = check_name
+        self.passed = passed
+        self.metric = metric
+        self.details = details or {}
+
+# Each accumulator mirrors one or more checks. Batches are folded in with update()
+# and the final ValidationResults are built by the same helpers the in-memory path
+# uses, so every execution mode reports identical results.
+
+class CheckAccumulator:
+    name = "check"  # metrics label
+    columns: Tuple[str, ...] = ()
+
+    def start(self, schema: pa.Schema):
+        pass
+
+    def from_footer(self, footer) -> bool:
+        """Resolve from Parquet footer statistics (drg.validation.metadata.FooterStats). True = no scan needed."""
+        return False
+
+    def from_file(self, pf) -> bool:
+        """Resolve by reading a part of the file itself (e.g. sampled row groups). True = leave it out of the scan."""
+        return False
+
+    def update(self, batch: pa.RecordBatch):
+        pass
+
+    def result(self) -> ValidationResult:
+        raise NotImplementedError
+
+    def results(self) -> List[ValidationResult]:
+        return [self.result()]
@@ -0,0 +1,102 @@
+import os
+import glob
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+from drg.contracts.compiler import ContractLike, ValidationPlan, plan_for
+from drg.validation.base import ValidationResult
+from drg.validation.runner import validate_file
+from drg.validation.cache import ResultCache
+from drg.validation.streaming import DEFAULT_BATCH_SIZE
+from drg.utils import logger
+from drg import trace
+
+RAW_DIR = "data/raw"
+
+# Per-worker state, set once by the pool initializer
+_plan: Optional[ValidationPlan] = None
+_mode = "memory"
+_batch_size = DEFAULT_BATCH_SIZE
+_cache: Optional[ResultCache] = None
+_prepare: Optional[Callable[[str, str], None]] = None
+
+def run_id_for(path: str) -> str:
+    """rides_<run_id>.parquet -> <run_id> (ingest naming convention)."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem[len("rides_"):] if stem.startswith("rides_") else stem
+
+def resolve_batch(items: List[str], raw_dir: str = RAW_DIR) -> List[Tuple[str, str]]:
+    """
+    Expands directories, globs, .parquet paths and bare run IDs into (run_id, path) pairs.
+    Order is deterministic: items in the order given, each expansion sorted, duplicates dropped.
+    """
+    paths = []
+    for item in items:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, "rides_*.parquet"))))
+        elif glob.has_magic(item):
+            paths.extend(sorted(glob.glob(item)))
+        elif item.endswith(".parquet"):
+            paths.append(item)
+        else:
+            paths.append(f"{raw_dir}/rides_{item}.parquet")
+
+    seen = set()
+    pairs = []
+    for path in paths:
+        if path not in seen:
+            seen.add(path)
+            pairs.append((run_id_for(path), path))
+    return pairs
+
+def warm_reference(contract: ContractLike):
+    """Load the reference profile into this process's cache (inherited by forked workers)."""
+    reference = plan_for(contract).reference
+    if reference is not None and os.path.exists(reference.path):
+        reference.profile()
+
+def _init_worker(plan: ValidationPlan, mode: str, batch_size: int, cache: Optional[ResultCache] = None,
+                 prepare: Optional[Callable[[str, str], None]] = None):
+    # The compiled plan is shipped once per worker, not re-derived per file
+    global _plan, _mode, _batch_size, _cache, _prepare
+    _plan, _mode, _batch_size, _cache, _prepare = plan, mode, batch_size, cache, prepare
+    trace.attach_worker()
+    warm_reference(plan)
+
+def _validate_one(item: Tuple[str, str]) -> Tuple[str, str, Optional[List[ValidationResult]]]:
+    run_id, path = item
+    try:
+        if _prepare is not None:
+            _prepare(run_id, path)
+        if not os.path.exists(path):
+            logger.error(f"Data file not found: {path}")
+            return run_id, path, None
+        return run_id, path, validate_file(path, _plan, mode=_mode, batch_size=_batch_size, cache=_cache)
+    except Exception as e:
+        # Corrupt/truncated Parquet, a column pyarrow can't decode, out of memory: this run only
+        logger.error(f"Run {run_id}: could not validate {path}: {e}")
+        return run_id, path, None
+
+def validate_batch(pairs: List[Tuple[str, str]], contract: ContractLike, mode: str = "memory",
+                   batch_size: int = DEFAULT_BATCH_SIZE, workers: int = None,
+                   cache: Optional[ResultCache] = None,
+                   prepare: Optional[Callable[[str, str], None]] = None) -> Iterator[Tuple[str, str, Optional[List[ValidationResult]]]]:
+    """
+    Validates many files across a process pool and yields (run_id, path, results) in input order.
+    results is None (and the reason logged) when the file does not exist or could not be
+    validated, so one bad file costs its own run rather than the rest of the batch.
+    `prepare(run_id, path)` (picklable) runs in the worker just before each file is read.
+    """
+    workers = min(workers or os.cpu_count() or 1, max(len(pairs), 1))
+    plan = plan_for(contract)
+    warm_reference(plan)
+
+    if workers <= 1:
+        _init_worker(plan, mode, batch_size, cache, prepare)
+        for pair in pairs:
+            yield _validate_one(pair)
+        return
+
+    logger.info(f"Validating {len(pairs)} files across {workers} workers (mode={mode})")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(plan, mode, batch_size, cache, prepare)) as pool:
+        # map() preserves submission order regardless of completion order
+        yield from pool.map(_validate_one, pairs)
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import hashlib
+import pandas as pd
+from typing import List, Optional
+from drg.contracts.compiler import PLAN_VERSION, ContractLike, plan_for
+from drg.validation.base import ValidationResult
+from drg.validation.core import freshness_result
+from drg.validation.reference import file_digest
+from drg.utils import logger
+from drg import metrics
+
+# Bump when a check's semantics or what a result carries change, so stale entries stop
+# matching (2: uniqueness, sketches and sampled drift details; 3: KS over the whole drift
+# grid). The compiled plan's PLAN_VERSION is part of the key as well.
+CACHE_VERSION = 3
+
+CACHE_DIR = os.environ.get("DRG_CACHE_DIR", "data/cache/results")
+CACHE_MAX_ENTRIES = int(os.environ.get("DRG_CACHE_MAX_ENTRIES", "1000"))
+CACHE_MAX_BYTES = int(os.environ.get("DRG_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+PARQUET_MAGIC = b"PAR1"
+
+def dataset_fingerprint(path: str) -> str:
+    """
+    Hash of the Parquet footer plus file size. The footer holds the schema, every row
+    group's byte offsets/sizes and per-column min/max/null counts, so a rewrite that
+    changes data changes the footer; reading it costs one small seek instead of the file.
+    Non-Parquet files fall back to hashing every byte.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size >= 12:
+            f.seek(size - 8)
+            tail = f.read(8)
+            footer_len = int.from_bytes(tail[:4], "little")
+            if tail[4:] == PARQUET_MAGIC and footer_len + 8 <= size:
+                f.seek(size - 8 - footer_len)
+                h = hashlib.sha256(f.read(footer_len))
+                h.update(str(size).encode())
+                return "footer:" + h.hexdigest()
+    return "bytes:" + file_digest(path)
+
+def reference_fingerprint(contract: ContractLike) -> Optional[str]:
+    """Content hash of the reference the distribution check compares against (None if unused)."""
+    reference = plan_for(contract).reference
+    if reference is None or not os.path.exists(reference.path):
+        return None
+    return reference.profile()["reference_sha256"]
+
+def cache_key(path: str, contract: ContractLike, mode: str = None) -> str:
+    """
+    The mode is left out: every mode gives the same results (test_streaming_matches_in_memory),
+    so a file checked in one mode is a hit in all. Except with sampled drift, where memory mode
+    samples rows and the others row groups; then entries are per mode.
+    """
+    plan = plan_for(contract)
+    parts = [str(CACHE_VERSION), str(PLAN_VERSION), dataset_fingerprint(path), plan.contract_hash,
+             str(reference_fingerprint(contract))]
+    if plan.drift is not None and plan.drift.sample is not None:
+        parts.append(str(mode))
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+class ResultCache:
+    """
+    One JSON file per key under `root`. A hit bumps the file's mtime, so eviction
+    (oldest mtime first, down to max_entries and max_bytes) is least-recently-used.
+    """
+    def __init__(self, root: str = CACHE_DIR, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = root
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key: str, checks: dict) -> Optional[List[ValidationResult]]:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        results = [ValidationResult(r["check_name"], r["passed"], r["metric"], r["details"]) for r in entry["results"]]
+        # Freshness is relative to now: recompute it from the stored max timestamp
+        for i, r in enumerate(results):
+            if r.check_name == "freshness" and "latest_ts" in r.details:
+                results[i] = freshness_result(pd.Timestamp(r.details["latest_ts"]), checks)
+        return results
+
+    def put(self, key: str, results: List[ValidationResult]):
+        os.makedirs(self.root, exist_ok=True)
+        entry = {"key": key, "created_at": time.time(),
+                 "results": [{"check_name": r.check_name, "passed": bool(r.passed), "metric": r.metric, "details": r.details}
+                             for r in results]}
+        tmp = f"{self._path(key)}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(entry, f, default=str)
+            os.replace(tmp, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not cache results: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        with os.scandir(self.root) as it:
+            for e in it:
+                if e.name.endswith(".json"):
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+        entries.sort(reverse=True)  # most recently used first
+        kept = kept_bytes = 0
+        for _, size, path in entries:
+            if kept < self.max_entries and kept_bytes + size <= self.max_bytes:
+                kept += 1
+                kept_bytes += size
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.root, name))
+
+def cached_validate(path: str, contract: ContractLike, validate, cache: ResultCache = None,
+                    mode: str = None) -> List[ValidationResult]:
+    """validate(path, contract) in `mode` behind the result cache. Exceptions propagate and are not cached."""
+    cache = cache or ResultCache()
+    key = cache_key(path, contract, mode)
+    results = cache.get(key, plan_for(contract).checks_config)
+    if results is not None:
+        logger.info(f"Result cache hit for {path} ({key[:12]})")
+        metrics.record_cache("hit")
+        return results
+    metrics.record_cache("miss")
+    results = validate(path, contract)
+    cache.put(key, results)
+    return results
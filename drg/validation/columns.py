@@ -0,0 +1,163 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+import pandas as pd
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from drg.contracts.loader import SchemaField
+from drg.validation.base import ValidationResult, CheckAccumulator
+
+# Declared contract type -> accepted Arrow types. An all-null column (e.g. an empty
+# file written from an untyped DataFrame) is compatible with anything.
+TYPE_MATCHERS: Dict[str, Callable[[pa.DataType], bool]] = {
+    'string': lambda t: pa.types.is_string(t) or pa.types.is_large_string(t),
+    'int': pa.types.is_integer,
+    'float': lambda t: pa.types.is_floating(t) or pa.types.is_integer(t) or pa.types.is_decimal(t),
+    'datetime': lambda t: pa.types.is_timestamp(t) or pa.types.is_date(t),
+    'bool': pa.types.is_boolean,
+}
+
+@dataclass
+class ColumnRule:
+    name: str
+    type: str
+    min: Optional[float]
+    max: Optional[float]
+    max_null_fraction: Optional[float]
+
+def compile_rules(schema: List[SchemaField], checks: Dict) -> List[ColumnRule]:
+    """Resolves per-column limits once. Required columns inherit checks.nulls.max_fraction."""
+    default_nulls = checks.get('nulls', {}).get('max_fraction')
+    rules = []
+    for f in schema:
+        max_nulls = f.max_null_fraction
+        if max_nulls is None and f.required:
+            max_nulls = default_nulls
+        rules.append(ColumnRule(f.name, f.type, f.min, f.max, max_nulls))
+    return rules
+
+class ColumnCheckAccumulator(CheckAccumulator):
+    """
+    Type, min/max and null-rate checks for every contract column in one pass.
+    Each batch runs a handful of pyarrow.compute kernels per column (null_count,
+    min_max, and less/greater counts only when min_max shows a breach).
+    """
+    name = "columns"
+
+    def __init__(self, schema: List[SchemaField], checks: Dict, rules: List[ColumnRule] = None):
+        self.rules = list(rules) if rules is not None else compile_rules(schema, checks)
+        self.columns = ()
+        self.active: Dict[str, ColumnRule] = {}
+        self.rows: Optional[int] = None  # known up front (footer / DataFrame); otherwise counted
+        self.scanned_rows = 0
+        self.type_errors: Dict[str, dict] = {}
+        self.needs_integral: Dict[str, bool] = {}
+        self.bounded: Dict[str, bool] = {}
+        self.nulls: Dict[str, int] = {}
+        self.below: Dict[str, int] = {}
+        self.above: Dict[str, int] = {}
+        self.non_integral: Dict[str, int] = {}
+
+    def start(self, schema: pa.Schema):
+        self.active = {r.name: r for r in self.rules if r.name in schema.names}
+        for rule in self.active.values():
+            arrow_type = schema.field(rule.name).type
+            matcher = TYPE_MATCHERS.get(rule.type)
+            # Nullable ints come back from pandas as floats; accept them if every value is integral
+            self.needs_integral[rule.name] = rule.type == 'int' and pa.types.is_floating(arrow_type)
+            if matcher and not (pa.types.is_null(arrow_type) or matcher(arrow_type) or self.needs_integral[rule.name]):
+                self.type_errors[rule.name] = {"expected": rule.type, "actual": str(arrow_type)}
+            numeric = pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type)
+            self.bounded[rule.name] = numeric and (rule.min is not None or rule.max is not None)
+            self.nulls[rule.name] = 0
+            self.below[rule.name] = 0
+            self.above[rule.name] = 0
+            self.non_integral[rule.name] = 0
+        self.columns = tuple(self.active)
+
+    def from_footer(self, footer) -> bool:
+        self.rows = footer.num_rows
+        scan = []
+        for rule in self.active.values():
+            stats = footer.column(rule.name)
+            in_bounds = stats is not None and (not self.bounded[rule.name] or stats.min is None or (
+                (rule.min is None or stats.min >= rule.min) and (rule.max is None or stats.max <= rule.max)))
+            if not in_bounds or self.needs_integral[rule.name]:
+                # Inconclusive stats: this column gets read
+                scan.append(rule.name)
+            else:
+                self.nulls[rule.name] = stats.null_count
+
+        self.columns = tuple(scan)
+        return not scan
+
+    def update(self, batch: pa.RecordBatch):
+        self.scanned_rows += batch.num_rows
+        for name in self.columns:
+            arr = batch.column(name)
+            self.nulls[name] += arr.null_count
+            if self.needs_integral[name]:
+                self.non_integral[name] += pc.sum(pc.not_equal(pc.floor(arr), arr)).as_py() or 0
+            if not self.bounded[name]:
+                continue
+            rule = self.active[name]
+            bounds = pc.min_max(arr)
+            lo, hi = bounds['min'].as_py(), bounds['max'].as_py()
+            if rule.min is not None and lo is not None and lo < rule.min:
+                self.below[name] += pc.sum(pc.less(arr, rule.min)).as_py() or 0
+            if rule.max is not None and hi is not None and hi > rule.max:
+                self.above[name] += pc.sum(pc.greater(arr, rule.max)).as_py() or 0
+
+    def results(self) -> List[ValidationResult]:
+        rows = self.rows if self.rows is not None else self.scanned_rows
+
+        # Types: declared vs physical, plus non-integral values in float-backed int columns
+        mismatched = dict(self.type_errors)
+        for name, count in self.non_integral.items():
+            if count:
+                mismatched[name] = {"expected": "int", "actual": "float", "non_integral": count}
+        types = ValidationResult("schema_types", not mismatched, len(mismatched), {"mismatched": mismatched})
+
+        # Bounds
+        violations = {}
+        for rule in self.active.values():
+            if self.below[rule.name] or self.above[rule.name]:
+                violations[rule.name] = {"below_min": self.below[rule.name], "above_max": self.above[rule.name],
+                                         "min": rule.min, "max": rule.max}
+        total = sum(v["below_min"] + v["above_max"] for v in violations.values())
+        bounds = ValidationResult("value_bounds", total == 0, total, {"violations": violations})
+
+        # Null rates
+        fractions = {}
+        breached = []
+        for rule in self.active.values():
+            fraction = self.nulls[rule.name] / rows if rows else 0.0
+            fractions[rule.name] = {"nulls": self.nulls[rule.name], "fraction": round(fraction, 4)}
+            if rule.max_null_fraction is not None:
+                fractions[rule.name]["max"] = rule.max_null_fraction
+                if fraction > rule.max_null_fraction:
+                    breached.append(rule.name)
+        worst = max((f["fraction"] for f in fractions.values()), default=0.0)
+        nulls = ValidationResult("null_rate", not breached, worst, {"columns": fractions, "violations": breached})
+
+        return [types, bounds, nulls]
+
+def _to_arrow(df: pd.DataFrame, names: List[str]) -> pa.Table:
+    arrays, fields = [], []
+    for name in names:
+        try:
+            arr = pa.array(df[name], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed-type object column: keep it so the type check reports it
+            arr = pa.array(df[name].astype(str), from_pandas=True)
+        arrays.append(arr)
+        fields.append(name)
+    return pa.Table.from_arrays(arrays, names=fields)
+
+def validate_columns(df: pd.DataFrame, schema: List[SchemaField], checks: Dict, rules: List[ColumnRule] = None) -> List[ValidationResult]:
+    acc = ColumnCheckAccumulator(schema, checks, rules)
+    table = _to_arrow(df, [f.name for f in schema if f.name in df.columns])
+    acc.start(table.schema)
+    acc.rows = len(df)
+    for batch in table.to_batches():
+        acc.update(batch)
+    return acc.results()
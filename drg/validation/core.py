@@ -3,21 +3,27 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Tuple
 from drg.contracts.loader import Contract, SchemaField
+from drg.contracts.compiler import ContractLike, plan_for
+from drg.validation.base import ValidationResult
+from drg.validation.columns import validate_columns
+from drg.validation.uniqueness import validate_uniqueness
+from drg.validation.sketches import validate_sketches
+from drg.validation.drift import ColumnHistogram, psi_breakpoints, psi_scores, score_drift, resolve_drift_columns
+from drg.validation.reference import load_reference_profile, ReferenceColumnMissing, DEFAULT_BUCKETS
+from drg.validation.sampling import DriftSample, sample_spec
 from drg.utils import logger
-
-class ValidationResult:
-    def __init__(self, check_name: str, passed: bool, metric: Any, details: Dict = None):
-        self.check_name = check_name
-        self.passed = passed
-        self.metric = metric
-        self.details = details or {}
+from drg import metrics
 
 def validate_schema(df: pd.DataFrame, schema: List[SchemaField]) -> ValidationResult:
+    return schema_result(df.columns, schema)
+
+def schema_result(columns, schema: List[SchemaField]) -> ValidationResult:
+    """Presence check against an already-known set of column names."""
     missing_cols = []
     type_mismatch = []
     
     for field in schema:
-        if field.name not in df.columns:
+        if field.name not in columns:
             if field.required:
                 missing_cols.append(field.name)
         else:
@@ -31,7 +37,9 @@ def validate_schema(df: pd.DataFrame, schema: List[SchemaField]) -> ValidationRe
     return ValidationResult("schema_presence", True, 0, {})
 
 def validate_volume(df: pd.DataFrame, checks: Dict) -> ValidationResult:
-    count = len(df)
+    return volume_result(len(df), checks)
+
+def volume_result(count: int, checks: Dict) -> ValidationResult:
     min_rows = checks.get('volume', {}).get('min_rows', 0)
     max_rows = checks.get('volume', {}).get('max_rows', float('inf'))
     
@@ -39,14 +47,16 @@ def validate_volume(df: pd.DataFrame, checks: Dict) -> ValidationResult:
     return ValidationResult("volume", passed, count, {"min": min_rows, "max": max_rows})
 
 def validate_freshness(df: pd.DataFrame, checks: Dict) -> ValidationResult:
-    config = checks.get('freshness', {})
-    max_delay = config.get('max_delay_hours', 24)
-    
     if 'pickup_datetime' not in df.columns:
         return ValidationResult("freshness", False, "N/A", {"error": "pickup_datetime missing"})
     
     # Ideally use max timestamp in data
     latest_ts = pd.to_datetime(df['pickup_datetime']).max()
+    return freshness_result(latest_ts, checks)
+
+def freshness_result(latest_ts, checks: Dict) -> ValidationResult:
+    """Builds the freshness result from an already-computed max timestamp (NaT if no rows)."""
+    max_delay = checks.get('freshness', {}).get('max_delay_hours', 24)
     now = datetime.now() # In real system, pass 'execution_time'
     
     # If data is purely synthetic and "now" is used during generation, this might be tricky if system clocks drift
@@ -58,74 +68,128 @@ def validate_freshness(df: pd.DataFrame, checks: Dict) -> ValidationResult:
 
 def calculate_psi(expected, actual, bucket_type='bins', buckets=10, axis=0):
     '''Calculate the PSI (population stability index) across all variables'''
-    def psi(expected_array, actual_array, buckets):
-        def scale_range (input, min, max):
-            input += -(np.min(input))
-            input /= np.max(input) / (max - min)
-            input += min
-            return input
-
-        breakpoints = np.arange(0, buckets + 1) / (buckets) * 100
+    breakpoints = psi_breakpoints(expected, buckets, bucket_type)
 
-        if bucket_type == 'bins':
-            breakpoints = scale_range(breakpoints, np.min(expected_array), np.max(expected_array))
-        elif bucket_type == 'quantiles':
-            breakpoints = np.stack([np.percentile(expected_array, b) for b in breakpoints])
+    expected_percents = np.histogram(expected, breakpoints)[0] / len(expected)
+    actual_percents = np.histogram(actual, breakpoints)[0] / len(actual)
 
-        expected_percents = np.histogram(expected_array, breakpoints)[0] / len(expected_array)
-        actual_percents = np.histogram(actual_array, breakpoints)[0] / len(actual_array)
+    return psi_scores(expected_percents, actual_percents)
 
-        def sub_psi(e_perc, a_perc):
-            if a_perc == 0:
-                a_perc = 0.0001
-            if e_perc == 0:
-                e_perc = 0.0001
+def _json_float(value, digits=4):
+    # NaN/inf are not valid JSONB
+    return round(float(value), digits) if np.isfinite(value) else None
 
-            value = (e_perc - a_perc) * np.log(e_perc / a_perc)
-            return(value)
+def drift_histograms(profile: dict, limits: Dict, scored: List[str], available) -> Dict[str, ColumnHistogram]:
+    """
+    One ColumnHistogram per scorable column present in the data.
+    Gated columns that are missing from (or unusable in) the reference raise, like the raw-reference path did.
+    """
+    for column in limits:
+        if column not in available:
+            continue
+        if column in profile["missing"]:
+            raise ReferenceColumnMissing(column)
+        if column in profile["errors"]:
+            raise ValueError(profile["errors"][column])
+    return {c: ColumnHistogram(profile["columns"][c]) for c in scored if c in available and c in profile["columns"]}
 
-        psi_value = np.sum(sub_psi(expected_percents[i], actual_percents[i]) for i in range(0, len(expected_percents)))
-        return psi_value
+def drift_result(histograms: Dict[str, ColumnHistogram], limits: Dict, primary: str, threshold: float,
+                 sample: DriftSample = None) -> ValidationResult:
+    """Gates on the point estimates; a sampled run also reports each score's sampling error."""
+    scores = score_drift(histograms)
+    errors = sample.errors(histograms) if sample is not None else {}
+    passed = True
+    columns = {}
+    for column, s in scores.items():
+        column_limits = limits.get(column, {})
+        ok = all(s[m] <= limit for m, limit in column_limits.items())
+        passed = passed and ok
+        columns[column] = {m: _json_float(s[m]) for m in ('psi', 'js', 'ks', 'ks_pvalue')}
+        columns[column].update({"n": s["n"], "gated": bool(column_limits), "passed": bool(ok)})
+        if column in errors:
+            columns[column].update({"psi_error": errors[column]["psi"], "ks_error": errors[column]["ks"]})
 
-    return psi(expected, actual, buckets)
+    psi_score = scores[primary]["psi"]
+    details = {"threshold": threshold, "columns": columns}
+    if sample is not None:
+        details["sample"] = sample.describe()
+    return ValidationResult("distribution", passed, round(psi_score, 4), details)
 
-def validate_distribution(df: pd.DataFrame, checks: Dict) -> ValidationResult:
+def validate_distribution(df: pd.DataFrame, checks: Dict, schema: List[SchemaField] = None, drift=None) -> ValidationResult:
     config = checks.get('distribution', {})
     method = config.get('method')
-    column = config.get('column')
     threshold = config.get('threshold', 0.2)
     ref_path = config.get('reference_path')
+    if drift is not None:
+        column, limits, scored, sampling = drift.primary, drift.limits, list(drift.scored), drift.sample
+    else:
+        column, limits, scored = resolve_drift_columns(config, schema or [])
+        sampling = sample_spec(config)
     
     if method != 'psi' or not ref_path or column not in df.columns:
         return ValidationResult("distribution", True, 0.0, {"skip": "invalid config or col missing"})
         
+    sample = None
+    if sampling is not None and len(df) > sampling.rows:
+        # Row groups are gone once the file is a frame: a uniform sample of rows
+        sample = DriftSample(sampling, "rows", len(df), rows=sampling.rows)
+        df = df.sample(sampling.rows, random_state=sampling.seed)
+
     try:
-        ref_df = pd.read_parquet(ref_path)
-        if column not in ref_df.columns:
-             return ValidationResult("distribution", False, -1, {"error": "col missing in ref"})
-             
-        psi_score = calculate_psi(ref_df[column].dropna().values, df[column].dropna().values)
-        passed = psi_score <= threshold
-        return ValidationResult("distribution", passed, round(psi_score, 4), {"threshold": threshold})
-        
+        # Every scored column shares the reference profile and one vectorized scoring pass
+        profile = load_reference_profile(ref_path, scored, config.get('buckets', DEFAULT_BUCKETS))
+        histograms = drift_histograms(profile, limits, scored, df.columns)
+        for name, hist in list(histograms.items()):
+            try:
+                hist.update(df[name].dropna().values)
+            except (TypeError, ValueError):
+                if name in limits:
+                    raise
+                del histograms[name] # informational column that is no longer numeric
+
+        return drift_result(histograms, limits, column, threshold, sample)
+
+    except ReferenceColumnMissing:
+        return ValidationResult("distribution", False, -1, {"error": "col missing in ref"})
     except Exception as e:
         logger.error(f"Distribution check failed: {e}")
         return ValidationResult("distribution", False, -1, {"error": str(e)})
 
-def run_validations(df: pd.DataFrame, contract: Contract) -> List[ValidationResult]:
+def run_validations(df: pd.DataFrame, contract: ContractLike) -> List[ValidationResult]:
+    """Runs every check of a Contract or compiled ValidationPlan against an in-memory frame."""
+    plan = plan_for(contract)
+    schema, checks = plan.contract.schema, plan.checks_config
     results = []
     
     # 1. Schema
-    results.append(validate_schema(df, contract.schema))
+    with metrics.check("schema_presence"):
+        results.append(validate_schema(df, schema))
+    
+    # 1b. Column types, bounds and null rates (one columnar pass)
+    with metrics.check("columns"):
+        results.extend(validate_columns(df, schema, checks, plan.column_rules))
     
     # 2. Volume
-    results.append(validate_volume(df, contract.checks))
+    with metrics.check("volume"):
+        results.append(validate_volume(df, checks))
     
     # 3. Freshness
-    results.append(validate_freshness(df, contract.checks))
+    with metrics.check("freshness"):
+        results.append(validate_freshness(df, checks))
+    
+    # 3b. Duplicate IDs within this data (across runs: drg.pipeline)
+    if plan.check('uniqueness') is not None:
+        with metrics.check("uniqueness"):
+            results.append(validate_uniqueness(df, checks))
     
     # 4. Distribution
-    if 'distribution' in contract.checks:
-        results.append(validate_distribution(df, contract.checks))
+    if plan.drift is not None:
+        with metrics.check("distribution"):
+            results.append(validate_distribution(df, checks, schema, plan.drift))
+    
+    # 5. Mergeable per-column sketches (stored per run; the baseline check runs at commit)
+    if plan.check('sketches') is not None:
+        with metrics.check("sketches"):
+            results.append(validate_sketches(df, checks))
         
     return results
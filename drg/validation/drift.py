@@ -0,0 +1,131 @@
+import numpy as np
+from scipy.spatial.distance import jensenshannon
+from scipy.stats import kstwobign
+from typing import Dict, List, Tuple
+from drg.contracts.loader import SchemaField
+
+PSI_FLOOR = 0.0001
+METRICS = ('psi', 'js', 'ks')
+NUMERIC_TYPES = ('int', 'float')
+
+def psi_breakpoints(expected_array, buckets=10, bucket_type='bins'):
+    """Bucket edges derived from the expected (reference) sample only. Does not mutate its input."""
+    breakpoints = np.arange(0, buckets + 1) / (buckets) * 100
+
+    if bucket_type == 'bins':
+        lo, hi = np.min(expected_array), np.max(expected_array)
+        scaled = breakpoints - np.min(breakpoints)
+        scaled = scaled / (np.max(scaled) / (hi - lo))
+        return scaled + lo
+    elif bucket_type == 'quantiles':
+        return np.stack([np.percentile(expected_array, b) for b in breakpoints])
+
+    return breakpoints
+
+def psi_scores(expected_percents: np.ndarray, actual_percents: np.ndarray) -> np.ndarray:
+    """Row-wise PSI over (columns, buckets) matrices of bucket fractions."""
+    e = np.where(expected_percents == 0, PSI_FLOOR, expected_percents)
+    a = np.where(actual_percents == 0, PSI_FLOOR, actual_percents)
+    return np.sum((e - a) * np.log(e / a), axis=-1)
+
+def drift_grid(edges, quantiles) -> np.ndarray:
+    """Grid the histograms count against and the reference profile's CDF is taken at."""
+    return np.unique(np.concatenate([np.asarray(edges), np.asarray(quantiles)]))
+
+class ColumnHistogram:
+    """
+    Counts one column against a grid made of the reference PSI edges and quantiles.
+    A single searchsorted per batch feeds PSI/JS buckets (np.histogram semantics)
+    and the KS CDF, and the counts merge exactly across batches.
+    """
+    def __init__(self, entry: dict):
+        self.entry = entry
+        edges = np.asarray(entry['edges'])
+        quantiles = np.asarray(entry['quantiles'])
+        self.grid = drift_grid(edges, quantiles)
+        self.edge_pos = np.searchsorted(self.grid, edges)
+        # left[j]: values with exactly j grid points below them; equal[k]: values == grid[k]
+        self.left = np.zeros(len(self.grid) + 1, dtype=np.int64)
+        self.equal = np.zeros(len(self.grid), dtype=np.int64)
+        self.n = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        pos = np.searchsorted(self.grid, values, side='left')
+        self.left += np.bincount(pos, minlength=len(self.left))
+        inside = pos < len(self.grid)
+        hit = pos[inside]
+        self.equal += np.bincount(hit[self.grid[hit] == values[inside]], minlength=len(self.equal))
+        self.n += len(values)
+
+    def bucket_counts(self) -> np.ndarray:
+        return bucket_counts(self.left, self.equal, self.edge_pos)
+
+    def ks(self) -> float:
+        return float(ks_distance(self.left, self.equal, self.entry['grid_below'], self.entry['grid_cdf']))
+
+# Shared with the sampling bootstrap, which evaluates stacks of (left, equal) counts at once;
+# the leading axes are carried through.
+
+def _at_or_below(left: np.ndarray) -> np.ndarray:
+    return np.cumsum(left, axis=-1)[..., :-1]
+
+def bucket_counts(left: np.ndarray, equal: np.ndarray, edge_pos: np.ndarray) -> np.ndarray:
+    # [e_i, e_i+1) for inner buckets, last bucket closed on the right (as np.histogram)
+    le = _at_or_below(left)
+    bounds = (le - equal)[..., edge_pos]
+    bounds[..., -1] = le[..., edge_pos[-1]]
+    return np.diff(bounds, axis=-1)
+
+def ks_distance(left: np.ndarray, equal: np.ndarray, ref_below, ref_at) -> np.ndarray:
+    """
+    KS D against the reference CDF on both sides of every grid point, F(g-) and F(g).
+    Both CDFs are monotone, so this is the exact D minus at most the reference mass
+    strictly between two adjacent grid points (under 5% with 21 quantiles in the grid).
+    """
+    n = left.sum(axis=-1, keepdims=True)
+    at = _at_or_below(left)
+    return np.maximum(np.abs(at / n - np.asarray(ref_at)),
+                      np.abs((at - equal) / n - np.asarray(ref_below))).max(axis=-1)
+
+def score_drift(histograms: Dict[str, ColumnHistogram]) -> Dict[str, Dict[str, float]]:
+    """PSI, Jensen-Shannon distance and KS for every column in one set of matrix ops."""
+    if not histograms:
+        return {}
+    names = list(histograms)
+    hists = [histograms[c] for c in names]
+    n_actual = np.array([h.n for h in hists], dtype=np.float64)
+    n_expected = np.array([h.entry['count'] for h in hists], dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = np.array([h.entry['expected'] for h in hists])
+        actual = np.array([h.bucket_counts() for h in hists]) / n_actual[:, None]
+        psi = psi_scores(expected, actual)
+        js = jensenshannon(expected, actual, axis=1, base=2)
+
+        # Two-sample KS over the merged grid of edges and quantiles (see ks_distance), asymptotic p-value
+        ks = np.array([h.ks() for h in hists])
+        ks_pvalue = kstwobign.sf(ks * np.sqrt(n_expected * n_actual / (n_expected + n_actual)))
+
+    return {
+        c: {"psi": psi[i], "js": js[i], "ks": ks[i], "ks_pvalue": ks_pvalue[i], "n": int(n_actual[i])}
+        for i, c in enumerate(names)
+    }
+
+def resolve_drift_columns(config: Dict, schema: List[SchemaField]) -> Tuple[str, Dict[str, Dict[str, float]], List[str]]:
+    """
+    Returns (primary column, per-column limits for gated columns, all columns to score).
+    `column`/`threshold` gate the primary column on PSI; `columns` adds per-column psi/js/ks limits.
+    Other numeric schema columns are scored and reported but never gate.
+    """
+    limits: Dict[str, Dict[str, float]] = {}
+    primary = config.get('column')
+    if primary:
+        limits[primary] = {'psi': config.get('threshold', 0.2)}
+    for name, column_limits in (config.get('columns') or {}).items():
+        limits.setdefault(name, {}).update({m: v for m, v in (column_limits or {}).items() if m in METRICS})
+        primary = primary or name
+
+    scored = list(limits)
+    scored += [f.name for f in schema if f.type in NUMERIC_TYPES and f.name not in limits]
+    return primary, limits, scored
@@ -0,0 +1,71 @@
+import os
+import resource
+import pyarrow as pa
+from typing import Iterable, List, Optional
+from drg.contracts.compiler import ValidationPlan
+
+# Memory budget for the loading modes ('memory', 'arrow'). A file whose estimated
+# in-memory size exceeds it is validated in 'stream' mode instead. Unset = no limit.
+MEMORY_BUDGET_ENV = "DRG_MEMORY_BUDGET_MB"
+# What pandas adds per string value on top of its bytes: a str object header plus the pointer
+PY_STRING_OVERHEAD = 57
+FRESHNESS_COLUMN = 'pickup_datetime'
+
+def memory_budget() -> Optional[int]:
+    """The configured budget in bytes (None when unset)."""
+    mb = os.environ.get(MEMORY_BUDGET_ENV)
+    return int(float(mb) * 1024 * 1024) if mb else None
+
+def load_columns(plan: ValidationPlan, schema: pa.Schema) -> List[str]:
+    """The file's columns any check reads, in file order; nothing else needs to be decoded."""
+    wanted = set(plan.columns) | {FRESHNESS_COLUMN}
+    return [name for name in schema.names if name in wanted]
+
+def estimated_bytes(footers: Iterable, schema: pa.Schema, columns: List[str], mode: str) -> int:
+    """
+    Decoded size of `columns` from the footers' uncompressed column-chunk sizes (what Arrow
+    holds). In 'memory' mode string columns become Python objects, which cost
+    PY_STRING_OVERHEAD more per value. An estimate: dictionary pages understate repeats.
+    """
+    strings = {f.name for f in schema if pa.types.is_string(f.type) or pa.types.is_large_string(f.type)}
+    total = 0
+    for footer in footers:
+        for i in range(footer.num_row_groups):
+            rg = footer.row_group(i)
+            for j in range(rg.num_columns):
+                chunk = rg.column(j)
+                if chunk.path_in_schema not in columns:
+                    continue
+                total += chunk.total_uncompressed_size
+                if mode == "memory" and chunk.path_in_schema in strings:
+                    total += chunk.num_values * PY_STRING_OVERHEAD
+    return total
+
+def fits_budget(footers: Iterable, schema: pa.Schema, columns: List[str], mode: str,
+                budget: Optional[int] = None) -> bool:
+    budget = budget if budget is not None else memory_budget()
+    return budget is None or estimated_bytes(footers, schema, columns, mode) <= budget
+
+def reset_peak_rss():
+    """Restarts the peak-RSS high-water mark at the current RSS (Linux); elsewhere a no-op."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def peak_rss_bytes() -> int:
+    """
+    High-water RSS since the last reset_peak_rss(). Without /proc this is the process
+    lifetime peak. Process-wide: concurrent runs (e.g. under `drg serve`) share it.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
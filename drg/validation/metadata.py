@@ -0,0 +1,96 @@
+import pyarrow.parquet as pq
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from drg.contracts.compiler import ContractLike
+from drg.validation.core import ValidationResult
+from drg.validation.streaming import CheckAccumulator, build_accumulators, fold_batches, DEFAULT_BATCH_SIZE
+from drg.utils import logger
+from drg import metrics
+
+@dataclass
+class ColumnStats:
+    min: Any
+    max: Any
+    null_count: int
+
+class FooterStats:
+    """
+    File-level view over the row-group statistics in a Parquet footer.
+    Nothing here touches data pages.
+    """
+    def __init__(self, metadata: pq.FileMetaData):
+        self.metadata = metadata
+        self.num_rows = metadata.num_rows
+        self._index = {}
+        if metadata.num_row_groups:
+            rg = metadata.row_group(0)
+            self._index = {rg.column(i).path_in_schema: i for i in range(rg.num_columns)}
+        self._cache: Dict[str, Optional[ColumnStats]] = {}
+
+    def column(self, name: str) -> Optional[ColumnStats]:
+        """Min/max/null count merged over row groups, or None if any row group lacks usable stats."""
+        if name not in self._cache:
+            self._cache[name] = self._merge(name)
+        return self._cache[name]
+
+    def _merge(self, name: str) -> Optional[ColumnStats]:
+        if self.num_rows and name not in self._index:
+            return None
+
+        lo, hi, nulls = None, None, 0
+        for g in range(self.metadata.num_row_groups):
+            rg = self.metadata.row_group(g)
+            if rg.num_rows == 0:
+                continue
+            chunk = rg.column(self._index[name])
+            stats = chunk.statistics
+            # INT96 timestamps carry no reliable ordering stats
+            if stats is None or chunk.physical_type == 'INT96' or not stats.has_null_count:
+                return None
+            nulls += stats.null_count
+            if not stats.has_min_max:
+                if stats.null_count == rg.num_rows:
+                    continue  # all-null row group has nothing to order
+                return None
+            lo = stats.min if lo is None else min(lo, stats.min)
+            hi = stats.max if hi is None else max(hi, stats.max)
+
+        return ColumnStats(min=lo, max=hi, null_count=nulls)
+
+def plan_validations(pf: pq.ParquetFile, contract: ContractLike) -> Tuple[List[CheckAccumulator], List[CheckAccumulator], List[str]]:
+    """
+    Metadata-first planner.
+    Returns (all accumulators, those still needing data, columns to read for them).
+    """
+    schema = pf.schema_arrow
+    footer = FooterStats(pf.metadata)
+    accumulators = build_accumulators(contract)
+
+    pending = []
+    columns = []
+    for acc in accumulators:
+        acc.start(schema)
+        if acc.from_footer(footer) or acc.from_file(pf):
+            continue
+        pending.append(acc)
+        for col in acc.columns:
+            if col in schema.names and col not in columns:
+                columns.append(col)
+
+    return accumulators, pending, columns
+
+def run_validations_metadata(path: str, contract: ContractLike, batch_size: int = DEFAULT_BATCH_SIZE) -> List[ValidationResult]:
+    """
+    Answers what it can from the footer (row count, presence, timestamp bounds)
+    and streams only the columns the remaining checks (e.g. PSI) actually need.
+    """
+    pf = pq.ParquetFile(path)
+    accumulators, pending, columns = plan_validations(pf, contract)
+    logger.info(f"Footer or sampling answered {len(accumulators) - len(pending)}/{len(accumulators)} checks; scanning columns {columns}")
+
+    rows = 0
+    if pending:
+        rows = fold_batches(pf.iter_batches(batch_size=batch_size, columns=columns), pending)
+    metrics.record_scan("metadata", rows, metrics.parquet_bytes(pf.metadata, columns) if rows and metrics.enabled() else 0)
+
+    return [r for acc in accumulators for r in acc.results()]
@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import pandas as pd
+import pyarrow.parquet as pq
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from drg.validation.base import ValidationResult
+from drg.validation.cache import dataset_fingerprint
+from drg.validation.metadata import FooterStats
+from drg.utils import logger
+
+# Bump when the entry layout or how stats are derived changes; older indexes are rebuilt
+INDEX_VERSION = 1
+INDEX_PATH = os.environ.get("DRG_PARTITION_INDEX", "data/cache/partitions.json")
+TIMESTAMP_COLUMN = "pickup_datetime"
+
+@dataclass
+class PartitionEntry:
+    fingerprint: str
+    size: int
+    mtime_ns: int
+    rows: int
+    min_ts: Optional[str]  # ISO, None if the partition has no timestamps
+    max_ts: Optional[str]
+
+def partition_stats(path: str) -> Tuple[int, Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+    """(rows, min, max pickup time) from footer statistics, reading the one column only if they're unusable."""
+    pf = pq.ParquetFile(path)
+    schema = pf.schema_arrow
+    if TIMESTAMP_COLUMN not in schema.names:
+        return pf.metadata.num_rows, None, None
+    stats = FooterStats(pf.metadata).column(TIMESTAMP_COLUMN)
+    if stats is not None and stats.min is not None and isinstance(stats.min, (datetime, pd.Timestamp)):
+        return pf.metadata.num_rows, pd.Timestamp(stats.min), pd.Timestamp(stats.max)
+    column = pd.to_datetime(pf.read(columns=[TIMESTAMP_COLUMN]).column(0).to_pandas())
+    if column.notna().any():
+        return pf.metadata.num_rows, column.min(), column.max()
+    return pf.metadata.num_rows, None, None
+
+class PartitionIndex:
+    """
+    Watermark index: per-partition fingerprint, row count and min/max event time, in one
+    JSON file keyed by absolute path. A partition whose size and mtime are unchanged is
+    not opened at all; one whose stat changed but fingerprint didn't costs one footer read.
+    Writes are atomic; concurrent writers are last-wins, so update it from one process.
+    """
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self.entries: Dict[str, PartitionEntry] = {}
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.entries = {p: PartitionEntry(**e) for p, e in data["partitions"].items()}
+        except (OSError, ValueError, TypeError, KeyError):
+            pass
+
+    def changed(self, paths: List[str]) -> List[str]:
+        """Paths that are new or whose contents changed since they were last indexed."""
+        out = []
+        for path in paths:
+            entry = self.entries.get(os.path.abspath(path))
+            try:
+                st = os.stat(path)
+            except OSError:
+                out.append(path)  # let the caller report the missing file
+                continue
+            if entry is not None and (entry.size, entry.mtime_ns) == (st.st_size, st.st_mtime_ns):
+                continue
+            if entry is not None and entry.fingerprint == dataset_fingerprint(path):
+                # Touched but identical (e.g. copied back): just refresh the stat
+                entry.size, entry.mtime_ns = st.st_size, st.st_mtime_ns
+                continue
+            out.append(path)
+        return out
+
+    def update(self, path: str) -> Optional[PartitionEntry]:
+        """Indexes one partition (dropping it if the file is gone)."""
+        key = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+            rows, lo, hi = partition_stats(path)
+        except OSError:
+            self.entries.pop(key, None)
+            return None
+        entry = PartitionEntry(dataset_fingerprint(path), st.st_size, st.st_mtime_ns, rows,
+                               None if lo is None else lo.isoformat(), None if hi is None else hi.isoformat())
+        self.entries[key] = entry
+        return entry
+
+    def get(self, path: str) -> Optional[PartitionEntry]:
+        return self.entries.get(os.path.abspath(path))
+
+    def prune(self):
+        """Forgets partitions whose files no longer exist."""
+        self.entries = {p: e for p, e in self.entries.items() if os.path.exists(p)}
+
+    def save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump({"version": INDEX_VERSION, "updated_at": time.time(),
+                           "partitions": {p: asdict(e) for p, e in self.entries.items()}}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save partition index: {e}")
+
+def dataset_results(entries: List[PartitionEntry], checks: Dict, now: datetime = None) -> List[ValidationResult]:
+    """
+    Freshness, volume and gap checks over a whole dataset, computed from indexed
+    watermarks alone. Gaps are stretches of event time no partition covers.
+    """
+    now = now or datetime.now()
+    config = checks.get('dataset', {})
+    spans = sorted((pd.Timestamp(e.min_ts), pd.Timestamp(e.max_ts)) for e in entries if e.max_ts is not None)
+
+    max_delay = checks.get('freshness', {}).get('max_delay_hours', 24)
+    if spans:
+        watermark = max(hi for _, hi in spans)
+        delay_hours = (pd.Timestamp(now) - watermark).total_seconds() / 3600.0
+        freshness = ValidationResult("dataset_freshness", delay_hours <= max_delay, round(delay_hours, 2),
+                                     {"threshold": max_delay, "watermark": str(watermark), "partitions": len(entries)})
+    else:
+        freshness = ValidationResult("dataset_freshness", False, "N/A", {"error": "no timestamps indexed"})
+
+    total = sum(e.rows for e in entries)
+    min_rows = config.get('min_rows', 0)
+    max_rows = config.get('max_rows')
+    volume = ValidationResult("dataset_volume", min_rows <= total and (max_rows is None or total <= max_rows), total,
+                              {"min": min_rows, "max": max_rows, "partitions": len(entries)})
+
+    max_gap = config.get('max_gap_hours')
+    gaps = []
+    largest = 0.0
+    covered = None
+    for lo, hi in spans:
+        if covered is not None and lo > covered:
+            hours = (lo - covered).total_seconds() / 3600.0
+            largest = max(largest, hours)
+            if max_gap is not None and hours > max_gap:
+                gaps.append({"from": str(covered), "to": str(lo), "hours": round(hours, 2)})
+        covered = hi if covered is None else max(covered, hi)
+    gap = ValidationResult("dataset_gaps", not gaps, len(gaps),
+                           {"threshold": max_gap, "largest_hours": round(largest, 2), "gaps": gaps[:20]})
+
+    return [freshness, volume, gap]
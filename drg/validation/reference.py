@@ -0,0 +1,135 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from typing import Dict, List, Tuple
+from drg.contracts.loader import Contract
+from drg.validation.drift import drift_grid, psi_breakpoints, resolve_drift_columns
+from drg.utils import logger
+
+PROFILE_VERSION = 3
+DEFAULT_BUCKETS = 10
+QUANTILE_POINTS = list(range(0, 101, 5))
+
+# abs reference path -> profile dict. Validated against the file's mtime on every
+# lookup and against its content hash when the mtime moves.
+_PROFILE_CACHE: Dict[str, dict] = {}
+
+class ReferenceColumnMissing(KeyError):
+    pass
+
+def profile_path_for(ref_path: str) -> str:
+    return os.path.splitext(ref_path)[0] + ".profile.json"
+
+def profile_columns(contract: Contract) -> List[str]:
+    """Every column the drift engine scores: gated distribution columns plus numeric schema columns."""
+    return resolve_drift_columns(contract.checks.get('distribution', {}), contract.schema)[2]
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def build_reference_profile(ref_path: str, columns: List[str], buckets: int = DEFAULT_BUCKETS) -> dict:
+    """Reads the reference once and keeps only what drift checks need: edges, expected fractions, quantiles and the CDF on their grid."""
+    st = os.stat(ref_path)
+    names = pq.read_schema(ref_path).names
+    present = [c for c in columns if c in names]
+    ref_df = pd.read_parquet(ref_path, columns=present)
+
+    profile = {
+        "version": PROFILE_VERSION,
+        "reference_path": ref_path,
+        "reference_sha256": file_digest(ref_path),
+        "reference_mtime_ns": st.st_mtime_ns,
+        "reference_size": st.st_size,
+        "buckets": buckets,
+        "columns": {},
+        "missing": [c for c in columns if c not in names],
+        "errors": {},
+    }
+    for column in present:
+        try:
+            expected = ref_df[column].dropna().values
+            breakpoints = psi_breakpoints(expected, buckets)
+            quantiles = np.percentile(expected, QUANTILE_POINTS)
+            ordered = np.sort(expected)
+            grid = drift_grid(breakpoints, quantiles)
+            profile["columns"][column] = {
+                "count": int(len(expected)),
+                "edges": breakpoints.tolist(),
+                "expected": (np.histogram(expected, breakpoints)[0] / len(expected)).tolist(),
+                "quantiles": quantiles.tolist(),
+                # Reference CDF just below and at every grid point, for KS
+                "grid_below": (np.searchsorted(ordered, grid, side='left') / len(expected)).tolist(),
+                "grid_cdf": (np.searchsorted(ordered, grid, side='right') / len(expected)).tolist(),
+            }
+        except Exception as e:
+            # Kept so validation reports the same error it would have hit on the raw reference
+            profile["errors"][column] = str(e)
+
+    return profile
+
+def write_reference_profile(profile: dict, path: str = None):
+    path = path or profile_path_for(profile["reference_path"])
+    tmp = f"{path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(profile, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Could not write reference profile {path}: {e}")
+
+def _read_profile_file(path: str):
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return profile if profile.get("version") == PROFILE_VERSION else None
+
+def _covers(profile: dict, columns: List[str], buckets: int) -> bool:
+    known = set(profile["columns"]) | set(profile["missing"]) | set(profile["errors"])
+    return profile["buckets"] == buckets and all(c in known for c in columns)
+
+def load_reference_profile(ref_path: str, columns: List[str], buckets: int = DEFAULT_BUCKETS) -> dict:
+    """
+    Returns the profile for ref_path covering `columns`.
+    Unchanged mtime -> cached profile; changed mtime but same content hash -> cached profile;
+    otherwise the reference is re-read and the profile rewritten next to it.
+    """
+    key = os.path.abspath(ref_path)
+    st = os.stat(ref_path)
+
+    profile = _PROFILE_CACHE.get(key) or _read_profile_file(profile_path_for(ref_path))
+    if profile is not None and (profile["reference_mtime_ns"], profile["reference_size"]) != (st.st_mtime_ns, st.st_size):
+        if profile["reference_sha256"] == file_digest(ref_path):
+            profile["reference_mtime_ns"] = st.st_mtime_ns
+            write_reference_profile(profile, profile_path_for(ref_path))
+        else:
+            logger.info(f"Reference {ref_path} changed; rebuilding profile")
+            profile = None
+
+    if profile is None or not _covers(profile, columns, buckets):
+        wanted = list(columns)
+        if profile is not None and profile["buckets"] == buckets:
+            wanted += [c for c in profile["columns"] if c not in wanted]
+        profile = build_reference_profile(ref_path, wanted, buckets)
+        write_reference_profile(profile, profile_path_for(ref_path))
+
+    _PROFILE_CACHE[key] = profile
+    return profile
+
+def reference_histogram(ref_path: str, column: str, buckets: int = DEFAULT_BUCKETS) -> Tuple[np.ndarray, np.ndarray]:
+    """(breakpoints, expected fractions) for one column, served from the cached profile."""
+    profile = load_reference_profile(ref_path, [column], buckets)
+    if column in profile["missing"]:
+        raise ReferenceColumnMissing(column)
+    if column in profile["errors"]:
+        raise ValueError(profile["errors"][column])
+    entry = profile["columns"][column]
+    return np.asarray(entry["edges"]), np.asarray(entry["expected"])
@@ -0,0 +1,62 @@
+import pandas as pd
+import pyarrow.parquet as pq
+from functools import partial
+from typing import List, Optional
+from drg.contracts.compiler import ContractLike, plan_for
+from drg.validation.core import ValidationResult, run_validations
+from drg.validation.streaming import run_validations_streaming, run_validations_arrow, DEFAULT_BATCH_SIZE
+from drg.validation.metadata import run_validations_metadata
+from drg.validation.cache import ResultCache, cached_validate
+from drg.validation.memory import load_columns, fits_budget, reset_peak_rss, peak_rss_bytes
+from drg.utils import logger
+from drg import metrics
+
+MODES = ("memory", "arrow", "stream", "metadata")
+
+def validate_file(path: str, contract: ContractLike, mode: str = "memory", batch_size: int = DEFAULT_BATCH_SIZE,
+                  cache: Optional[ResultCache] = None) -> List[ValidationResult]:
+    """
+    Runs every contract check against one Parquet file.
+    'memory' loads the columns the contract reads with pandas; 'arrow' reads them into one
+    memory-mapped pyarrow.Table and folds it through the accumulators; 'stream' folds record
+    batches; 'metadata' answers what it can from footer statistics and streams only the rest.
+    'memory' and 'arrow' switch to 'stream' when the file would not fit the memory budget
+    (DRG_MEMORY_BUDGET_MB). With a cache, an unchanged file/contract/reference returns the
+    stored results without reading data. Logs the run's peak RSS.
+    """
+    reset_peak_rss()
+    with metrics.stage("validate"):
+        if cache is not None:
+            results = cached_validate(path, contract, partial(_validate, mode=mode, batch_size=batch_size), cache, mode)
+        else:
+            results = _validate(path, contract, mode, batch_size)
+    metrics.record_results(results)
+    report_peak_rss(mode)
+    return results
+
+def report_peak_rss(mode: str):
+    peak = peak_rss_bytes()
+    logger.info(f"Peak RSS: {peak / (1024 * 1024):.1f} MB (mode={mode})")
+    metrics.record_peak_rss(mode, peak)
+
+def _validate(path: str, contract: ContractLike, mode: str, batch_size: int) -> List[ValidationResult]:
+    if mode == "stream":
+        return run_validations_streaming(path, contract, batch_size=batch_size)
+    if mode == "metadata":
+        return run_validations_metadata(path, contract, batch_size=batch_size)
+    if mode not in ("memory", "arrow"):
+        raise ValueError(f"Unknown validation mode: {mode}")
+
+    pf = pq.ParquetFile(path)
+    columns = load_columns(plan_for(contract), pf.schema_arrow)
+    if not fits_budget([pf.metadata], pf.schema_arrow, columns, mode):
+        logger.warning(f"{path} would exceed the memory budget in {mode} mode; streaming it instead")
+        return run_validations_streaming(path, contract, batch_size=batch_size)
+    if mode == "arrow":
+        return run_validations_arrow(path, contract, batch_size=batch_size)
+
+    with metrics.stage("read"):
+        df = pd.read_parquet(path, columns=columns)
+    if metrics.enabled():
+        metrics.record_scan("memory", len(df), metrics.parquet_bytes(pf.metadata, columns))
+    return run_validations(df, contract)
@@ -0,0 +1,163 @@
+import math
+import numpy as np
+import pyarrow as pa
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from drg.validation.drift import ColumnHistogram, bucket_counts, ks_distance, psi_scores
+
+# Sampled drift scoring (contract `distribution.sample`). Schema, volume, freshness and the
+# other checks always see every row; only the drift histograms are fed a sample.
+
+STRATEGIES = ("row_groups", "reservoir")
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_BOOTSTRAP = 200
+# Fewer clusters than this and a bootstrap over row groups can't see between-group variance.
+# Capped at a quarter of the file's row groups, so a file with few of them isn't mostly read.
+MIN_SAMPLED_GROUPS = 8
+MAX_SAMPLED_SHARE = 4
+
+@dataclass(frozen=True)
+class SampleSpec:
+    rows: int
+    strategy: str = "row_groups"
+    confidence: float = DEFAULT_CONFIDENCE
+    bootstrap: int = DEFAULT_BOOTSTRAP
+    seed: int = 0
+
+def sample_spec(config: Dict) -> Optional[SampleSpec]:
+    """
+    The distribution check's `sample` section. `rows` fixes the sample size; `max_error`
+    instead bounds the KS error at `confidence`, and the size follows from the DKW
+    inequality: n = ln(2 / (1 - confidence)) / (2 * max_error^2). None if not sampling.
+    """
+    section = config.get('sample')
+    if not section:
+        return None
+    confidence = float(section.get('confidence', DEFAULT_CONFIDENCE))
+    if not 0 < confidence < 1:
+        raise ValueError(f"distribution.sample.confidence must be in (0, 1), got {confidence}")
+    if 'rows' in section:
+        rows = int(section['rows'])
+    elif 'max_error' in section:
+        rows = math.ceil(math.log(2 / (1 - confidence)) / (2 * float(section['max_error']) ** 2))
+    else:
+        raise ValueError("distribution.sample needs `rows` or `max_error`")
+    strategy = section.get('strategy', 'row_groups')
+    if strategy not in STRATEGIES:
+        raise ValueError(f"distribution.sample.strategy must be one of {STRATEGIES}, got {strategy!r}")
+    if rows < 1:
+        raise ValueError(f"distribution.sample needs at least one row, got {rows}")
+    return SampleSpec(rows, strategy, confidence, int(section.get('bootstrap', DEFAULT_BOOTSTRAP)),
+                      int(section.get('seed', 0)))
+
+def choose_row_groups(metadata, spec: SampleSpec, rng: np.random.Generator) -> Optional[List[Tuple[int, int]]]:
+    """
+    (row group, rows to take) pairs: evenly spaced row groups from a random offset, so the
+    sample spans the whole file (usually its whole time range), each contributing rows in
+    proportion to its size. None when the file has no more rows than the sample.
+    """
+    sizes = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+    total = sum(sizes)
+    if total <= spec.rows:
+        return None
+    groups = len(sizes)
+    floor = min(MIN_SAMPLED_GROUPS, math.ceil(groups / MAX_SAMPLED_SHARE))
+    picked = min(groups, max(floor, math.ceil(spec.rows * groups / total)))
+    chosen = ((rng.random() + np.arange(picked)) * groups / picked).astype(int)
+    chosen_rows = sum(sizes[g] for g in chosen)
+    return [(int(g), min(sizes[g], math.ceil(spec.rows * sizes[g] / chosen_rows))) for g in chosen]
+
+class Reservoir:
+    """
+    Uniform sample without replacement of at most `size` rows from a stream of batches:
+    every row draws a random key and the `size` smallest keys are kept. Memory is bounded
+    by `size` plus one batch.
+    """
+    def __init__(self, size: int, seed: int = 0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.table: Optional[pa.Table] = None
+        self.keys = np.empty(0)
+        self.seen = 0
+
+    def add(self, batch: pa.RecordBatch):
+        keys = self.rng.random(batch.num_rows)
+        self.seen += batch.num_rows
+        table = pa.Table.from_batches([batch])
+        if len(self.keys) >= self.size:
+            # Full: only rows that beat the current largest kept key can get in
+            admit = np.flatnonzero(keys < self.keys.max())
+            if not len(admit):
+                return
+            table, keys = table.take(admit), keys[admit]
+        if self.table is not None:
+            table, keys = pa.concat_tables([self.table, table]), np.concatenate([self.keys, keys])
+        if len(keys) > self.size:
+            keep = np.sort(np.argpartition(keys, self.size - 1)[:self.size])
+            table, keys = table.take(keep), keys[keep]
+        self.table, self.keys = table, keys
+
+class DriftSample:
+    """
+    How the drift histograms were sampled, and the bootstrap that turns that into a
+    sampling error per column. Row-group samples are resampled by row group (rows within
+    one group are not independent); row samples are resampled by row.
+    """
+    def __init__(self, spec: SampleSpec, strategy: str, total_rows: int, total_groups: int = None, rows: int = 0):
+        self.spec = spec
+        self.strategy = strategy
+        self.total_rows = total_rows
+        self.total_groups = total_groups
+        self.rows = rows
+        self.groups: List[Dict[str, Tuple[np.ndarray, np.ndarray]]] = []
+
+    def add_group(self, rows: int, counts: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        """One sampled row group's (left, equal) histogram counts per column."""
+        self.rows += rows
+        self.groups.append(counts)
+
+    def describe(self) -> dict:
+        out = {"strategy": self.strategy, "rows": self.rows, "of_rows": self.total_rows,
+               "confidence": self.spec.confidence}
+        if self.total_groups is not None:
+            out["row_groups"] = len(self.groups)
+            out["of_row_groups"] = self.total_groups
+        return out
+
+    def errors(self, histograms: Dict[str, ColumnHistogram]) -> Dict[str, Dict[str, float]]:
+        """Half-width of the bootstrap interval at `confidence`, for PSI and KS of every column."""
+        rng = np.random.default_rng(self.spec.seed + 1)
+        out = {}
+        for name, hist in histograms.items():
+            if hist.n == 0:
+                continue
+            left, equal = self._replicates(name, hist, rng)
+            keep = left.sum(axis=1) > 0
+            left, equal = left[keep], equal[keep]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                actual = bucket_counts(left, equal, hist.edge_pos) / left.sum(axis=1, keepdims=True)
+                psi = psi_scores(np.asarray(hist.entry['expected'])[None, :], actual)
+                ks = ks_distance(left, equal, hist.entry['grid_below'], hist.entry['grid_cdf'])
+            out[name] = {"psi": _half_width(psi, self.spec.confidence), "ks": _half_width(ks, self.spec.confidence)}
+        return out
+
+    def _replicates(self, name: str, hist: ColumnHistogram, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        groups = [g[name] for g in self.groups if name in g]
+        if len(groups) >= 2:
+            # Cluster bootstrap: redraw the sampled row groups with replacement
+            weights = rng.multinomial(len(groups), np.full(len(groups), 1 / len(groups)), size=self.spec.bootstrap)
+            return weights @ np.stack([g[0] for g in groups]), weights @ np.stack([g[1] for g in groups])
+        # Row bootstrap: redraw n rows over the grid's cells (strictly between two grid
+        # points, exactly on one, above the last), then rebuild left/equal
+        k = len(hist.equal)
+        cells = np.concatenate([hist.left[:k] - hist.equal, hist.equal, hist.left[k:]])
+        draws = rng.multinomial(hist.n, cells / hist.n, size=self.spec.bootstrap)
+        between, on, above = draws[:, :k], draws[:, k:2 * k], draws[:, 2 * k:]
+        return np.concatenate([between + on, above], axis=1), on
+
+def _half_width(values: np.ndarray, confidence: float) -> Optional[float]:
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return None
+    lo, hi = np.percentile(values, [50 * (1 - confidence), 50 * (1 + confidence)])
+    return round(float(hi - lo) / 2, 4)
@@ -0,0 +1,277 @@
+import math
+import base64
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from typing import Dict, List, Optional
+from drg.validation.base import ValidationResult, CheckAccumulator
+from drg.utils import logger
+
+# Per-run column sketches. Both kinds are deterministic and merge by addition/max, so
+# memory, stream and metadata modes produce identical sketches, and a baseline over
+# the last N runs is a merge of stored sketches rather than a re-read of their files.
+SKETCHES_CHECK = "sketches"
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_HLL_PRECISION = 12
+MAX_BUCKETS = 2048
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch (DDSketch): values land in log-spaced buckets of
+    ratio gamma, so any quantile is returned within `relative_accuracy` of the true value.
+    Counts add exactly under merge, independent of how the data was batched.
+    """
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.pos: Dict[int, int] = {}
+        self.neg: Dict[int, int] = {}
+        self.zero = 0
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, magnitudes: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
+
+    @staticmethod
+    def _add_counts(store: Dict[int, int], keys: np.ndarray):
+        if len(keys):
+            uniq, counts = np.unique(keys, return_counts=True)
+            for k, c in zip(uniq.tolist(), counts.tolist()):
+                store[k] = store.get(k, 0) + c
+
+    def update(self, values):
+        v = np.asarray(values, dtype=np.float64)
+        v = v[np.isfinite(v)]
+        if not len(v):
+            return
+        self._add_counts(self.pos, self._index(v[v > 0]))
+        self._add_counts(self.neg, self._index(-v[v < 0]))
+        self.zero += int(np.count_nonzero(v == 0))
+        self.n += len(v)
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+        self._collapse()
+
+    def _collapse(self):
+        # Bounded size: fold the smallest-magnitude buckets together (only extreme ranges hit this)
+        for store in (self.pos, self.neg):
+            if len(store) > MAX_BUCKETS:
+                keys = sorted(store)
+                cut = keys[len(keys) - MAX_BUCKETS]
+                folded = sum(store.pop(k) for k in keys[:len(keys) - MAX_BUCKETS])
+                store[cut] += folded
+
+    def merge(self, other: "QuantileSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        for mine, theirs in ((self.pos, other.pos), (self.neg, other.neg)):
+            for k, c in theirs.items():
+                mine[k] = mine.get(k, 0) + c
+        self.zero += other.zero
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._collapse()
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def grid(self) -> List[tuple]:
+        """(representative value, count) for every non-empty bucket, ascending."""
+        out = [(-self._value(k), self.neg[k]) for k in sorted(self.neg, reverse=True)]
+        if self.zero:
+            out.append((0.0, self.zero))
+        out += [(self._value(k), self.pos[k]) for k in sorted(self.pos)]
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.n:
+            return None
+        rank = q * (self.n - 1)
+        seen = 0
+        for value, count in self.grid():
+            seen += count
+            if seen > rank:
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {"relative_accuracy": self.relative_accuracy, "n": self.n, "zero": self.zero,
+                "min": self.min if self.n else None, "max": self.max if self.n else None,
+                "pos": [[int(k), int(c)] for k, c in sorted(self.pos.items())],
+                "neg": [[int(k), int(c)] for k, c in sorted(self.neg.items())]}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "QuantileSketch":
+        s = cls(d["relative_accuracy"])
+        s.pos = {k: c for k, c in d["pos"]}
+        s.neg = {k: c for k, c in d["neg"]}
+        s.zero, s.n = d["zero"], d["n"]
+        if s.n:
+            s.min, s.max = d["min"], d["max"]
+        return s
+
+def ks_distance(a: QuantileSketch, b: QuantileSketch) -> float:
+    """Largest CDF gap between two sketches with the same accuracy (at bucket resolution)."""
+    if not a.n or not b.n:
+        return 0.0
+    ga, gb = dict(a.grid()), dict(b.grid())
+    points = sorted(set(ga) | set(gb))
+    ca = np.cumsum([ga.get(p, 0) for p in points]) / a.n
+    cb = np.cumsum([gb.get(p, 0) for p in points]) / b.n
+    return float(np.max(np.abs(ca - cb)))
+
+class DistinctSketch:
+    """HyperLogLog over 64-bit value hashes: 2**precision one-byte registers, merged by max."""
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        values = pd.Series(values).dropna().to_numpy()
+        if not len(values):
+            return
+        h = pd.util.hash_array(values)
+        p = np.uint64(self.precision)
+        idx = (h >> (np.uint64(64) - p)).astype(np.int64)
+        rest = h & np.uint64((1 << (64 - self.precision)) - 1)
+        # rank = leading zeros in the remaining 64-p bits + 1; they fit a float64 exactly
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (64 - self.precision - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: "DistinctSketch"):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        raw = (0.7213 / (1 + 1.079 / m)) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # linear counting for small cardinalities
+        return float(raw)
+
+    def to_bytes(self) -> bytes:
+        return self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, precision: int) -> "DistinctSketch":
+        s = cls(precision)
+        s.registers = np.frombuffer(bytes(data), dtype=np.uint8).copy()
+        return s
+
+def _numeric(values) -> np.ndarray:
+    # float64 throughout, so an int column hashes the same whether or not a batch had nulls
+    return pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy(dtype=np.float64)
+
+def sketch_columns(checks: Dict) -> List[str]:
+    return list(checks.get('baseline', {}).get('columns') or [])
+
+def _serialize(quantiles: QuantileSketch, distinct: DistinctSketch) -> dict:
+    return {"n": quantiles.n, "quantiles": quantiles.to_dict(), "precision": distinct.precision,
+            "registers": base64.b64encode(distinct.to_bytes()).decode()}
+
+def sketches_result(sketches: Dict[str, tuple]) -> ValidationResult:
+    """Carries the run's sketches to commit time, where they go to run_sketches rather than check_results."""
+    return ValidationResult(SKETCHES_CHECK, True, len(sketches), {"columns": {c: _serialize(q, d) for c, (q, d) in sketches.items()}})
+
+def validate_sketches(df: pd.DataFrame, checks: Dict) -> ValidationResult:
+    config = checks.get('baseline', {})
+    sketches = {}
+    for column in sketch_columns(checks):
+        if column in df.columns:
+            q = QuantileSketch(config.get('relative_accuracy', DEFAULT_RELATIVE_ACCURACY))
+            d = DistinctSketch(config.get('hll_precision', DEFAULT_HLL_PRECISION))
+            values = _numeric(df[column])
+            q.update(values)
+            d.update(values)
+            sketches[column] = (q, d)
+    return sketches_result(sketches)
+
+class SketchAccumulator(CheckAccumulator):
+    name = SKETCHES_CHECK
+
+    def __init__(self, checks: Dict):
+        config = checks.get('baseline', {})
+        self.accuracy = config.get('relative_accuracy', DEFAULT_RELATIVE_ACCURACY)
+        self.precision = config.get('hll_precision', DEFAULT_HLL_PRECISION)
+        self.wanted = sketch_columns(checks)
+        self.columns = ()
+        self.sketches: Dict[str, tuple] = {}
+
+    def start(self, schema: pa.Schema):
+        self.columns = tuple(c for c in self.wanted if c in schema.names)
+        self.sketches = {c: (QuantileSketch(self.accuracy), DistinctSketch(self.precision)) for c in self.columns}
+
+    def update(self, batch: pa.RecordBatch):
+        for column, (q, d) in self.sketches.items():
+            values = _numeric(batch.column(column).to_pandas())
+            q.update(values)
+            d.update(values)
+
+    def result(self) -> ValidationResult:
+        return sketches_result(self.sketches)
+
+def load_sketch(entry: dict) -> tuple:
+    """(QuantileSketch, DistinctSketch) from a serialized column entry or a run_sketches row."""
+    quantiles = entry["quantiles"]
+    registers = entry["registers"]
+    if isinstance(registers, str):
+        registers = base64.b64decode(registers)
+    return QuantileSketch.from_dict(quantiles), DistinctSketch.from_bytes(registers, entry["precision"])
+
+def _params(entry: dict) -> tuple:
+    # What two sketches must share to merge
+    return entry["quantiles"]["relative_accuracy"], entry["precision"]
+
+def baseline_result(current: Dict[str, dict], history: List[dict], checks: Dict) -> ValidationResult:
+    """
+    Drift of this run against a rolling baseline: the merged sketches of the last N passed
+    runs (rows of run_sketches). Gates each column on KS distance; reports medians and
+    distinct counts. Runs sketched with a different relative_accuracy or hll_precision
+    (the contract changed since) can't be merged and are left out of the baseline.
+    Passes (skipped) until `min_runs` compatible runs are available.
+    """
+    config = checks.get('baseline', {})
+    limit = config.get('ks', 0.2)
+    compatible = [row for row in history
+                  if row["column_name"] in current and _params(row) == _params(current[row["column_name"]])]
+    runs = len({row["run_id"] for row in compatible})
+    dropped = len({row["run_id"] for row in history}) - runs
+    if dropped:
+        logger.info(f"Baseline: leaving out {dropped} runs sketched with different parameters")
+    history = compatible
+    if runs < config.get('min_runs', 3):
+        return ValidationResult("baseline_drift", True, 0.0, {"skip": f"{runs} baseline runs", "runs": runs})
+
+    merged: Dict[str, tuple] = {}
+    for row in history:
+        q, d = load_sketch(row)
+        if row["column_name"] in merged:
+            merged[row["column_name"]][0].merge(q)
+            merged[row["column_name"]][1].merge(d)
+        else:
+            merged[row["column_name"]] = (q, d)
+
+    passed = True
+    columns = {}
+    worst = 0.0
+    for column, entry in current.items():
+        if column not in merged:
+            continue
+        q, d = load_sketch(entry)
+        bq, bd = merged[column]
+        ks = ks_distance(q, bq)
+        ok = ks <= limit
+        passed = passed and ok
+        worst = max(worst, ks)
+        columns[column] = {"ks": round(ks, 4), "passed": ok, "p50": q.quantile(0.5), "baseline_p50": bq.quantile(0.5),
+                           "p95": q.quantile(0.95), "baseline_p95": bq.quantile(0.95),
+                           "distinct": round(d.estimate()), "baseline_distinct": round(bd.estimate())}
+    return ValidationResult("baseline_drift", passed, round(worst, 4), {"threshold": limit, "runs": runs, "columns": columns})
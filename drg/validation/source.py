@@ -0,0 +1,150 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from drg.contracts.compiler import ContractLike, plan_for
+from drg.contracts.loader import SourceSpec
+from drg.validation.base import ValidationResult
+from drg.validation.core import run_validations
+from drg.validation.memory import load_columns, fits_budget, reset_peak_rss
+from drg.validation.runner import MODES, report_peak_rss
+from drg.validation.streaming import build_accumulators, fold_batches, DEFAULT_BATCH_SIZE
+from drg.validation.uniqueness import hash_ids
+from drg.utils import logger
+from drg import metrics
+
+# Directory datasets (contract `source`): one run validates every file a time window
+# touches, as a single pyarrow.dataset scan with partition pruning and filter pushdown.
+
+@dataclass(frozen=True)
+class SourceScan:
+    """What one run read: the files left after partition pruning and its event-time window."""
+    root: str
+    files: Tuple[str, ...]
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+def _partitioning(spec: SourceSpec):
+    if spec.partitioning == "hive" and spec.partition_column:
+        # Typed explicitly: inference would turn an all-digit key (e.g. 20261017) into an int
+        return ds.partitioning(pa.schema([(spec.partition_column, pa.string())]), flavor="hive")
+    return spec.partitioning
+
+def open_source(spec: SourceSpec, files: Tuple[str, ...] = None, root: str = None) -> ds.Dataset:
+    """The whole directory, or just `files` (partition keys still parsed relative to root)."""
+    if files is None:
+        return ds.dataset(spec.path, format="parquet", partitioning=_partitioning(spec))
+    return ds.dataset(list(files), format="parquet", partitioning=_partitioning(spec),
+                      partition_base_dir=root or spec.path)
+
+def partition_filter(spec: SourceSpec, start: Optional[datetime], end: Optional[datetime]) -> Optional[ds.Expression]:
+    """Bounds on the partition key; prunes whole directories before any file is opened."""
+    if not spec.partition_column or start is None:
+        return None
+    key = ds.field(spec.partition_column)
+    expr = key >= start.strftime(spec.partition_format)
+    if end is not None:
+        expr = expr & (key <= end.strftime(spec.partition_format))
+    return expr
+
+def row_filter(spec: SourceSpec, schema: pa.Schema, start: Optional[datetime], end: Optional[datetime]) -> Optional[ds.Expression]:
+    """
+    Contract filters plus the event-time window, pushed into the scan: row groups whose
+    statistics fall outside it are skipped, and the checks only ever see matching rows.
+    """
+    exprs = [partition_filter(spec, start, end)]
+    if spec.filters:
+        exprs.append(pq.filters_to_expression([tuple(f) for f in spec.filters]))
+    if start is not None and spec.timestamp_column in schema.names:
+        field_type = schema.field(spec.timestamp_column).type
+        if pa.types.is_timestamp(field_type) and field_type.tz is None:
+            ts = ds.field(spec.timestamp_column)
+            exprs.append(ts >= pa.scalar(start, field_type))
+            if end is not None:
+                exprs.append(ts <= pa.scalar(end, field_type))
+        else:
+            logger.warning(f"{spec.timestamp_column} is {field_type}, not a naive timestamp; window not applied to rows")
+    exprs = [e for e in exprs if e is not None]
+    if not exprs:
+        return None
+    expr = exprs[0]
+    for e in exprs[1:]:
+        expr = expr & e
+    return expr
+
+def resolve_source(spec: SourceSpec, now: datetime = None) -> SourceScan:
+    """Lists the dataset once and keeps the files whose partition can overlap the window."""
+    start = end = None
+    if spec.window_hours is not None:
+        end = now or datetime.now()
+        start = end - timedelta(hours=spec.window_hours)
+    dataset = open_source(spec)
+    files = tuple(sorted(f.path for f in dataset.get_fragments(filter=partition_filter(spec, start, end))))
+    logger.info(f"Source {spec.path}: {len(files)}/{len(dataset.files)} files after partition pruning")
+    return SourceScan(spec.path, files, start, end)
+
+def validate_source(scan: SourceScan, contract: ContractLike, mode: str = "memory",
+                    batch_size: int = DEFAULT_BATCH_SIZE) -> List[ValidationResult]:
+    """
+    validate_file for a SourceScan. 'memory' materializes the filtered window as a frame and
+    'arrow' as a pyarrow.Table (both fall back to 'stream' over the memory budget); 'stream'
+    and 'metadata' fold filtered record batches (footer statistics describe whole files, not
+    the window, so metadata mode has nothing to answer from them). Never cached: the
+    window moves with the clock. Logs the run's peak RSS.
+    """
+    plan = plan_for(contract)
+    reset_peak_rss()
+    with metrics.stage("validate"):
+        results = _validate(scan, plan, mode, batch_size)
+    metrics.record_results(results)
+    report_peak_rss(mode)
+    return results
+
+def _validate(scan: SourceScan, plan, mode: str, batch_size: int) -> List[ValidationResult]:
+    spec = plan.contract.source
+    dataset = open_source(spec, scan.files, scan.root)
+    expr = row_filter(spec, dataset.schema, scan.start, scan.end)
+    if mode not in MODES:
+        raise ValueError(f"Unknown validation mode: {mode}")
+    if mode in ("memory", "arrow"):
+        # Footers cover whole files, so this overstates a window that cuts through them
+        columns = load_columns(plan, dataset.schema)
+        footers = [f.metadata for f in dataset.get_fragments()]
+        if not fits_budget(footers, dataset.schema, columns, mode):
+            logger.warning(f"{len(scan.files)} files under {scan.root} would exceed the memory budget "
+                           f"in {mode} mode; streaming them instead")
+            mode = "stream"
+    if mode == "memory":
+        with metrics.stage("read"):
+            table = dataset.to_table(columns=columns, filter=expr)
+        metrics.record_scan("memory", table.num_rows, _scan_bytes(dataset, columns) if metrics.enabled() else 0)
+        return run_validations(table.to_pandas(), plan)
+
+    accumulators = build_accumulators(plan)
+    needed = []
+    for acc in accumulators:
+        acc.start(dataset.schema)
+        needed += [c for c in acc.columns if c in dataset.schema.names and c not in needed]
+    if mode == "arrow":
+        with metrics.stage("read"):
+            table = dataset.to_table(columns=needed, filter=expr)
+        batches = table.to_batches(max_chunksize=batch_size)
+    else:
+        batches = dataset.to_batches(columns=needed, filter=expr, batch_size=batch_size)
+    rows = fold_batches(batches, accumulators)
+    metrics.record_scan(mode, rows, _scan_bytes(dataset, needed) if metrics.enabled() else 0)
+    return [r for acc in accumulators for r in acc.results()]
+
+def _scan_bytes(dataset: ds.Dataset, columns=None) -> int:
+    return sum(metrics.parquet_bytes(f.metadata, columns) for f in dataset.get_fragments())
+
+def scan_id_hashes(scan: SourceScan, spec: SourceSpec, column: str) -> Optional[np.ndarray]:
+    """read_id_hashes for a SourceScan: hashes of the window's IDs (None if the column is absent)."""
+    dataset = open_source(spec, scan.files, scan.root)
+    if column not in dataset.schema.names:
+        return None
+    table = dataset.to_table(columns=[column], filter=row_filter(spec, dataset.schema, scan.start, scan.end))
+    return hash_ids(table.column(0).to_pandas())
@@ -0,0 +1,301 @@
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import List, Dict, Tuple
+from drg.contracts.loader import Contract, SchemaField
+from drg.contracts.compiler import ContractLike, plan_for
+from drg.validation.base import ValidationResult, CheckAccumulator
+from drg.validation.columns import ColumnCheckAccumulator
+from drg.validation.uniqueness import UniquenessAccumulator
+from drg.validation.sketches import SketchAccumulator
+from drg.validation.core import (
+    schema_result, volume_result, freshness_result, drift_histograms, drift_result
+)
+from drg.validation.drift import resolve_drift_columns
+from drg.validation.sampling import DriftSample, Reservoir, choose_row_groups, sample_spec
+from drg.validation.reference import load_reference_profile, ReferenceColumnMissing, DEFAULT_BUCKETS
+from drg.utils import logger
+from drg import metrics, trace
+
+DEFAULT_BATCH_SIZE = 65536
+
+class SchemaAccumulator(CheckAccumulator):
+    name = "schema_presence"
+
+    def __init__(self, schema: List[SchemaField]):
+        self.schema = schema
+        self.names = []
+
+    def start(self, schema: pa.Schema):
+        # Presence only depends on the file schema, not on the rows
+        self.names = schema.names
+
+    def from_footer(self, footer) -> bool:
+        return True
+
+    def result(self) -> ValidationResult:
+        return schema_result(self.names, self.schema)
+
+class VolumeAccumulator(CheckAccumulator):
+    name = "volume"
+
+    def __init__(self, checks: Dict):
+        self.checks = checks
+        self.count = 0
+
+    def update(self, batch: pa.RecordBatch):
+        self.count += batch.num_rows
+
+    def from_footer(self, footer) -> bool:
+        self.count = footer.num_rows
+        return True
+
+    def result(self) -> ValidationResult:
+        return volume_result(self.count, self.checks)
+
+class FreshnessAccumulator(CheckAccumulator):
+    name = "freshness"
+    columns = ('pickup_datetime',)
+
+    def __init__(self, checks: Dict):
+        self.checks = checks
+        self.present = False
+        self.footer_usable = False
+        self.latest_ts = pd.NaT
+
+    def start(self, schema: pa.Schema):
+        self.present = 'pickup_datetime' in schema.names
+        self.footer_usable = False
+        if self.present:
+            # Naive timestamps only; anything else goes through pd.to_datetime like the in-memory path
+            field_type = schema.field('pickup_datetime').type
+            self.footer_usable = pa.types.is_timestamp(field_type) and field_type.tz is None
+
+    def from_footer(self, footer) -> bool:
+        if not self.present:
+            return True
+        if not self.footer_usable:
+            return False
+        stats = footer.column('pickup_datetime')
+        if stats is None:
+            return False
+        self.latest_ts = pd.Timestamp(stats.max) if stats.max is not None else pd.NaT
+        return True
+
+    def update(self, batch: pa.RecordBatch):
+        if not self.present:
+            return
+        batch_max = pd.to_datetime(batch.column('pickup_datetime').to_pandas()).max()
+        if pd.isna(self.latest_ts) or (not pd.isna(batch_max) and batch_max > self.latest_ts):
+            self.latest_ts = batch_max
+
+    def result(self) -> ValidationResult:
+        if not self.present:
+            return ValidationResult("freshness", False, "N/A", {"error": "pickup_datetime missing"})
+        return freshness_result(self.latest_ts, self.checks)
+
+class DistributionAccumulator(CheckAccumulator):
+    """Histograms each batch on the reference grid of every scored column; counts merge exactly."""
+
+    name = "distribution"
+
+    def __init__(self, checks: Dict, schema: List[SchemaField] = None, drift=None):
+        config = checks.get('distribution', {})
+        self.method = config.get('method')
+        self.threshold = config.get('threshold', 0.2)
+        self.ref_path = config.get('reference_path')
+        self.buckets = config.get('buckets', DEFAULT_BUCKETS)
+        if drift is not None:
+            self.column, self.limits, self.scored = drift.primary, drift.limits, list(drift.scored)
+            self.sampling = drift.sample
+        else:
+            self.column, self.limits, self.scored = resolve_drift_columns(config, schema or [])
+            self.sampling = sample_spec(config)
+        self.columns = ()
+        self.skip = True
+        self.error = None
+        self.histograms = {}
+        self.reservoir = None  # sampling from batches
+        self.sample = None     # DriftSample, once the histograms saw a sample
+
+    def start(self, schema: pa.Schema):
+        if self.method != 'psi' or not self.ref_path or self.column not in schema.names:
+            return
+        self.skip = False
+        try:
+            profile = load_reference_profile(self.ref_path, self.scored, self.buckets)
+            self.histograms = drift_histograms(profile, self.limits, self.scored, schema.names)
+            self.columns = tuple(self.histograms)
+            if self.sampling is not None:
+                self.reservoir = Reservoir(self.sampling.rows, self.sampling.seed)
+        except ReferenceColumnMissing:
+            self.error = "col missing in ref"
+        except Exception as e:
+            self.error = str(e)
+
+    def from_file(self, pf: pq.ParquetFile) -> bool:
+        """
+        Row-group sampling: histograms a sample drawn from evenly spaced row groups, reading
+        only those. False (scan as usual) when not configured or the file fits the sample.
+        """
+        if self.skip or self.error or self.sampling is None or self.sampling.strategy != "row_groups":
+            return False
+        rng = np.random.default_rng(self.sampling.seed)
+        chosen = choose_row_groups(pf.metadata, self.sampling, rng)
+        if chosen is None:
+            return False
+        self.reservoir = None
+        self.sample = DriftSample(self.sampling, "row_groups", pf.metadata.num_rows, pf.metadata.num_row_groups)
+        for group, take in chosen:
+            table = pf.read_row_group(group, columns=list(self.histograms))
+            if take < table.num_rows:
+                table = table.take(np.sort(rng.choice(table.num_rows, take, replace=False)))
+            before = {name: (h.left.copy(), h.equal.copy()) for name, h in self.histograms.items()}
+            self._fold(table)
+            if self.error:
+                break
+            self.sample.add_group(table.num_rows, {name: (h.left - before[name][0], h.equal - before[name][1])
+                                                   for name, h in self.histograms.items()})
+        return True
+
+    def update(self, batch: pa.RecordBatch):
+        if self.skip or self.error:
+            return
+        if self.reservoir is not None:
+            self.reservoir.add(batch.select(list(self.histograms)))
+            return
+        self._fold(batch)
+
+    def _fold(self, batch):
+        for name, hist in list(self.histograms.items()):
+            try:
+                hist.update(batch.column(name).to_pandas().dropna().values)
+            except (TypeError, ValueError) as e:
+                if name in self.limits:
+                    self.error = str(e)
+                    return
+                del self.histograms[name]
+
+    def result(self) -> ValidationResult:
+        if self.reservoir is not None and not self.error:
+            if self.reservoir.table is not None:
+                self._fold(self.reservoir.table)
+            if self.reservoir.seen > self.sampling.rows:
+                self.sample = DriftSample(self.sampling, "reservoir", self.reservoir.seen, rows=self.sampling.rows)
+            self.reservoir = None
+        if self.skip:
+            return ValidationResult("distribution", True, 0.0, {"skip": "invalid config or col missing"})
+        if self.error == "col missing in ref":
+            return ValidationResult("distribution", False, -1, {"error": self.error})
+        if self.error:
+            logger.error(f"Distribution check failed: {self.error}")
+            return ValidationResult("distribution", False, -1, {"error": self.error})
+
+        return drift_result(self.histograms, self.limits, self.column, self.threshold, self.sample)
+
+def build_accumulators(contract: ContractLike) -> List[CheckAccumulator]:
+    """Accumulators for a Contract or compiled ValidationPlan, in run_validations order."""
+    plan = plan_for(contract)
+    schema, checks = plan.contract.schema, plan.checks_config
+    accumulators = [
+        SchemaAccumulator(schema),
+        ColumnCheckAccumulator(schema, checks, rules=plan.column_rules),
+        VolumeAccumulator(checks),
+        FreshnessAccumulator(checks),
+    ]
+    if plan.check('uniqueness') is not None:
+        accumulators.append(UniquenessAccumulator(checks))
+    if plan.drift is not None:
+        accumulators.append(DistributionAccumulator(checks, schema, drift=plan.drift))
+    if plan.check('sketches') is not None:
+        accumulators.append(SketchAccumulator(checks))
+    return accumulators
+
+def _resolve_from_file(pf: pq.ParquetFile, accumulators: List[CheckAccumulator]) -> List[CheckAccumulator]:
+    """Starts every accumulator and returns those that still need the full scan."""
+    scanned = []
+    for acc in accumulators:
+        acc.start(pf.schema_arrow)
+        with trace.span(acc.name, "check"):
+            resolved = acc.from_file(pf)
+        if not resolved:
+            scanned.append(acc)
+    return scanned
+
+def run_validations_streaming(path: str, contract: ContractLike, batch_size: int = DEFAULT_BATCH_SIZE) -> List[ValidationResult]:
+    """
+    Validates a Parquet file one record batch at a time.
+    Only the columns the checks need are decoded, so peak memory is bounded by batch_size.
+    """
+    pf = pq.ParquetFile(path)
+    schema = pf.schema_arrow
+    accumulators = build_accumulators(contract)
+    scanned = _resolve_from_file(pf, accumulators)
+
+    needed = []
+    for acc in scanned:
+        for col in acc.columns:
+            if col in schema.names and col not in needed:
+                needed.append(col)
+
+    rows = fold_batches(pf.iter_batches(batch_size=batch_size, columns=needed), scanned)
+    metrics.record_scan("stream", rows, metrics.parquet_bytes(pf.metadata, needed) if metrics.enabled() else 0)
+
+    return [r for acc in accumulators for r in acc.results()]
+
+def run_validations_arrow(path: str, contract: ContractLike, batch_size: int = DEFAULT_BATCH_SIZE) -> List[ValidationResult]:
+    """
+    Reads the needed columns into one pyarrow.Table (memory-mapped, no pandas copy) and
+    folds zero-copy slices of it through the accumulators, so IDs stay Arrow strings
+    instead of one Python object per row.
+    """
+    pf = pq.ParquetFile(path, memory_map=True)
+    schema = pf.schema_arrow
+    accumulators = build_accumulators(contract)
+    scanned = _resolve_from_file(pf, accumulators)
+    columns = [c for c in schema.names if any(c in acc.columns for acc in scanned)]
+
+    with metrics.stage("read"):
+        table = pf.read(columns=columns)
+    rows = fold_batches(table.to_batches(max_chunksize=batch_size), scanned)
+    metrics.record_scan("arrow", rows, metrics.parquet_bytes(pf.metadata, columns) if metrics.enabled() else 0)
+
+    return [r for acc in accumulators for r in acc.results()]
+
+def fold_batches(batches, accumulators: List[CheckAccumulator]) -> int:
+    """
+    Feeds every batch to every accumulator and returns the rows read. Per-check time goes
+    to drg.metrics; under tracing each batch read and each accumulator update is a span.
+    """
+    rows = 0
+    tracing = trace.enabled()
+    if not metrics.enabled() and not tracing:
+        for batch in batches:
+            rows += batch.num_rows
+            for acc in accumulators:
+                acc.update(batch)
+        return rows
+
+    spent = [0.0] * len(accumulators)
+    batches = iter(batches)
+    while True:
+        t0 = time.perf_counter()
+        batch = next(batches, None)
+        if batch is None:
+            break
+        if tracing:
+            trace.complete("read batch", "read", t0, time.perf_counter() - t0, {"rows": batch.num_rows})
+        rows += batch.num_rows
+        for i, acc in enumerate(accumulators):
+            t0 = time.perf_counter()
+            acc.update(batch)
+            seconds = time.perf_counter() - t0
+            spent[i] += seconds
+            if tracing:
+                trace.complete(acc.name, "check", t0, seconds)
+    if metrics.enabled():
+        for acc, seconds in zip(accumulators, spent):
+            metrics.observe_check(acc.name, seconds)
+    return rows
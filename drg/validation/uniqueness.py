@@ -0,0 +1,322 @@
+import os
+import json
+import math
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
+from drg.validation.base import ValidationResult, CheckAccumulator
+from drg.utils import logger
+
+ID_FILTER_DIR = os.environ.get("DRG_ID_FILTER_DIR", "data/cache/ids")
+FILTER_VERSION = 3
+HEADER_BYTES = 512  # fixed width, so a save rewrites the header in place
+PROBE_CHUNK = 1 << 18  # hashes per probe block; bounds the (n, k) position matrix
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def hash_ids(values) -> np.ndarray:
+    """Vectorized 64-bit hashes of the non-null IDs (pandas' SipHash over the whole array)."""
+    return pd.util.hash_array(pd.Series(values).dropna().to_numpy())
+
+def duplicate_count(hashes: np.ndarray) -> int:
+    """Rows whose ID already appeared earlier in the same data (64-bit collisions are negligible)."""
+    if len(hashes) < 2:
+        return 0
+    ordered = np.sort(hashes)
+    return int(np.count_nonzero(ordered[1:] == ordered[:-1]))
+
+def uniqueness_result(duplicates: Optional[int], checks: Dict, hashes: Optional[np.ndarray] = None) -> ValidationResult:
+    """
+    `hashes` rides along as `id_hashes` (not cached, not reported) so the commit-time
+    history check reuses them instead of reading the ID column again.
+    """
+    column = checks.get('uniqueness', {}).get('column', 'ride_id')
+    if duplicates is None:
+        result = ValidationResult("uniqueness", False, "N/A", {"error": f"{column} missing"})
+    else:
+        result = ValidationResult("uniqueness", duplicates == 0, duplicates, {"column": column})
+    result.id_hashes = hashes
+    return result
+
+def validate_uniqueness(df: pd.DataFrame, checks: Dict) -> ValidationResult:
+    column = checks.get('uniqueness', {}).get('column', 'ride_id')
+    if column not in df.columns:
+        return uniqueness_result(None, checks)
+    hashes = hash_ids(df[column])
+    return uniqueness_result(duplicate_count(hashes), checks, hashes)
+
+class UniquenessAccumulator(CheckAccumulator):
+    """Keeps 8 bytes per row (the hash) rather than the IDs; duplicates are found by one sort."""
+
+    name = "uniqueness"
+
+    def __init__(self, checks: Dict):
+        self.checks = checks
+        self.column = checks.get('uniqueness', {}).get('column', 'ride_id')
+        self.columns = (self.column,)
+        self.present = False
+        self.hashes: List[np.ndarray] = []
+
+    def start(self, schema: pa.Schema):
+        self.present = self.column in schema.names
+        self.hashes = []
+
+    def update(self, batch: pa.RecordBatch):
+        if self.present:
+            self.hashes.append(hash_ids(batch.column(self.column).to_pandas()))
+
+    def result(self) -> ValidationResult:
+        if not self.present:
+            return uniqueness_result(None, self.checks)
+        hashes = np.concatenate(self.hashes) if self.hashes else np.empty(0, dtype=np.uint64)
+        return uniqueness_result(duplicate_count(hashes), self.checks, hashes)
+
+class IdFilter:
+    """
+    Bloom filter over the ID hashes of every passed run, sized from the contract's
+    capacity and false-positive rate. Persisted as a fixed-width JSON header followed by
+    the packed bit array, plus an append-only `<path>.runs` index (one run ID per line, the
+    header records how much of it is valid) so re-validating an indexed run doesn't match
+    it against itself. save() writes back only the bytes this instance's runs touched,
+    ORed into the file, so it merges with whatever other processes saved meanwhile.
+    """
+    def __init__(self, path: str, capacity: int, fp_rate: float):
+        self.path = path
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+        self.runs: Set[str] = set()
+        self.dirty = False
+        self._set_bits: Optional[int] = 0  # popcount of bits, kept current by add(); None = recount
+        self._unsaved: Dict[str, int] = {}  # run -> IDs, added since the last save
+        self._touched: List[np.ndarray] = []  # byte offsets those runs set bits in
+        self._runs_bytes = 0                # how much of the runs index this instance has read
+        self._generation = None             # the file's save counter when last read or written here
+
+    @property
+    def runs_path(self) -> str:
+        return f"{self.path}.runs"
+
+    @classmethod
+    def open(cls, path: str, capacity: int, fp_rate: float) -> "IdFilter":
+        f = cls(path, capacity, fp_rate)
+        try:
+            header, bits = f._read()
+        except FileNotFoundError:
+            return f
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable ID filter {path}: {e}")
+            return f
+        if (header["capacity"], header["fp_rate"]) != (capacity, fp_rate):
+            logger.warning(f"ID filter {path} was sized for capacity={header['capacity']}, fp_rate={header['fp_rate']}; "
+                           f"keeping it (delete the file to resize)")
+        f.capacity, f.fp_rate = header["capacity"], header["fp_rate"]
+        f.num_bits, f.num_hashes = header["num_bits"], header["num_hashes"]
+        f.count, f.bits, f._generation = header["count"], bits, header.get("generation")
+        f.runs.update(f._read_runs(header))
+        f._set_bits = None
+        return f
+
+    def _read_header(self, fh) -> dict:
+        header = json.loads(fh.readline())
+        if header.get("version") not in (1, 2, FILTER_VERSION):
+            raise ValueError("filter version changed")
+        return header
+
+    def _read(self):
+        """(header, bits) of the file on disk. Version 1 kept the run IDs in the header."""
+        with open(self.path, "rb") as fh:
+            header = self._read_header(fh)
+            bits = np.fromfile(fh, dtype=np.uint8)
+        return header, bits
+
+    def _read_runs(self, header: dict) -> List[str]:
+        """Run IDs indexed on disk that this instance hasn't read yet."""
+        if header["version"] == 1:
+            # Re-written as an index by the next save
+            self._unsaved.update({r: 0 for r in header["runs"] if r not in self.runs})
+            self.dirty = self.dirty or bool(header["runs"])
+            return header["runs"]
+        end = header["runs_bytes"]
+        start = self._runs_bytes if self._runs_bytes <= end else 0  # file recreated: read it all
+        self._runs_bytes = end
+        if end == start:
+            return []
+        with open(self.runs_path, "rb") as fh:
+            fh.seek(start)
+            return fh.read(end - start).decode().split()
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        # Double hashing (Kirsch-Mitzenmacher): k probes from the two 32-bit halves
+        h = hashes.astype(np.uint64)
+        lo = h & np.uint64(0xFFFFFFFF)
+        hi = (h >> np.uint64(32)) | np.uint64(1)
+        i = np.arange(self.num_hashes, dtype=np.uint64)
+        return (lo[:, None] + i[None, :] * hi[:, None]) % np.uint64(self.num_bits)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Per hash: True if possibly seen before, False if definitely new."""
+        out = np.zeros(len(hashes), dtype=bool)
+        for start in range(0, len(hashes), PROBE_CHUNK):
+            pos = self._positions(hashes[start:start + PROBE_CHUNK])
+            hit = (self.bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1
+            out[start:start + PROBE_CHUNK] = hit.all(axis=1)
+        return out
+
+    def add(self, hashes: np.ndarray, run_id: str):
+        if run_id in self.runs:
+            return
+        for start in range(0, len(hashes), PROBE_CHUNK):
+            pos = np.unique(self._positions(hashes[start:start + PROBE_CHUNK]).ravel())
+            byte = pos >> np.uint64(3)
+            mask = np.left_shift(1, (pos & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+            starts = np.flatnonzero(np.r_[True, byte[1:] != byte[:-1]])
+            touched = byte[starts]
+            before = self.bits[touched]
+            after = before | np.bitwise_or.reduceat(mask, starts)
+            self.bits[touched] = after
+            self._touched.append(touched)
+            if self._set_bits is not None:
+                self._set_bits += int(_POPCOUNT[after].sum(dtype=np.int64) - _POPCOUNT[before].sum(dtype=np.int64))
+        self.count += len(hashes)
+        self.runs.add(run_id)
+        self._unsaved[run_id] = len(hashes)
+        self.dirty = True
+        if self.count > self.capacity:
+            logger.warning(f"ID filter {self.path} holds {self.count} IDs, over its capacity of {self.capacity}; "
+                           f"false-positive rate is now ~{self.estimated_fp_rate():.2g}")
+
+    def estimated_fp_rate(self) -> float:
+        """Current false-positive probability from the fill ratio: (set bits / m) ** k."""
+        if self._set_bits is None:
+            # Counted once per load, then updated by add(): a long-lived filter isn't rescanned per run
+            self._set_bits = int(_POPCOUNT[self.bits].sum(dtype=np.int64))
+        fill = self._set_bits / self.num_bits
+        return float(fill ** self.num_hashes)
+
+    def _merge_saved(self) -> Optional[dict]:
+        """
+        Catches up with what other processes saved since this instance last read or wrote
+        the file. Returns its header if the file can be updated in place, else None.
+        """
+        try:
+            with open(self.path, "rb") as fh:
+                header = self._read_header(fh)
+        except FileNotFoundError:
+            return None
+        if (header["num_bits"], header["num_hashes"]) != (self.num_bits, self.num_hashes):
+            logger.warning(f"ID filter {self.path} was recreated with another size; replacing it")
+            return None
+        if header.get("generation") != self._generation:
+            _, bits = self._read()
+            np.bitwise_or(self.bits, bits, out=self.bits)
+            self._set_bits = None
+            others = self._read_runs(header)
+            for run_id in others:
+                self._unsaved.pop(run_id, None)  # indexed by another process as well: count it once
+            self.runs.update(others)
+        self.count = header["count"] + sum(self._unsaved.values())
+        return header if header["version"] == FILTER_VERSION else None
+
+    def _header(self, runs_bytes: int, generation: int) -> bytes:
+        header = {"version": FILTER_VERSION, "capacity": self.capacity, "fp_rate": self.fp_rate,
+                  "num_bits": self.num_bits, "num_hashes": self.num_hashes, "count": self.count,
+                  "runs": len(self.runs), "runs_bytes": runs_bytes, "generation": generation}
+        return json.dumps(header).encode().ljust(HEADER_BYTES - 1) + b"\n"
+
+    def save(self):
+        """
+        Under an exclusive lock on `<path>.lock`, so concurrent processes (several `drg
+        validate`s, or one next to `drg serve`) never drop each other's IDs. Only the bytes
+        this instance's runs touched are written (ORed into the file), then the index and
+        header; a whole new file only when there is none yet of this version and size.
+        """
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with _locked(f"{self.path}.lock"):
+                on_disk = self._merge_saved()
+                if on_disk is not None:
+                    # Bits before the header: a crash in between leaves extra bits, never missing ones
+                    touched = np.unique(np.concatenate(self._touched)) if self._touched else np.empty(0, dtype=np.uint64)
+                    disk = np.memmap(self.path, dtype=np.uint8, mode="r+", offset=HEADER_BYTES, shape=self.bits.shape)
+                    disk[touched] |= self.bits[touched]
+                    disk.flush()
+                    del disk
+                # Lines past the header's runs_bytes (a crash before the header) are ignored and cut here
+                with open(self.runs_path, "ab") as fh:
+                    fh.truncate(self._runs_bytes)
+                    fh.write("".join(f"{r}\n" for r in self._unsaved).encode())
+                    runs_bytes = fh.tell()
+                generation = (on_disk or {}).get("generation", 0) + 1
+                if on_disk is not None:
+                    with open(self.path, "r+b") as fh:
+                        fh.write(self._header(runs_bytes, generation))
+                else:
+                    tmp = f"{self.path}.{os.getpid()}.tmp"
+                    with open(tmp, "wb") as fh:
+                        fh.write(self._header(runs_bytes, generation))
+                        self.bits.tofile(fh)
+                    os.replace(tmp, self.path)
+            self._generation = generation
+            self._runs_bytes = runs_bytes
+            self._unsaved.clear()
+            self._touched = []
+            self.dirty = False
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not save ID filter: {e}")
+
+@contextmanager
+def _locked(path: str):
+    """Exclusive advisory lock on `path` (POSIX); elsewhere, no cross-process locking."""
+    with open(path, "a") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        yield
+
+def open_id_filter(plan, root: str = None) -> Optional[IdFilter]:
+    """The cross-run filter for a plan's uniqueness check (None if the contract has none)."""
+    spec = plan.check('uniqueness')
+    if spec is None:
+        return None
+    t = spec.thresholds
+    path = os.path.join(root or ID_FILTER_DIR, f"{plan.contract.dataset_id}.{t['column']}.bloom")
+    return IdFilter.open(path, int(t['capacity']), float(t['false_positive_rate']))
+
+def read_id_hashes(path: str, column: str) -> Optional[np.ndarray]:
+    """Hashes of one file's IDs, reading only that column (None if the column is absent)."""
+    pf = pq.ParquetFile(path)
+    if column not in pf.schema_arrow.names:
+        return None
+    return hash_ids(pf.read(columns=[column]).column(0).to_pandas())
+
+def history_result(hashes: Optional[np.ndarray], run_id: str, id_filter: IdFilter, checks: Dict) -> ValidationResult:
+    """
+    IDs that already appeared in an earlier passed run. A Bloom filter reports some new IDs
+    as seen, so the check fails only when hits exceed what the current false-positive
+    rate explains (expected + 3 sigma) plus the contract's max_duplicates.
+    """
+    config = checks.get('uniqueness', {})
+    column = config.get('column', 'ride_id')
+    if run_id in id_filter.runs:
+        return ValidationResult("uniqueness_history", True, 0, {"column": column, "skip": "run already indexed"})
+    if hashes is None:
+        return ValidationResult("uniqueness_history", False, "N/A", {"error": f"{column} missing"})
+
+    hits = int(id_filter.contains(hashes).sum())
+    fp_rate = id_filter.estimated_fp_rate()
+    expected = len(hashes) * fp_rate
+    allowed = expected + 3 * math.sqrt(expected) + config.get('max_duplicates', 0)
+    return ValidationResult("uniqueness_history", hits <= allowed, hits,
+                            {"column": column, "allowed": round(allowed, 2), "fp_rate": round(fp_rate, 8),
+                             "indexed_ids": id_filter.count, "indexed_runs": len(id_filter.runs)})
@@ -0,0 +1,18 @@
+-- Per-run column sketches for rolling-baseline drift.
+-- Files in this directory run in name order on first start (docker-entrypoint-initdb.d);
+-- the v### prefix sorts after init.sql. Apply to an existing database with `make migrate`.
+
+CREATE TABLE IF NOT EXISTS run_sketches (
+    run_id UUID NOT NULL REFERENCES pipeline_runs(run_id) ON DELETE CASCADE,
+    column_name TEXT NOT NULL,
+    row_count BIGINT NOT NULL,
+    quantiles JSONB NOT NULL,       -- relative-error quantile sketch (bucket index -> count)
+    hll_precision SMALLINT NOT NULL, -- HyperLogLog precision (2^precision registers)
+    hll_registers BYTEA NOT NULL,    -- HyperLogLog registers, merged by element-wise max
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (run_id, column_name)
+);
+
+-- The baseline is "last N passed runs"
+CREATE INDEX IF NOT EXISTS pipeline_runs_passed_recent
+    ON pipeline_runs (completed_at DESC) WHERE status = 'PASSED';
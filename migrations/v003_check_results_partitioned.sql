@@ -0,0 +1,68 @@
+-- check_results: typed numeric metric, composite indexes, monthly range partitions.
+-- Dashboard/trend queries filter on check_name + time and read metric_numeric directly;
+-- run lookups use (run_id, created_at); time filters prune to the matching months.
+-- Existing rows are copied into the partitioned table once (metric_numeric backfilled).
+
+CREATE OR REPLACE FUNCTION drg_ensure_check_results_partition(ts TIMESTAMP WITH TIME ZONE) RETURNS void AS $$
+DECLARE
+    start_ts TIMESTAMP WITH TIME ZONE := date_trunc('month', ts AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    end_ts TIMESTAMP WITH TIME ZONE := start_ts + INTERVAL '1 month';
+    part TEXT := 'check_results_' || to_char(start_ts AT TIME ZONE 'UTC', 'YYYYMM');
+BEGIN
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    PERFORM pg_advisory_xact_lock(hashtext(part));  -- concurrent writers create it once
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    -- Rows that landed in the default partition for this month move into the new one
+    EXECUTE format('CREATE TABLE %I (LIKE check_results INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part);
+    EXECUTE format('WITH moved AS (DELETE FROM check_results_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                   'INSERT INTO %I SELECT * FROM moved', start_ts, end_ts, part);
+    EXECUTE format('ALTER TABLE check_results ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', part, start_ts, end_ts);
+END
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'check_results'::regclass) = 'p' THEN
+        RETURN;  -- already migrated
+    END IF;
+
+    ALTER TABLE check_results RENAME TO check_results_legacy;
+    ALTER SEQUENCE check_results_id_seq RENAME TO check_results_legacy_id_seq;
+    ALTER TABLE check_results_legacy RENAME CONSTRAINT check_results_pkey TO check_results_legacy_pkey;
+    ALTER TABLE check_results_legacy RENAME CONSTRAINT check_results_run_id_fkey TO check_results_legacy_run_id_fkey;
+
+    CREATE TABLE check_results (
+        id BIGSERIAL,
+        run_id UUID NOT NULL REFERENCES pipeline_runs(run_id),
+        check_name TEXT NOT NULL,
+        passed BOOLEAN NOT NULL,
+        metric_value TEXT,               -- as reported (may be non-numeric, e.g. 'N/A')
+        metric_numeric DOUBLE PRECISION, -- typed copy when the metric is a finite number
+        details JSONB,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    CREATE TABLE check_results_default PARTITION OF check_results DEFAULT;
+    CREATE INDEX check_results_check_time ON check_results (check_name, created_at);
+    CREATE INDEX check_results_run ON check_results (run_id, created_at);
+
+    -- One partition per month that has data, plus the current and next month
+    PERFORM drg_ensure_check_results_partition(m)
+    FROM (SELECT DISTINCT date_trunc('month', created_at) AS m FROM check_results_legacy WHERE created_at IS NOT NULL
+          UNION SELECT now() UNION SELECT now() + INTERVAL '1 month') months;
+
+    INSERT INTO check_results (id, run_id, check_name, passed, metric_value, metric_numeric, details, created_at)
+    SELECT id, run_id, check_name, passed, metric_value,
+           CASE WHEN metric_value ~ '^\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$'
+                THEN metric_value::DOUBLE PRECISION END,
+           details, COALESCE(created_at, now())
+    FROM check_results_legacy;
+    PERFORM setval('check_results_id_seq', GREATEST((SELECT MAX(id) FROM check_results), 1));
+
+    DROP TABLE check_results_legacy;
+END
+$$;
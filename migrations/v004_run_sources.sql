@@ -0,0 +1,9 @@
+-- What each run actually read, so replay re-validates those files instead of
+-- reconstructing paths by naming convention. Single-file runs record one file and no
+-- root; directory-dataset runs record the dataset root, the files left after partition
+-- pruning and the event-time window the rows were filtered to.
+ALTER TABLE pipeline_runs
+    ADD COLUMN IF NOT EXISTS source_root TEXT,
+    ADD COLUMN IF NOT EXISTS source_files TEXT[],
+    ADD COLUMN IF NOT EXISTS window_start TIMESTAMP WITH TIME ZONE,
+    ADD COLUMN IF NOT EXISTS window_end TIMESTAMP WITH TIME ZONE;
@@ -0,0 +1,61 @@
+import os
+import sys
+import json
+import subprocess
+
+# Import cost for the `status` path (drg.cli + DB layer), excluding interpreter start-up.
+# The eager CLI took ~0.8s here; the slim path takes well under 0.1s.
+STATUS_IMPORT_BUDGET_SECONDS = 0.35
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "scipy", "matplotlib", "prometheus_client")
+
+STATUS_PROBE = """
+import sys, json, time
+t0 = time.perf_counter()
+import drg.cli
+import drg.policy.engine as engine
+elapsed = time.perf_counter() - t0
+engine.is_gate_open = lambda: True  # no database needed for this probe
+sys.argv = ["drg", "status"]
+drg.cli.main()
+print(json.dumps({"import_seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+def _probe(env=None):
+    out = subprocess.run([sys.executable, "-c", STATUS_PROBE], capture_output=True, text=True, check=True, env=env)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def test_status_path_skips_heavy_imports():
+    result = _probe()
+    assert result["heavy"] == []
+
+def test_status_traces_without_heavy_imports(tmp_path):
+    out = tmp_path / "status.json"
+    result = _probe(env={**os.environ, "DRG_TRACE": str(out)})
+    assert result["heavy"] == []
+    names = {e["name"] for e in json.loads(out.read_text())["traceEvents"]}
+    assert "drg status" in names
+
+def test_status_import_time_budget():
+    # Best of three to ride out a cold filesystem cache
+    best = min(_probe()["import_seconds"] for _ in range(3))
+    assert best < STATUS_IMPORT_BUDGET_SECONDS
+
+def test_cli_constants_mirror_validation():
+    import drg.cli
+    from drg.validation.runner import MODES
+    from drg.validation.streaming import DEFAULT_BATCH_SIZE
+    assert drg.cli.MODES == MODES
+    assert drg.cli.DEFAULT_BATCH_SIZE == DEFAULT_BATCH_SIZE
+
+def test_cli_lazy_exports_resolve():
+    from drg.cli import generate_and_save, enforce_policy
+    from drg.ingest.generator import generate_and_save as real_generate
+    from drg.policy.engine import enforce_policy as real_enforce
+    assert generate_and_save is real_generate
+    assert enforce_policy is real_enforce
+
+def test_incremental_without_batch_is_rejected():
+    out = subprocess.run([sys.executable, "-m", "drg.cli", "validate", "--run-id", "r", "--incremental"],
+                         capture_output=True, text=True)
+    assert out.returncode == 2
+    assert "--incremental requires --batch" in out.stderr
@@ -44,6 +44,25 @@ def test_generator_deterministic():
     
     pd.testing.assert_frame_equal(df1, df2)
 
+def test_generator_ids_are_valid_uuid4():
+    import uuid
+    ids = DataGenerator(seed=1).generate_batch(200)['ride_id']
+    assert ids.is_unique
+    assert all(uuid.UUID(x).version == 4 and str(uuid.UUID(x)) == x for x in ids)
+
+def test_chunked_generation_independent_of_workers(tmp_path):
+    import pyarrow.parquet as pq
+    from datetime import datetime
+    from drg.ingest.generator import generate_to_parquet
+    fixed_date = datetime(2023, 1, 1, 12, 0, 0)
+    paths = []
+    for workers in (1, 2):
+        path = str(tmp_path / f"w{workers}.parquet")
+        assert generate_to_parquet(path, 2500, seed=9, chunk_rows=1000, workers=workers, reference_date=fixed_date) == 2500
+        paths.append(path)
+    assert pq.ParquetFile(paths[0]).metadata.num_row_groups == 3
+    assert pq.read_table(paths[0]).equals(pq.read_table(paths[1]))
+
 def test_failure_injection_schema_drift():
     gen = DataGenerator(seed=42)
     df = gen.generate_batch(10)
@@ -65,3 +84,793 @@ def test_failure_injection_value_spike():
     mean_after = df_bad['fare_amount'].mean()
     
     assert mean_after > mean_before * 10 
+
+# --- Streaming Tests ---
+def _contract_with_reference(tmp_path):
+    from drg.contracts.loader import load_contract
+    from drg.ingest.generator import generate_and_save
+    contract = load_contract("config/contract.yaml")
+    ref = generate_and_save(str(tmp_path / "reference"), "reference", seed=123)
+    contract.checks['distribution']['reference_path'] = ref
+    return contract
+
+def _assert_same_results(a, b):
+    assert [r.check_name for r in a] == [r.check_name for r in b]
+    for ra, rb in zip(a, b):
+        assert ra.passed == rb.passed, ra.check_name
+        if ra.check_name == 'freshness':
+            # delay is measured against datetime.now() at result time
+            assert ra.details['latest_ts'] == rb.details['latest_ts']
+        else:
+            assert ra.metric == rb.metric or (ra.metric != ra.metric and rb.metric != rb.metric), ra.check_name
+            assert ra.details == rb.details, ra.check_name
+
+@pytest.mark.parametrize("scenario", [None, 'schema_drift', 'late_data', 'value_spike', 'null_explosion', 'missing_partition'])
+def test_streaming_matches_in_memory(tmp_path, scenario):
+    from drg.ingest.generator import generate_and_save
+    from drg.validation.runner import validate_file
+    contract = _contract_with_reference(tmp_path)
+    fpath = generate_and_save(str(tmp_path / "raw"), "run", scenario=scenario, seed=7)
+
+    in_memory = validate_file(fpath, contract, mode="memory")
+    streamed = validate_file(fpath, contract, mode="stream", batch_size=97)
+    _assert_same_results(in_memory, streamed)
+
+    from_footer = validate_file(fpath, contract, mode="metadata", batch_size=97)
+    _assert_same_results(in_memory, from_footer)
+
+    as_arrow = validate_file(fpath, contract, mode="arrow", batch_size=97)
+    _assert_same_results(in_memory, as_arrow)
+
+def test_memory_budget_falls_back_to_streaming(tmp_path, monkeypatch):
+    import pyarrow.parquet as pq
+    from drg.ingest.generator import generate_and_save
+    from drg.contracts.compiler import plan_for
+    from drg.validation import runner
+    from drg.validation.memory import MEMORY_BUDGET_ENV, load_columns, estimated_bytes, peak_rss_bytes
+    contract = _contract_with_reference(tmp_path)
+    fpath = generate_and_save(str(tmp_path / "raw"), "run", seed=7)
+    pf = pq.ParquetFile(fpath)
+    columns = load_columns(plan_for(contract), pf.schema_arrow)
+    # Python string objects make the pandas frame the larger of the two
+    arrow_bytes = estimated_bytes([pf.metadata], pf.schema_arrow, columns, "arrow")
+    assert estimated_bytes([pf.metadata], pf.schema_arrow, columns, "memory") > arrow_bytes > 0
+
+    streamed = []
+    monkeypatch.setattr(runner, "run_validations_streaming",
+                        lambda *args, **kwargs: streamed.append(args[0]) or [])
+    monkeypatch.setenv(MEMORY_BUDGET_ENV, str(arrow_bytes / (1024 * 1024) * 1.01))
+    runner.validate_file(fpath, contract, mode="arrow")
+    assert streamed == []
+    runner.validate_file(fpath, contract, mode="memory")
+    assert streamed == [fpath]
+    assert peak_rss_bytes() > 0
+
+def test_drift_ks_matches_scipy_within_one_grid_cell(tmp_path):
+    import pandas as pd
+    from scipy.stats import ks_2samp
+    from drg.ingest.generator import generate_and_save
+    from drg.validation.drift import ColumnHistogram, score_drift
+    from drg.validation.reference import build_reference_profile
+    contract = _contract_with_reference(tmp_path)
+    ref_path = contract.checks['distribution']['reference_path']
+    reference = pd.read_parquet(ref_path)['fare_amount'].dropna().values
+    entry = build_reference_profile(ref_path, ['fare_amount'])["columns"]['fare_amount']
+    # Tolerance: D on the grid misses at most the reference mass strictly between two grid points
+    tolerance = max(np.asarray(entry['grid_below'][1:]) - np.asarray(entry['grid_cdf'][:-1]))
+    assert round(tolerance, 9) <= 0.05
+
+    for scenario, seed in ((None, 8), ("value_spike", 9)):
+        actual = pd.read_parquet(generate_and_save(str(tmp_path / "raw"), f"run-{seed}", scenario=scenario, seed=seed))
+        values = actual['fare_amount'].dropna().values
+        hist = ColumnHistogram(entry)
+        hist.update(values)
+        exact = ks_2samp(reference, values).statistic
+        ks = score_drift({'fare_amount': hist})['fare_amount']['ks']
+        assert exact - tolerance <= ks <= exact + 1e-12, scenario
+
+def test_sampled_drift_reports_error_and_stays_close_to_exact(tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from drg.validation.runner import validate_file
+    from drg.validation.sampling import Reservoir, sample_spec
+    assert sample_spec({'sample': {'max_error': 0.01, 'confidence': 0.95}}).rows == 18445
+    contract = _contract_with_reference(tmp_path)
+    del contract.checks['baseline']  # sketches would read every row of the same columns
+    fpath = str(tmp_path / "rides.parquet")
+    pq.write_table(pa.Table.from_pandas(DataGenerator(seed=3).generate_batch(20_000), preserve_index=False),
+                   fpath, row_group_size=1000)
+    exact = validate_file(fpath, contract, mode="metadata")
+    exact_drift = next(r for r in exact if r.check_name == "distribution")
+    assert "sample" not in exact_drift.details
+
+    def sampled(mode, **sample):
+        contract.checks['distribution']['sample'] = dict(sample, rows=4000)
+        results = validate_file(fpath, contract, mode=mode)
+        # Every other check still sees every row
+        _assert_same_results([r for r in exact if r.check_name != "distribution"],
+                             [r for r in results if r.check_name != "distribution"])
+        return next(r for r in results if r.check_name == "distribution")
+
+    for mode, strategy, expected in (("metadata", "row_groups", "row_groups"), ("stream", "reservoir", "reservoir"),
+                                     ("memory", "row_groups", "rows")):
+        drift = sampled(mode, strategy=strategy)
+        assert drift.details["sample"]["strategy"] == expected
+        assert drift.details["sample"]["rows"] == 4000 and drift.details["sample"]["of_rows"] == 20_000
+        column, exact_column = drift.details["columns"]["fare_amount"], exact_drift.details["columns"]["fare_amount"]
+        assert 0 < column["ks_error"] < 0.05 and 0 < column["psi_error"] < 0.05
+        assert abs(column["ks"] - exact_column["ks"]) <= 2 * column["ks_error"]
+        assert column["n"] < exact_column["n"]
+    assert sampled("metadata").details["sample"]["row_groups"] == 5
+
+    # A sample at least as large as the file is the file
+    contract.checks['distribution']['sample'] = {'rows': 50_000}
+    whole = next(r for r in validate_file(fpath, contract, mode="stream") if r.check_name == "distribution")
+    assert "sample" not in whole.details and whole.metric == exact_drift.metric
+
+    reservoir = Reservoir(1000, seed=1)
+    for start in range(0, 10_000, 1000):
+        reservoir.add(pa.record_batch([pa.array(np.arange(start, start + 1000))], names=["v"]))
+    kept = reservoir.table.column("v").to_numpy()
+    assert reservoir.seen == 10_000 and len(np.unique(kept)) == 1000
+    assert abs(kept.mean() - 4999.5) < 300
+
+def test_row_group_sample_reads_a_fraction_of_a_file_with_few_groups(tmp_path, monkeypatch):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from drg.validation.runner import validate_file
+    contract = _contract_with_reference(tmp_path)
+    del contract.checks['baseline']
+    contract.checks['distribution']['sample'] = {'rows': 500}
+    fpath = str(tmp_path / "rides.parquet")
+    pq.write_table(pa.Table.from_pandas(DataGenerator(seed=3).generate_batch(10_000), preserve_index=False),
+                   fpath, row_group_size=1000)
+
+    read = []
+    real_read = pq.ParquetFile.read_row_group
+    monkeypatch.setattr(pq.ParquetFile, "read_row_group", lambda pf, i, *a, **k: read.append(i) or real_read(pf, i, *a, **k))
+    drift = next(r for r in validate_file(fpath, contract, mode="metadata") if r.check_name == "distribution")
+    assert drift.details["sample"]["row_groups"] == len(read) == 3 and drift.details["sample"]["of_row_groups"] == 10
+    metadata = pq.ParquetFile(fpath).metadata
+    total = sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+    assert sum(metadata.row_group(i).total_byte_size for i in read) < total / 3
+
+def test_metadata_plan_reads_only_drift_columns(tmp_path):
+    import pyarrow.parquet as pq
+    from drg.ingest.generator import generate_and_save
+    from drg.validation.metadata import plan_validations
+    contract = _contract_with_reference(tmp_path)
+    fpath = generate_and_save(str(tmp_path / "raw"), "run", seed=7)
+
+    accumulators, pending, columns = plan_validations(pq.ParquetFile(fpath), contract)
+    # ride_id hashes for the uniqueness check; everything else the footer answers
+    assert [type(a).__name__ for a in pending] == ['UniquenessAccumulator', 'DistributionAccumulator', 'SketchAccumulator']
+    assert columns == ['ride_id', 'fare_amount', 'trip_distance', 'vendor_id', 'passenger_count']
+
+# --- Reference Profile Tests ---
+def test_reference_profile_matches_raw_reference(tmp_path):
+    from drg.ingest.generator import generate_and_save
+    from drg.validation.core import psi_breakpoints
+    from drg.validation.reference import reference_histogram
+    ref = generate_and_save(str(tmp_path), "reference", seed=123)
+    expected = pd.read_parquet(ref)['fare_amount'].dropna().values
+
+    breakpoints, expected_percents = reference_histogram(ref, 'fare_amount')
+    np.testing.assert_array_equal(breakpoints, psi_breakpoints(expected))
+    np.testing.assert_array_equal(expected_percents, np.histogram(expected, breakpoints)[0] / len(expected))
+
+def test_reference_profile_rebuilt_only_on_change(tmp_path, monkeypatch):
+    import os
+    from drg.ingest.generator import generate_and_save
+    from drg.validation import reference
+    ref = generate_and_save(str(tmp_path), "reference", seed=123)
+    builds = []
+    real_build = reference.build_reference_profile
+    monkeypatch.setattr(reference, "build_reference_profile", lambda *a, **k: builds.append(a) or real_build(*a, **k))
+
+    reference.load_reference_profile(ref, ['fare_amount'])
+    reference.load_reference_profile(ref, ['fare_amount'])
+    assert len(builds) == 1
+
+    # Touched but identical content: content hash keeps the cached profile
+    os.utime(ref, ns=(0, 0))
+    reference.load_reference_profile(ref, ['fare_amount'])
+    assert len(builds) == 1
+
+    generate_and_save(str(tmp_path), "reference", seed=999)
+    reference.load_reference_profile(ref, ['fare_amount'])
+    assert len(builds) == 2
+
+    with pytest.raises(reference.ReferenceColumnMissing):
+        reference.reference_histogram(ref, 'not_a_column')
+
+# --- Drift Engine Tests ---
+def test_column_histogram_matches_np_histogram():
+    from drg.validation.drift import ColumnHistogram, psi_breakpoints
+    rng = np.random.default_rng(0)
+    expected = rng.lognormal(2.5, 0.5, 500)
+    edges = psi_breakpoints(expected)
+    entry = {'edges': edges.tolist(), 'quantiles': np.percentile(expected, [0, 50, 100]).tolist()}
+
+    # Values exactly on edges and outside the reference range
+    actual = np.concatenate([rng.lognormal(2.6, 0.5, 700), edges, [edges[0] - 1, edges[-1] + 1]])
+    hist = ColumnHistogram(entry)
+    hist.update(actual[:300])
+    hist.update(actual[300:])
+    np.testing.assert_array_equal(hist.bucket_counts(), np.histogram(actual, edges)[0])
+
+def test_calculate_psi_identical_inputs_is_zero():
+    from drg.validation.core import calculate_psi
+    data = np.random.default_rng(1).normal(10, 2, 1000)
+    assert calculate_psi(data, data) == pytest.approx(0.0)
+    assert calculate_psi(data, data * 3) > 0.2
+
+def test_distribution_gates_per_column_limits(tmp_path):
+    from drg.validation.core import validate_distribution
+    contract = _contract_with_reference(tmp_path)
+    gen = DataGenerator(seed=5)
+    df = gen.generate_batch(1000)
+    res = validate_distribution(df, contract.checks, contract.schema)
+    assert res.passed
+    assert set(res.details['columns']) == {'fare_amount', 'trip_distance', 'vendor_id', 'passenger_count'}
+    assert not res.details['columns']['vendor_id']['gated']
+
+    # Drift only in an ungated column is reported but does not fail the check
+    df['vendor_id'] = 1
+    res = validate_distribution(df, contract.checks, contract.schema)
+    assert res.passed and res.details['columns']['vendor_id']['psi'] > 0.2
+
+    df['trip_distance'] = df['trip_distance'] * 10
+    res = validate_distribution(df, contract.checks, contract.schema)
+    assert not res.passed and not res.details['columns']['trip_distance']['passed']
+
+# --- Column Check Engine Tests ---
+def _column_results(df, contract):
+    from drg.validation.columns import validate_columns
+    return {r.check_name: r for r in validate_columns(df, contract.schema, contract.checks)}
+
+def test_column_checks_clean_batch_passes():
+    from drg.contracts.loader import load_contract
+    contract = load_contract("config/contract.yaml")
+    res = _column_results(DataGenerator(seed=3).generate_batch(500), contract)
+    assert all(r.passed for r in res.values())
+
+def test_column_checks_catch_null_explosion():
+    from drg.contracts.loader import load_contract
+    contract = load_contract("config/contract.yaml")
+    gen = DataGenerator(seed=3)
+    df = gen.inject_failure(gen.generate_batch(500), 'null_explosion')
+    res = _column_results(df, contract)
+    assert not res['null_rate'].passed
+    assert res['null_rate'].details['violations'] == ['vendor_id']
+    # vendor_id is now float-backed but still integral, so the type check holds
+    assert res['schema_types'].passed
+
+def test_column_checks_types_and_bounds():
+    schema = [SchemaField('a', 'int', min=0, max=10), SchemaField('b', 'int'), SchemaField('c', 'float', min=0.0)]
+    df = pd.DataFrame({'a': [-1, 5, 11, 12], 'b': ['x', 'y', 'z', 'w'], 'c': [0.5, 1.5, np.nan, 2.0]})
+    res = _column_results(df, type('C', (), {'schema': schema, 'checks': {}})())
+    assert res['schema_types'].details['mismatched'] == {'b': {'expected': 'int', 'actual': 'string'}}
+    assert res['value_bounds'].metric == 3
+    assert res['value_bounds'].details['violations']['a'] == {'below_min': 1, 'above_max': 2, 'min': 0, 'max': 10}
+    assert res['null_rate'].details['columns']['c'] == {'nulls': 1, 'fraction': 0.25}
+
+def test_column_checks_answered_from_footer_when_stats_in_bounds(tmp_path):
+    import pyarrow.parquet as pq
+    from drg.contracts.loader import load_contract
+    from drg.validation.columns import ColumnCheckAccumulator
+    from drg.validation.metadata import FooterStats
+    contract = load_contract("config/contract.yaml")
+    fpath = str(tmp_path / "clean.parquet")
+    DataGenerator(seed=3).generate_batch(500).to_parquet(fpath, index=False)
+
+    pf = pq.ParquetFile(fpath)
+    acc = ColumnCheckAccumulator(contract.schema, contract.checks)
+    acc.start(pf.schema_arrow)
+    assert acc.from_footer(FooterStats(pf.metadata))
+    assert all(r.passed for r in acc.results())
+
+# --- Batch Validation Tests ---
+def test_resolve_batch_is_ordered_and_deduplicated(tmp_path):
+    from drg.validation.batch import resolve_batch
+    for run_id in ['b', 'a']:
+        (tmp_path / f"rides_{run_id}.parquet").touch()
+    pairs = resolve_batch([str(tmp_path), str(tmp_path / "rides_a.parquet"), 'c'], raw_dir='raw')
+    assert pairs == [('a', str(tmp_path / "rides_a.parquet")), ('b', str(tmp_path / "rides_b.parquet")), ('c', 'raw/rides_c.parquet')]
+
+def test_validate_batch_matches_single_file_in_order(tmp_path):
+    from drg.ingest.generator import generate_and_save
+    from drg.validation.batch import resolve_batch, validate_batch
+    from drg.validation.runner import validate_file
+    contract = _contract_with_reference(tmp_path)
+    scenarios = [None, 'null_explosion', 'late_data', None]
+    for i, scenario in enumerate(scenarios):
+        generate_and_save(str(tmp_path / "raw"), f"run{i}", scenario=scenario, seed=i)
+
+    pairs = resolve_batch([str(tmp_path / "raw"), 'missing'], raw_dir=str(tmp_path / "raw"))
+    out = list(validate_batch(pairs, contract, workers=2))
+    assert [run_id for run_id, _, _ in out] == ['run0', 'run1', 'run2', 'run3', 'missing']
+    assert out[-1][2] is None
+    for (_, path, results), scenario in zip(out, scenarios):
+        assert all(r.passed for r in results) == (scenario is None)
+        _assert_same_results(results, validate_file(path, contract))
+
+def test_validate_batch_survives_a_corrupt_file(tmp_path):
+    from drg.ingest.generator import generate_and_save
+    from drg.validation.batch import resolve_batch, validate_batch
+    contract = _contract_with_reference(tmp_path)
+    for i in range(3):
+        generate_and_save(str(tmp_path / "raw"), f"run{i}", seed=i)
+    corrupt = tmp_path / "raw" / "rides_run1.parquet"
+    corrupt.write_bytes(corrupt.read_bytes()[:200])  # truncated mid-file
+
+    pairs = resolve_batch([str(tmp_path / "raw")], raw_dir=str(tmp_path / "raw"))
+    for workers in (1, 2):
+        out = list(validate_batch(pairs, contract, workers=workers))
+        assert [run_id for run_id, _, _ in out] == ['run0', 'run1', 'run2']
+        assert out[1][2] is None
+        assert all(r.passed for r in out[0][2]) and all(r.passed for r in out[2][2])
+
+# --- Benchmark Suite Tests ---
+def test_compare_to_baseline_flags_slow_stages_only():
+    from drg.bench.suite import compare_to_baseline
+    def report(read_ms, check_ms, tiny_ms):
+        stages = {"read": {"p50_ms": read_ms}, "column_checks": {"p50_ms": check_ms}, "volume": {"p50_ms": tiny_ms}}
+        return {"results": [{"rows": 1000, "extra_columns": 0, "stages": stages, "total": {"p50_ms": read_ms + check_ms}}]}
+    baseline = report(100.0, 50.0, 0.01)
+    assert compare_to_baseline(report(110.0, 55.0, 0.05), baseline, tolerance=0.25) == []
+    regressions = compare_to_baseline(report(100.0, 80.0, 0.05), baseline, tolerance=0.25)
+    assert [r["stage"] for r in regressions] == ["column_checks"]
+    # Sweep points absent from the baseline are not compared
+    assert compare_to_baseline(report(1000.0, 1000.0, 1.0), {"results": []}) == []
+
+# --- Metrics Tests ---
+def test_metrics_record_checks_and_scans(tmp_path, monkeypatch):
+    from drg import metrics
+    from drg.ingest.generator import generate_and_save
+    from drg.validation.runner import validate_file
+    registry = metrics.enable()["registry"]
+    contract = _contract_with_reference(tmp_path)
+    fpath = generate_and_save(str(tmp_path), "metrics", scenario='null_explosion', seed=3)
+
+    def sample(name, **labels):
+        return registry.get_sample_value(name, labels) or 0.0
+
+    before_rows = sample("drg_rows_scanned_total", mode="stream")
+    before_fail = sample("drg_check_outcomes_total", check="null_rate", result="fail")
+    before_cols = sample("drg_check_duration_seconds_count", check="columns")
+    validate_file(fpath, contract, mode="stream")
+
+    assert sample("drg_rows_scanned_total", mode="stream") - before_rows == 1000
+    assert sample("drg_bytes_scanned_total", mode="stream") > 0
+    assert sample("drg_check_outcomes_total", check="null_rate", result="fail") - before_fail == 1
+    assert sample("drg_check_duration_seconds_count", check="columns") - before_cols == 1
+
+    out = tmp_path / "drg.prom"
+    monkeypatch.setenv(metrics.TEXTFILE_ENV, str(out))
+    metrics.export_metrics()
+    assert 'drg_check_outcomes_total{check="null_rate",result="fail"}' in out.read_text()
+
+# --- Tracing Tests ---
+def test_trace_spans_stages_checks_and_reads(tmp_path, monkeypatch):
+    import json
+    from drg import trace
+    from drg.ingest.generator import generate_and_save
+    from drg.validation.runner import validate_file
+    for name, value in (("_enabled", False), ("_path", None), ("_capture", frozenset()), ("_events", []), ("_profiles", {})):
+        monkeypatch.setattr(trace, name, value)
+    monkeypatch.setenv(trace.TRACE_ENV, "")
+    monkeypatch.setenv(trace.CAPTURE_ENV, "")
+    contract = _contract_with_reference(tmp_path)
+    fpath = generate_and_save(str(tmp_path), "traced", seed=4)
+
+    # Off: nothing is recorded
+    validate_file(fpath, contract, mode="stream")
+    assert trace._events == []
+
+    out = tmp_path / "trace.json"
+    trace.enable(str(out), capture=("cpu", "memory"), command="validate")
+    validate_file(fpath, contract, mode="stream")
+    validate_file(fpath, contract, mode="memory")
+    assert trace.write() == str(out)
+
+    events = json.loads(out.read_text())["traceEvents"]
+    spans = {(e["cat"], e["name"]) for e in events if e["ph"] == "X"}
+    assert {("stage", "validate"), ("stage", "read"), ("read", "read batch"), ("check", "columns"),
+            ("check", "distribution")} <= spans
+    stage = next(e for e in events if e["name"] == "read" and e["ph"] == "X")
+    assert stage["dur"] > 0 and stage["args"]["alloc_peak_kb"] >= 0 and stage["args"]["top_allocations"]
+    assert (tmp_path / "trace.validate.prof").exists()
+
+# --- Result Cache Tests ---
+def test_result_cache_hits_and_invalidates(tmp_path):
+    from drg.ingest.generator import generate_and_save
+    from drg.validation.cache import ResultCache, cached_validate
+    from drg.validation.runner import validate_file
+    contract = _contract_with_reference(tmp_path)
+    fpath = generate_and_save(str(tmp_path / "raw"), "run", seed=7)
+    cache = ResultCache(str(tmp_path / "cache"))
+    calls = []
+    def validate(path, c):
+        calls.append(path)
+        return validate_file(path, c)
+
+    first = cached_validate(fpath, contract, validate, cache)
+    second = cached_validate(fpath, contract, validate, cache)
+    assert len(calls) == 1
+    _assert_same_results(first, second)
+
+    # Contract change and data rewrite both miss
+    contract.checks['volume'] = {'min_rows': 10}
+    cached_validate(fpath, contract, validate, cache)
+    generate_and_save(str(tmp_path / "raw"), "run", scenario='late_data', seed=7)
+    stale = cached_validate(fpath, contract, validate, cache)
+    assert len(calls) == 3
+    assert not next(r for r in stale if r.check_name == "freshness").passed
+
+def test_result_cache_shared_across_modes_unless_drift_is_sampled(tmp_path):
+    import os
+    from drg.ingest.generator import generate_and_save
+    from drg.validation.cache import ResultCache, cache_key
+    from drg.validation.runner import validate_file
+    contract = _contract_with_reference(tmp_path)
+    fpath = generate_and_save(str(tmp_path / "raw"), "run", seed=8)
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    # All modes give the same results, so one entry serves every mode
+    first = validate_file(fpath, contract, mode="memory", cache=cache)
+    assert len({cache_key(fpath, contract, mode) for mode in ("memory", "arrow", "stream", "metadata")}) == 1
+    _assert_same_results(first, validate_file(fpath, contract, mode="metadata", cache=cache))
+    assert len(os.listdir(cache.root)) == 1
+
+    # Sampled drift differs by mode (rows vs row groups)
+    contract.checks['distribution']['sample'] = {'rows': 100}
+    assert cache_key(fpath, contract, "memory") != cache_key(fpath, contract, "metadata")
+
+def test_result_cache_recomputes_freshness_and_evicts_lru(tmp_path):
+    import time
+    from drg.validation.base import ValidationResult
+    from drg.validation.cache import ResultCache
+    cache = ResultCache(str(tmp_path), max_entries=2)
+    old = pd.Timestamp.now() - pd.Timedelta(hours=30)
+    cache.put("a", [ValidationResult("freshness", True, 0.0, {"threshold": 24, "latest_ts": str(old)})])
+    hit = cache.get("a", {'freshness': {'max_delay_hours': 24}})
+    assert not hit[0].passed and hit[0].metric >= 30
+
+    time.sleep(0.01)
+    cache.put("b", [])
+    time.sleep(0.01)
+    cache.get("a", {})  # refresh "a"
+    time.sleep(0.01)
+    cache.put("c", [])
+    assert cache.get("b", {}) is None
+    assert cache.get("a", {}) is not None and cache.get("c", {}) is not None
+
+# --- Contract Compiler Tests ---
+def test_compiled_plan_resolves_defaults_and_matches_contract(tmp_path):
+    import dataclasses
+    from drg.contracts.compiler import compile_contract, plan_for
+    from drg.validation.core import run_validations
+    contract = _contract_with_reference(tmp_path)
+    del contract.checks['freshness']
+    plan = compile_contract(contract)
+
+    assert [c.name for c in plan.checks] == ['schema_presence', 'columns', 'volume', 'freshness', 'uniqueness', 'distribution', 'sketches']
+    assert plan.check('freshness').thresholds == {'max_delay_hours': 24}
+    assert plan.drift.primary == 'fare_amount' and plan.reference.path == contract.checks['distribution']['reference_path']
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        plan.columns = ()
+    assert plan_for(contract) is plan_for(contract)
+
+    df = DataGenerator(seed=7).generate_batch(500)
+    _assert_same_results(run_validations(df, plan), run_validations(df, contract))
+
+def test_load_plan_reuses_pickled_plan(tmp_path, monkeypatch):
+    import shutil
+    from drg.contracts import compiler
+    path = str(tmp_path / "contract.yaml")
+    shutil.copy("config/contract.yaml", path)
+    first = compiler.load_plan(path, cache_dir=str(tmp_path / "plans"))
+
+    compiler._memo.clear()
+    def no_parse(path):
+        raise AssertionError("YAML should not be parsed again")
+    monkeypatch.setattr(compiler, "load_contract", no_parse)
+    second = compiler.load_plan(path, cache_dir=str(tmp_path / "plans"))
+    assert second == first and second is not first
+
+    monkeypatch.undo()
+    with open(path) as f:
+        edited = f.read().replace("min_rows: 100", "min_rows: 5")
+    with open(path, "w") as f:
+        f.write(edited)
+    assert compiler.load_plan(path, cache_dir=str(tmp_path / "plans")).check('volume').thresholds['min_rows'] == 5
+
+# --- Partition Index Tests ---
+def test_partition_index_touches_only_new_or_changed_files(tmp_path, monkeypatch):
+    import os
+    from datetime import datetime
+    from drg.validation import partitions
+    from drg.validation.partitions import PartitionIndex
+    paths = []
+    for hour in range(3):
+        df = DataGenerator(seed=hour).generate_batch(200, reference_date=datetime(2024, 1, 1, hour * 2))
+        paths.append(str(tmp_path / f"rides_{hour}.parquet"))
+        df.to_parquet(paths[-1])
+
+    index = PartitionIndex(str(tmp_path / "index.json"))
+    assert index.changed(paths) == paths
+    for p in paths:
+        index.update(p)
+    index.save()
+
+    reopened = PartitionIndex(str(tmp_path / "index.json"))
+    assert reopened.get(paths[0]).rows == 200
+    def no_read(path):
+        raise AssertionError("unchanged partitions must not be opened")
+    monkeypatch.setattr(partitions, "dataset_fingerprint", no_read)
+    assert reopened.changed(paths) == []
+    monkeypatch.undo()
+
+    # Touched without changing bytes: stat differs, fingerprint doesn't
+    os.utime(paths[1], ns=(1, 1))
+    assert reopened.changed(paths) == []
+    DataGenerator(seed=99).generate_batch(50).to_parquet(paths[2])
+    assert reopened.changed(paths) == [paths[2]]
+
+def test_dataset_results_watermark_volume_and_gaps():
+    from datetime import datetime
+    from drg.validation.partitions import PartitionEntry, dataset_results
+    def entry(lo, hi, rows=100):
+        return PartitionEntry("fp", 1, 1, rows, datetime(2024, 1, 1, *lo).isoformat(), datetime(2024, 1, 1, *hi).isoformat())
+    entries = [entry((0,), (1,)), entry((1, 30), (3,)), entry((9,), (10,)), entry((2,), (2, 30))]
+    checks = {'freshness': {'max_delay_hours': 4}, 'dataset': {'min_rows': 500, 'max_gap_hours': 2}}
+
+    freshness, volume, gaps = dataset_results(entries, checks, now=datetime(2024, 1, 1, 12))
+    assert freshness.passed and freshness.metric == 2.0
+    assert not volume.passed and volume.metric == 400
+    assert not gaps.passed and gaps.metric == 1
+    assert gaps.details["gaps"][0]["hours"] == 6.0 and gaps.details["largest_hours"] == 6.0
+
+# --- Uniqueness Tests ---
+def test_uniqueness_within_batch_all_modes(tmp_path):
+    from drg.validation.runner import validate_file
+    contract = _contract_with_reference(tmp_path)
+    df = DataGenerator(seed=3).generate_batch(300)
+    df.loc[[10, 20, 30], 'ride_id'] = df.loc[0, 'ride_id']
+    df.loc[40, 'ride_id'] = None
+    fpath = str(tmp_path / "dups.parquet")
+    df.to_parquet(fpath)
+
+    for mode in ("memory", "stream", "metadata"):
+        result = next(r for r in validate_file(fpath, contract, mode=mode, batch_size=64) if r.check_name == "uniqueness")
+        assert not result.passed and result.metric == 3, mode
+
+def test_id_filter_flags_replayed_ids_within_fp_budget(tmp_path):
+    from drg.validation.uniqueness import IdFilter, hash_ids, history_result
+    checks = {'uniqueness': {'column': 'ride_id'}}
+    path = str(tmp_path / "ids.bloom")
+    id_filter = IdFilter(path, capacity=20_000, fp_rate=0.01)
+    first = hash_ids(DataGenerator(seed=1).generate_batch(5000)['ride_id'])
+    id_filter.add(first, "run-1")
+    id_filter.save()
+
+    reopened = IdFilter.open(path, 20_000, 0.01)
+    assert reopened.contains(first).all()
+    fresh = hash_ids(DataGenerator(seed=2).generate_batch(5000)['ride_id'])
+    assert history_result(fresh, "run-2", reopened, checks).passed
+    replayed = np.concatenate([fresh[:4000], first[:1000]])
+    result = history_result(replayed, "run-3", reopened, checks)
+    assert not result.passed and result.metric >= 1000
+    # A run already folded in is not matched against itself
+    assert history_result(first, "run-1", reopened, checks).passed
+    # The fill count is kept up to date across adds rather than recounted
+    reopened.add(fresh, "run-2")
+    recounted = IdFilter.open(path, 20_000, 0.01)
+    recounted.bits = reopened.bits
+    assert reopened.estimated_fp_rate() == recounted.estimated_fp_rate()
+
+def _add_run_and_save(path, seed):
+    from drg.validation.uniqueness import IdFilter, hash_ids
+    id_filter = IdFilter.open(path, 100_000, 0.01)
+    id_filter.add(hash_ids(DataGenerator(seed=seed).generate_batch(2000)['ride_id']), f"run-{seed}")
+    id_filter.save()
+
+def test_id_filter_saves_merge_across_processes(tmp_path):
+    import json
+    from concurrent.futures import ProcessPoolExecutor
+    from drg.validation.uniqueness import IdFilter, hash_ids
+    path = str(tmp_path / "ids.bloom")
+    # Two long-lived instances (e.g. `drg serve` and a `drg validate`) opened before either saved
+    a, b = IdFilter.open(path, 100_000, 0.01), IdFilter.open(path, 100_000, 0.01)
+    ids = {seed: hash_ids(DataGenerator(seed=seed).generate_batch(2000)['ride_id']) for seed in range(1, 8)}
+    a.add(ids[1], "run-1")
+    b.add(ids[2], "run-2")
+    b.add(ids[1], "run-1")  # indexed by both: counted once
+    a.save()
+    b.save()
+    with ProcessPoolExecutor(4) as pool:
+        list(pool.map(_add_run_and_save, [path] * 5, range(3, 8)))
+
+    merged = IdFilter.open(path, 100_000, 0.01)
+    assert merged.runs == {f"run-{seed}" for seed in range(1, 8)}
+    assert merged.count == 7 * 2000
+    assert all(merged.contains(h).all() for h in ids.values())
+    # The header carries a count, not every run ID
+    with open(path, "rb") as fh:
+        assert json.loads(fh.readline())["runs"] == 7
+    # A stale instance picks up the others' runs on its next save
+    a.add(ids[2], "run-2")
+    assert "run-7" not in a.runs
+    a.save()
+    assert "run-7" in a.runs and a.count == 7 * 2000
+
+def test_id_filter_save_writes_only_touched_bytes(tmp_path):
+    import os
+    from drg.validation.uniqueness import HEADER_BYTES, IdFilter, hash_ids
+    path = str(tmp_path / "ids.bloom")
+    _add_run_and_save(path, 1)
+    with open(path, "rb") as fh:
+        before = np.frombuffer(fh.read(), dtype=np.uint8)[HEADER_BYTES:].copy()
+    inode = os.stat(path).st_ino
+
+    id_filter = IdFilter.open(path, 100_000, 0.01)
+    ids = hash_ids(DataGenerator(seed=2).generate_batch(100)['ride_id'])
+    id_filter.add(ids, "run-2")
+    touched = np.unique(np.concatenate(id_filter._touched))
+    id_filter.save()
+
+    # Updated in place rather than rewritten, and only in the bytes run-2 set bits in
+    assert os.stat(path).st_ino == inode
+    with open(path, "rb") as fh:
+        after = np.frombuffer(fh.read(), dtype=np.uint8)[HEADER_BYTES:]
+    changed = np.flatnonzero(after != before)
+    assert len(changed) and np.isin(changed, touched).all()
+    assert len(touched) < len(before) // 10
+    reopened = IdFilter.open(path, 100_000, 0.01)
+    assert reopened.runs == {"run-1", "run-2"} and reopened.count == 2100
+    assert reopened.contains(ids).all()
+
+# --- Sketch Tests ---
+def test_sketches_are_accurate_and_merge_exactly():
+    from drg.validation.sketches import QuantileSketch, DistinctSketch, ks_distance
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(2.5, 0.6, 100_000)
+    whole, parts = QuantileSketch(0.01), [QuantileSketch(0.01) for _ in range(4)]
+    whole.update(values)
+    for part, chunk in zip(parts, np.array_split(values, 4)):
+        part.update(chunk)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+
+    assert merged.to_dict() == whole.to_dict()
+    for q in (0.01, 0.5, 0.95, 0.99):
+        assert abs(whole.quantile(q) - np.quantile(values, q)) <= 0.011 * np.quantile(values, q)
+    shifted = QuantileSketch(0.01)
+    shifted.update(values * 1.5)
+    assert ks_distance(whole, merged) == 0.0 and ks_distance(whole, shifted) > 0.2
+
+    ids = rng.integers(0, 50_000, 200_000)
+    a, b = DistinctSketch(12), DistinctSketch(12)
+    a.update(ids[:100_000])
+    b.update(ids[100_000:])
+    a.merge(b)
+    assert abs(a.estimate() - len(np.unique(ids))) / len(np.unique(ids)) < 0.05
+    small = DistinctSketch(12)
+    small.update(np.arange(100))
+    assert abs(small.estimate() - 100) < 3
+
+def test_baseline_leaves_out_runs_with_other_sketch_parameters():
+    from drg.validation.sketches import QuantileSketch, DistinctSketch, baseline_result, _serialize
+    rng = np.random.default_rng(1)
+    def row(run_id, accuracy, precision=12):
+        q, d = QuantileSketch(accuracy), DistinctSketch(precision)
+        values = rng.lognormal(2.5, 0.6, 1000)
+        q.update(values)
+        d.update(values)
+        entry = _serialize(q, d)
+        return {"run_id": run_id, "column_name": "fare_amount", "quantiles": entry["quantiles"],
+                "precision": precision, "registers": d.to_bytes()}
+    q, d = QuantileSketch(0.02), DistinctSketch(12)
+    q.update(rng.lognormal(2.5, 0.6, 1000))
+    current = {"fare_amount": _serialize(q, d)}
+    checks = {'baseline': {'ks': 0.2, 'min_runs': 3}}
+
+    # Accuracy raised from 0.01 to 0.02, and one run at another HLL precision: 2 usable runs
+    history = [row(f"old{i}", 0.01) for i in range(3)] + [row("new0", 0.02), row("new1", 0.02), row("hll", 0.02, 10)]
+    result = baseline_result(current, history, checks)
+    assert result.passed and result.details["runs"] == 2 and "skip" in result.details
+
+    result = baseline_result(current, history + [row("new2", 0.02)], checks)
+    assert result.passed and result.details["runs"] == 3 and "skip" not in result.details
+
+# --- Directory Dataset Tests ---
+def test_source_prunes_partitions_and_pushes_window_down(tmp_path):
+    import os
+    from datetime import datetime, timedelta
+    from drg.contracts.loader import SourceSpec
+    from drg.validation.source import resolve_source, validate_source
+    now = datetime(2024, 1, 10, 12)
+    for day in range(4):
+        ref = now - timedelta(days=day)
+        part = tmp_path / "rides" / f"dt={ref:%Y-%m-%d}"
+        part.mkdir(parents=True)
+        DataGenerator(seed=day).generate_batch(200, reference_date=ref).to_parquet(part / "part-0.parquet")
+    contract = _contract_with_reference(tmp_path)
+    contract.source = SourceSpec(str(tmp_path / "rides"), partition_column="dt", window_hours=25)
+
+    scan = resolve_source(contract.source, now=now)
+    assert [os.path.basename(os.path.dirname(f)) for f in scan.files] == ["dt=2024-01-09", "dt=2024-01-10"]
+
+    # Jan 9 rows span 10:00-12:00; the window starts at 11:00
+    rows = pd.concat(pd.read_parquet(f) for f in scan.files)
+    in_window = rows[rows.pickup_datetime >= datetime(2024, 1, 9, 11)]
+    in_memory = validate_source(scan, contract, mode="memory")
+    _assert_same_results(in_memory, validate_source(scan, contract, mode="stream", batch_size=97))
+    _assert_same_results(in_memory, validate_source(scan, contract, mode="arrow", batch_size=97))
+    assert next(r for r in in_memory if r.check_name == "volume").metric == len(in_window) < 400
+
+    contract.source.filters = [["vendor_id", "==", 1]]
+    filtered = validate_source(scan, contract, mode="stream")
+    assert next(r for r in filtered if r.check_name == "volume").metric == int((in_window.vendor_id == 1).sum())
+
+# --- Service Tests ---
+def test_service_refuses_requests_beyond_workers_plus_pending():
+    import asyncio
+    import threading
+    from drg.service import ValidationService, Overloaded
+    service = ValidationService("config/contract.yaml", workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.create_task(service.submit(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert service.pending == 2
+        with pytest.raises(Overloaded):
+            await service.submit(release.wait, 5)
+        release.set()
+        assert await asyncio.gather(*running) == [True, True]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        service.executor.shutdown()
+    assert (service.served, service.rejected, service.pending) == (2, 1, 0)
+
+def test_service_maps_request_errors_to_4xx_and_its_own_to_500():
+    import json
+    import asyncio
+    from drg.service import ValidationService
+    service = ValidationService("config/contract.yaml", workers=1)
+    def broken(run_id, contract=None, path=None, mode=None, batch_size=None, no_cache=False):
+        raise ValueError("deep inside a check")
+    service.validate = broken
+
+    async def request(server, raw: bytes):
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        writer.write(raw)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        writer.close()
+        return status
+
+    def post(body: dict) -> bytes:
+        data = json.dumps(body).encode()
+        return b"POST /validate HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n%s" % (len(data), data)
+
+    async def scenario():
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        async with server:
+            assert await request(server, post({"run_id": "r", "colour": "red"})) == 400
+            assert await request(server, post({"run_id": "r", "mode": "fast"})) == 400
+            assert await request(server, post({"run_id": "r", "batch_size": "10"})) == 400
+            assert await request(server, post({"run_id": "r"})) == 500
+            # Longer than the stream limit: answered, not dropped
+            assert await request(server, b"GET /status HTTP/1.1\r\nX-Big: " + b"a" * (1 << 17) + b"\r\n\r\n") == 431
+            assert await request(server, b"GET /" + b"a" * (1 << 17) + b" HTTP/1.1\r\n\r\n") == 431
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        service.executor.shutdown()
@@ -24,12 +24,19 @@ def is_db_available():
 
 DB_AVAILABLE = is_db_available()
 
+def test_backoff_delay_is_jittered_and_capped():
+    from drg.db import backoff_delay, RETRY_MAX_DELAY
+    delays = [backoff_delay(10) for _ in range(50)]
+    assert all(0 <= d <= RETRY_MAX_DELAY for d in delays)
+    assert len(set(delays)) > 1
+
 @pytest.mark.skipif(not DB_AVAILABLE, reason="Database not available. Run 'make up' to enable integration tests.")
 class TestIntegration:
     
     @pytest.fixture(autouse=True)
-    def clean_db(self):
-        # Reset bits for clean slate
+    def clean_db(self, tmp_path, monkeypatch):
+        # Reset bits for clean slate (ride_id history included)
+        monkeypatch.setattr("drg.validation.uniqueness.ID_FILTER_DIR", str(tmp_path / "ids"))
         execute_query("TRUNCATE pipeline_runs, check_results, incidents CASCADE")
         execute_query("UPDATE downstream_gate SET blocked = FALSE, reason = 'Test Init' WHERE gate_id = 1")
     
@@ -149,3 +156,358 @@ class TestIntegration:
         # Incident should be resolved
         inc = fetch_one("SELECT * FROM incidents WHERE run_id = %s", (run_id,))
         assert inc['status'] == 'RESOLVED'
+
+    def test_bulk_replay_of_failed_runs(self):
+        """Failed runs are found by check name and replayed in-process in one call"""
+        from drg.policy.engine import register_run
+        from drg.pipeline import validate_run
+        from drg.replay.manager import find_failed_runs, replay_runs
+        
+        contract = load_contract("config/contract.yaml")
+        scenarios = {"late_data": str(uuid.uuid4()), "schema_drift": str(uuid.uuid4()), None: str(uuid.uuid4())}
+        for seed, (scenario, run_id) in enumerate(scenarios.items()):
+            fpath = generate_and_save("data/raw", run_id, scenario=scenario, seed=seed)
+            register_run(run_id, fpath)
+            validate_run(run_id, contract)
+        
+        failed = find_failed_runs()
+        assert set(failed) == {scenarios["late_data"], scenarios["schema_drift"]}
+        assert find_failed_runs(check_name="freshness") == [scenarios["late_data"]]
+        
+        outcome = replay_runs(failed, contract, fix_scenario="clean", workers=1)
+        assert outcome == {run_id: True for run_id in failed}
+        assert find_failed_runs() == []
+        assert is_gate_open() == True
+
+    def test_bulk_replay_regenerates_in_the_pool_and_isolates_failing_runs(self, tmp_path):
+        import shutil
+        from datetime import datetime
+        from drg.contracts.loader import SourceSpec
+        from drg.ingest.generator import DataGenerator
+        from drg.policy.engine import register_run
+        from drg.pipeline import validate_run
+        from drg.replay.manager import replay_runs
+
+        contract = load_contract("config/contract.yaml")
+        late = [str(uuid.uuid4()) for _ in range(3)]
+        for seed, run_id in enumerate(late):
+            fpath = generate_and_save(str(tmp_path / "landing"), run_id, scenario="late_data", seed=seed)
+            register_run(run_id, fpath, files=[fpath])
+            assert validate_run(run_id, contract) == False
+
+        # A directory-dataset run whose files are gone by the time it is replayed
+        root = tmp_path / "rides"
+        part = root / f"dt={datetime.now():%Y-%m-%d}"
+        part.mkdir(parents=True)
+        DataGenerator(seed=7).generate_batch(300, reference_date=datetime.now()).to_parquet(part / "part-0.parquet")
+        scan_contract = load_contract("config/contract.yaml")
+        scan_contract.source = SourceSpec(str(root), partition_column="dt", window_hours=24)
+        gone = str(uuid.uuid4())
+        assert validate_run(gone, scan_contract) == True
+        shutil.rmtree(root)
+
+        outcome = replay_runs([gone] + late + [str(uuid.uuid4())], contract, fix_scenario="clean", workers=2)
+        assert [outcome[run_id] for run_id in late] == [True] * 3
+        assert outcome[gone] == False and list(outcome.values()).count(False) == 2
+
+    def test_incremental_batch_validates_only_new_partitions(self, tmp_path):
+        from drg.policy.engine import register_run
+        from drg.pipeline import validate_dataset
+        from drg.validation.partitions import PartitionIndex
+        
+        contract = load_contract("config/contract.yaml")
+        index_path = str(tmp_path / "index.json")
+        def add_partition():
+            run_id = str(uuid.uuid4())
+            register_run(run_id, generate_and_save(str(tmp_path), run_id, seed=len(list(tmp_path.glob("rides_*")))))
+            return run_id
+        def run_batch():
+            pairs = [(p.name[len("rides_"):-len(".parquet")], str(p)) for p in sorted(tmp_path.glob("rides_*.parquet"))]
+            return validate_dataset(pairs, contract, workers=1, index=PartitionIndex(index_path))
+        
+        first = [add_partition(), add_partition()]
+        outcome, dataset = run_batch()
+        assert set(outcome) == set(first) and all(outcome.values())
+        assert [r.check_name for r in dataset] == ["dataset_freshness", "dataset_volume", "dataset_gaps"]
+        assert all(r.passed for r in dataset)
+        assert dataset[1].metric == 2000
+        
+        outcome, dataset = run_batch()
+        assert outcome == {} and dataset[1].metric == 2000
+        
+        newest = add_partition()
+        outcome, dataset = run_batch()
+        assert outcome == {newest: True} and dataset[1].metric == 3000
+        row = fetch_one("SELECT metric_value FROM check_results WHERE run_id = %s AND check_name = 'dataset_volume'", (newest,))
+        assert row["metric_value"] == "3000"
+
+    def test_directory_dataset_run_replays_the_files_it_read(self, tmp_path):
+        from datetime import datetime, timedelta
+        from drg.contracts.loader import SourceSpec
+        from drg.ingest.generator import DataGenerator
+        from drg.pipeline import validate_run
+        from drg.replay.manager import replay_and_validate
+
+        root = tmp_path / "rides"
+        def add_file(ref, name, seed):
+            part = root / f"dt={ref:%Y-%m-%d}"
+            part.mkdir(parents=True, exist_ok=True)
+            DataGenerator(seed=seed).generate_batch(300, reference_date=ref).to_parquet(part / name)
+        now = datetime.now()
+        for day in range(3):
+            add_file(now - timedelta(days=day), f"part-{day}.parquet", seed=day)
+        contract = load_contract("config/contract.yaml")
+        contract.source = SourceSpec(str(root), partition_column="dt", window_hours=24)
+
+        run_id = str(uuid.uuid4())
+        assert validate_run(run_id, contract) == True
+        run = fetch_one("SELECT dataset_id, source_root, source_files, window_start FROM pipeline_runs WHERE run_id = %s", (run_id,))
+        assert run["dataset_id"] == "rides_batch" and run["source_root"] == str(root)
+        assert len(run["source_files"]) == 2 and run["window_start"] is not None
+
+        # A file landing later is not part of the run; replay re-reads exactly what it recorded
+        add_file(now, "part-late.parquet", seed=9)
+        assert replay_and_validate(run_id, contract) == True
+        from drg.db import fetch_all
+        volumes = [r["metric_value"] for r in fetch_all(
+            "SELECT metric_value FROM check_results WHERE run_id = %s AND check_name = 'volume'", (run_id,))]
+        assert len(volumes) == 2 and volumes[0] == volumes[1]
+
+    def test_replay_uses_recorded_file_path(self, tmp_path):
+        from drg.policy.engine import register_run
+        from drg.pipeline import validate_run
+        from drg.replay.manager import replay_and_validate
+
+        run_id = str(uuid.uuid4())
+        fpath = generate_and_save(str(tmp_path / "landing"), run_id, scenario="late_data", seed=77)
+        register_run(run_id, fpath, files=[fpath])
+        contract = load_contract("config/contract.yaml")
+        assert validate_run(run_id, contract) == False
+        assert replay_and_validate(run_id, contract, fix_scenario="clean") == True
+        assert not os.path.exists(f"data/raw/rides_{run_id}.parquet")
+
+    def test_commit_reuses_the_checked_id_hashes(self, tmp_path, monkeypatch):
+        """The history check takes the hashes the in-run uniqueness check computed"""
+        from drg.policy.engine import register_run
+        from drg.pipeline import validate_run
+        from drg.contracts.compiler import plan_for
+        from drg.validation.uniqueness import open_id_filter, hash_ids
+
+        def reread(*args):
+            raise AssertionError("ID column read twice")
+        monkeypatch.setattr("drg.pipeline.read_id_hashes", reread)
+        contract = load_contract("config/contract.yaml")
+        run_id = str(uuid.uuid4())
+        fpath = generate_and_save(str(tmp_path), run_id, seed=31)
+        register_run(run_id, fpath, files=[fpath])
+        for mode in ("memory", "stream"):
+            assert validate_run(run_id, contract, mode=mode)
+
+        saved = open_id_filter(plan_for(contract))
+        import pandas as pd
+        assert saved.contains(hash_ids(pd.read_parquet(fpath)['ride_id'])).all()
+
+    def test_rolling_baseline_from_stored_sketches(self):
+        """Drift is measured against the merged sketches of recent passed runs, no Parquet re-read"""
+        from drg.policy.engine import register_run
+        from drg.pipeline import validate_run
+        
+        contract = load_contract("config/contract.yaml")
+        def run(scenario=None, seed=0):
+            run_id = str(uuid.uuid4())
+            register_run(run_id, generate_and_save("data/raw", run_id, scenario=scenario, seed=seed))
+            passed = validate_run(run_id, contract)
+            baseline = fetch_one("SELECT passed, metric_value, details FROM check_results "
+                                 "WHERE run_id = %s AND check_name = 'baseline_drift'", (run_id,))
+            return passed, baseline
+        
+        for seed in range(3):
+            passed, baseline = run(seed=seed)
+            assert passed and "skip" in baseline["details"]
+        
+        passed, baseline = run(seed=10)
+        assert passed and baseline["details"]["runs"] == 3
+        assert baseline["details"]["columns"]["fare_amount"]["ks"] < 0.1
+        
+        passed, baseline = run(scenario="value_spike", seed=11)
+        assert not passed and not baseline["passed"]
+        assert not baseline["details"]["columns"]["fare_amount"]["passed"]
+
+    def test_commit_run_single_transaction(self, monkeypatch):
+        from drg.policy.engine import register_run, commit_run
+        
+        run_id = str(uuid.uuid4())
+        fpath = generate_and_save("data/raw", run_id, scenario="late_data", seed=666)
+        register_run(run_id, fpath)
+        
+        import pandas as pd
+        results = run_validations(pd.read_parquet(fpath), load_contract("config/contract.yaml"))
+        
+        connects = []
+        real_connect = psycopg2.connect
+        monkeypatch.setattr(psycopg2, "connect", lambda *a, **k: connects.append(1) or real_connect(*a, **k))
+        passed = commit_run(run_id, results)
+        monkeypatch.undo()
+        
+        assert passed == False
+        assert len(connects) <= 1
+        assert is_gate_open() == False
+        # Sketches go to run_sketches in the same transaction, not to check_results
+        row = fetch_one("SELECT COUNT(*) AS n FROM check_results WHERE run_id = %s", (run_id,))
+        assert row['n'] == len([r for r in results if r.check_name != "sketches"])
+        row = fetch_one("SELECT COUNT(*) AS n FROM run_sketches WHERE run_id = %s", (run_id,))
+        assert row['n'] == len(next(r for r in results if r.check_name == "sketches").details["columns"])
+        inc = fetch_one("SELECT status FROM incidents WHERE run_id = %s", (run_id,))
+        assert inc['status'] == 'OPEN'
+
+    def test_check_results_typed_and_partitioned(self, monkeypatch):
+        from drg.policy import engine
+        from drg.validation.base import ValidationResult
+
+        run_id = str(uuid.uuid4())
+        engine.register_run(run_id, "typed")
+        monkeypatch.setattr(engine, "_partition_month", None)
+        engine.commit_run(run_id, [ValidationResult("volume", True, 1000, {}),
+                                   ValidationResult("freshness", False, "N/A", {}),
+                                   ValidationResult("distribution", True, float("nan"), {})])
+
+        with engine.get_db_cursor() as cur:
+            cur.execute("SELECT check_name, metric_numeric, tableoid::regclass::text AS part "
+                        "FROM check_results WHERE run_id = %s", (run_id,))
+            rows = {r["check_name"]: r for r in cur.fetchall()}
+        assert rows["volume"]["metric_numeric"] == 1000.0
+        assert rows["freshness"]["metric_numeric"] is None
+        assert rows["distribution"]["metric_numeric"] is None
+        # This month's partition exists, so nothing lands in the default partition
+        assert {r["part"] for r in rows.values()} == {"check_results_" + time.strftime("%Y%m", time.gmtime())}
+
+    def test_pool_reuses_connections_and_prepared_statements(self):
+        from drg.db import pool_stats, health_check, get_db_cursor
+        is_gate_open() # warm one connection + prepared statement
+        before = pool_stats()
+        for _ in range(20):
+            assert is_gate_open() == True
+        after = pool_stats()
+        
+        assert after["created"] == before["created"]
+        assert after["checkouts"] - before["checkouts"] == 20
+        assert after["in_use"] == 0
+        
+        with get_db_cursor() as cur:
+            cur.execute("SELECT COUNT(*) AS n FROM pg_prepared_statements WHERE name = 'drg_gate_status'")
+            assert cur.fetchone()["n"] == 1
+        
+        health = health_check()
+        assert health["ok"] and health["in_use"] == 0
+
+    def test_trace_spans_each_db_statement(self, tmp_path, monkeypatch):
+        import json
+        from drg import trace
+        from drg.contracts.compiler import load_plan
+        from drg.pipeline import validate_run
+        from drg.policy.engine import register_run
+        for name, value in (("_enabled", False), ("_path", None), ("_capture", frozenset()), ("_events", []), ("_profiles", {})):
+            monkeypatch.setattr(trace, name, value)
+        monkeypatch.setenv(trace.TRACE_ENV, "")
+        monkeypatch.setenv(trace.CAPTURE_ENV, "")
+        run_id = str(uuid.uuid4())
+        fpath = generate_and_save(str(tmp_path), run_id, seed=6)
+        register_run(run_id, fpath, files=[fpath])
+
+        out = tmp_path / "trace.json"
+        trace.enable(str(out), command="validate")
+        assert validate_run(run_id, load_plan("config/contract.yaml"))
+        assert is_gate_open()
+        trace.write()
+
+        db = [e for e in json.loads(out.read_text())["traceEvents"] if e.get("cat") == "db"]
+        names = {e["name"] for e in db}
+        assert "EXECUTE drg_gate_status" in names
+        assert any(name.startswith("INSERT INTO check_results") for name in names)
+        assert all(e["dur"] >= 0 and e["args"]["query"] for e in db)
+        stages = {e["name"] for e in json.loads(out.read_text())["traceEvents"] if e.get("cat") == "stage"}
+        assert {"contract", "validate", "persist", "policy"} <= stages
+
+    def test_wait_for_gate_wakes_on_notify(self):
+        import threading
+        from drg.policy.engine import block_gate, open_gate, wait_for_gate_open
+        block_gate("test: blocked")
+        opener = threading.Timer(0.3, open_gate, args=("test: opened",))
+        opener.start()
+        t0 = time.monotonic()
+        # A long poll interval proves the wake-up came from NOTIFY, not a re-read
+        assert wait_for_gate_open(timeout=10, poll_interval=30)
+        assert time.monotonic() - t0 < 2
+        opener.join()
+
+    def test_wait_for_gate_times_out_and_falls_back_to_polling(self, monkeypatch):
+        import psycopg2
+        from drg.policy import engine
+        engine.block_gate("test: blocked")
+        t0 = time.monotonic()
+        assert not engine.wait_for_gate_open(timeout=0.3)
+        assert time.monotonic() - t0 < 2
+
+        def no_listen(*args, **kwargs):
+            raise psycopg2.OperationalError("LISTEN not supported")
+        monkeypatch.setattr(engine, "get_connection", no_listen)
+        engine.open_gate("test: opened")
+        assert engine.wait_for_gate_open(timeout=1, poll_interval=0.05)
+
+    def test_service_validates_over_http(self, tmp_path):
+        import json
+        import asyncio
+        import threading
+        import http.client
+        from drg.policy.engine import register_run
+        from drg.service import ValidationService, serve
+
+        service = ValidationService("config/contract.yaml", workers=2, data_roots=[str(tmp_path)])
+        ready = threading.Event()
+        port = []
+        def on_ready(server):
+            port.append(server.sockets[0].getsockname()[1])
+            ready.set()
+        thread = threading.Thread(target=lambda: asyncio.run(serve(service, port=0, ready=on_ready)), daemon=True)
+        thread.start()
+        assert ready.wait(30)
+
+        good, bad = str(uuid.uuid4()), str(uuid.uuid4())
+        for run_id, scenario in ((good, None), (bad, "null_explosion")):
+            fpath = generate_and_save(str(tmp_path), run_id, scenario=scenario, seed=5)
+            register_run(run_id, fpath, files=[fpath])
+
+        conn = http.client.HTTPConnection("127.0.0.1", port[0], timeout=30)
+        def call(method, path, body=None):
+            conn.request(method, path, json.dumps(body) if body is not None else None)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        try:
+            # One keep-alive connection across requests
+            status, body = call("POST", "/validate", {"run_id": good})
+            assert status == 200 and body["passed"]
+            assert "uniqueness_history" in [r["check_name"] for r in body["results"]]
+            status, body = call("POST", "/validate", {"run_id": bad})
+            assert status == 200 and not body["passed"]
+            assert call("GET", "/status")[1]["gate"] == "BLOCKED"
+
+            assert call("POST", "/validate", {"run_id": good, "path": str(tmp_path / "missing.parquet")})[0] == 404
+            # Requests can't point the service at files outside the configured roots
+            assert call("POST", "/validate", {"run_id": good, "path": "/etc/passwd"})[0] == 403
+            assert call("POST", "/validate", {"run_id": good, "path": str(tmp_path / ".." / "x.parquet")})[0] == 403
+            assert call("POST", "/validate", {"run_id": good, "contract": "/etc/hostname"})[0] == 403
+            # The run's IDs were saved with its commit, not at some later flush
+            from drg.validation.uniqueness import IdFilter
+            live = next(iter(service.filters.values()))
+            saved = IdFilter.open(live.path, live.capacity, live.fp_rate)
+            assert good in saved.runs
+            assert call("POST", "/validate", {})[0] == 400
+            assert call("GET", "/nope")[0] == 404
+            assert call("GET", "/status")[1]["served"] == 6
+        finally:
+            conn.close()
+            service.stop()
+            thread.join(10)
+        assert not thread.is_alive()
+        run = fetch_one("SELECT status FROM pipeline_runs WHERE run_id = %s", (good,))
+        assert run["status"] == "PASSED"